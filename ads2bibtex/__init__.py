@@ -1,2 +1,18 @@
 from .core import *
-from .iso4 import abbreviate
\ No newline at end of file
+from .bibtex import *
+from .cache import *
+from .sync import *
+from .index import *
+from .report import *
+from .schedule import *
+from .watch import *
+from .daemon import *
+from .aio import *
+
+
+def __getattr__(name):
+    # `iso4` (LTWA index, tokenizer) is imported only when used.
+    if name == "abbreviate":
+        from .iso4 import abbreviate
+        return abbreviate
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
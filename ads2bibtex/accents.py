@@ -8,16 +8,29 @@
 
 import re
 
-__all__ = ["AccentConverter"]
+__all__ = ["AccentConverter", "decode_tex_accents"]
+
+_RULES = None
+# (translation rule, detectors, decoder) shared by all the converters: they
+# are built by the first AccentConverter()
+
+_CONVERTER = None
+# the converter of decode_tex_accents
 
 
 class AccentConverter:
 
     def __init__(self):
 
-        self.translation_rule, self.accent_detector = self.__create_translation_rules()
+        global _RULES
+        if _RULES is None:
+            translation_rule, accent_detector = self.__create_translation_rules()
+            _RULES = (translation_rule, accent_detector,
+                      self.__compile_decoder(translation_rule, accent_detector))
+        self.translation_rule, self.accent_detector, self.decoder = _RULES
         # the translation dictionary, and the set of (regex) detectors for accents
         # each dictionary addition comes with its own (at least 1) detector
+        # the decoder is the union of the detectors (see __compile_decoder)
 
     def __create_translation_rules(self):
         """
@@ -245,6 +258,36 @@ class AccentConverter:
 
         return encode_dict, regex_detectors
 
+    @staticmethod
+    def __compile_decoder(encode_dict, regex_detectors):
+        """
+        combines the detectors into a single regex, which matches only what
+        can be translated: the letter of each detector is restricted to the
+        letters of its keys in encode_dict (a detector matches its keys, the
+        spaces being optional), and the detectors which match no key are
+        dropped. The detectors are tried in order at each position
+        """
+
+        alternatives = []
+        for detector in regex_detectors:
+            pattern = detector.pattern
+            for letter in ("[a-zA-Z]{1}", "[a-zA-z]{1}"):
+                if letter in pattern:
+                    break
+            left, right = pattern.split(letter)
+            keyed = re.compile(left + "(" + letter + ")" + right)
+
+            letters = set()
+            for key in encode_dict:
+                m = keyed.fullmatch(key)
+                if m:
+                    letters.add(m.group(1))
+            if letters:
+                letters = "".join(re.escape(c) for c in sorted(letters))
+                alternatives.append("(?:" + left + "[" + letters + "]" + right + ")")
+
+        return re.compile("|".join(alternatives))
+
     def populate_encode_dict(self, encode_dict, strKey, strValue, accent_pattern_left,
                              accent_pattern_right=''):
         """
@@ -273,23 +316,19 @@ class AccentConverter:
             replacement is by UTF-8 variant, otherwise plain ASCII will be used
         """
 
-        for i in range(len(self.accent_detector)):
-            accent_pattern = self.accent_detector[i]
-            # this is a complied regex corresponding to some accent pattern
-
-            m = set(re.findall(accent_pattern, s))
-            # we might have the same substring appearing several times.
-
-            # Since the replacement depends only on the translation rule, we
-            # pass from list to set in order to (potentially) decrease the
-            # number of string opertions
-            for s1 in m:
-                x = s1.replace(' ', '')
-                # remove the spaces to match the format of translation table
-                if x in self.translation_rule.keys():
-                    if utf8_or_ascii == 1:
-                        s = s.replace(s1, self.translation_rule[x][0])
-                    else:
-                        s = s.replace(s1, self.translation_rule[x][1])
-
-        return s
+        # each match is the pattern of a key (plus some spaces)
+        translation_rule = self.translation_rule
+        k = 0 if utf8_or_ascii == 1 else 1
+        return self.decoder.sub(
+            lambda m: translation_rule[m.group(0).replace(' ', '')][k], s)
+
+
+def decode_tex_accents(s, utf8_or_ascii=1):
+    """ AccentConverter().decode_Tex_Accents(@s, @utf8_or_ascii) with a
+        converter created once
+    """
+
+    global _CONVERTER
+    if _CONVERTER is None:
+        _CONVERTER = AccentConverter()
+    return _CONVERTER.decode_Tex_Accents(s, utf8_or_ascii)
@@ -0,0 +1,276 @@
+import asyncio
+
+from .core import (SPLITTABLE_FORMATS, _export_chunks, _export_request,
+                   _export_result, _join_chunks, _join_records, _lib_page_params,
+                   _lib_page_result, _parse_ratelimit, _retry_delay,
+                   change_journal_name, split_entries)
+from .sync import LibrarySync
+
+__all__ = ["AsyncADSClient", "aquery_lib", "aquery_lib_meta", "aquery_libs",
+           "aquery_ads", "AsyncLibrarySync"]
+
+
+def _import_aiohttp():
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("Please install `aiohttp` package to use the async API.")
+    return aiohttp
+
+
+class AsyncADSClient:
+    """Async counterpart of `~ads2bibtex.ADSClient` (built on `aiohttp`).
+
+    Use it as an async context manager (or call `close`)::
+
+        async with AsyncADSClient(token) as client:
+            bibs, last_modified, name = await aquery_lib(lib_id, token, client=client)
+
+    Parameters
+    ----------
+    token : str
+        ADS API token.
+    timeout : float, optional
+        Total timeout of a request in seconds, by default 120.
+    max_retries, backoff, max_backoff :
+        Same as `~ads2bibtex.ADSClient`.
+    limit : int, optional
+        Maximum number of simultaneous connections, by default 10.
+
+    Attributes
+    ----------
+    n_requests, ratelimits :
+        Same as `~ads2bibtex.ADSClient`, so that
+        `~ads2bibtex.PollScheduler` can budget the quota.
+    """
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, token, timeout=120, max_retries=5, backoff=1.,
+                 max_backoff=60., limit=10):
+        self.token = token
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limit = limit
+        self.n_requests = 0
+        self.ratelimits = {}
+        self._session = None
+
+    @property
+    def session(self):
+        # Created lazily, as aiohttp requires a running event loop.
+        if self._session is None:
+            aiohttp = _import_aiohttp()
+            self._session = aiohttp.ClientSession(
+                headers={"Authorization": "Bearer " + self.token,
+                         "Content-type": "application/json"},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.limit),
+            )
+        return self._session
+
+    async def request(self, method, url, **kwargs):
+        """Send a request, retrying on transient errors.
+
+        Returns ``(status, headers, json)`` of the last response. Connection
+        errors and timeouts are raised after the last retry.
+        """
+        aiohttp = _import_aiohttp()
+        for attempt in range(self.max_retries + 1):
+            self.n_requests += 1
+            try:
+                async with self.session.request(method, url, **kwargs) as r:
+                    self.ratelimits.update(_parse_ratelimit(url, r.headers))
+                    if (r.status not in self.RETRY_STATUS
+                            or attempt == self.max_retries):
+                        return r.status, r.headers, await r.json(content_type=None)
+                    headers = r.headers
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+                headers = {}
+            await asyncio.sleep(_retry_delay(attempt, headers, self.backoff,
+                                             self.max_backoff))
+
+    async def get_json(self, url, **kwargs):
+        return (await self.request("GET", url, **kwargs))[2]
+
+    async def post_json(self, url, **kwargs):
+        return (await self.request("POST", url, **kwargs))[2]
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+async def _with_client(token, client, coro_func):
+    """Run ``coro_func(client)``, with a temporary client if `client` is None."""
+    if client is not None:
+        return await coro_func(client)
+    async with AsyncADSClient(token) as client:
+        return await coro_func(client)
+
+
+async def aquery_lib_meta(library_id, token,
+                          url="https://api.adsabs.harvard.edu/v1/biblib/libraries/",
+                          client=None):
+    """Async version of `~ads2bibtex.query_lib_meta` (not conditional)."""
+    async def _query(client):
+        res = await client.get_json(str(url) + library_id, params={"rows": 0})
+        try:
+            return res["metadata"]
+        except KeyError:
+            raise ValueError("Error in ADS API query. Check your token..? See:", res)
+    return await _with_client(token, client, _query)
+
+
+async def aquery_lib(library_id, token, sort=None, rows=10000, max_workers=1,
+                     url="https://api.adsabs.harvard.edu/v1/biblib/libraries/",
+                     client=None):
+    """Async version of `~ads2bibtex.query_lib`.
+
+    The pages after the first one are fetched concurrently, at most
+    `max_workers` at a time.
+    """
+    async def _page(client, start):
+        res = await client.get_json(str(url) + library_id,
+                                    params=_lib_page_params(start, rows, sort))
+        return _lib_page_result(res)
+
+    async def _query(client):
+        meta, documents = await _page(client, 0)
+        documents = list(documents)
+        if "num_documents" in meta:
+            semaphore = asyncio.Semaphore(max(max_workers, 1))
+
+            async def _limited(start):
+                async with semaphore:
+                    return await _page(client, start)
+
+            pages = await asyncio.gather(
+                *[_limited(start) for start in range(rows, meta["num_documents"], rows)]
+            )
+            for _, docs in pages:
+                documents.extend(docs)
+        else:  # unknown size: page until a short page is returned
+            start, docs = rows, documents
+            while len(docs) == rows:
+                meta, docs = await _page(client, start)
+                documents.extend(docs)
+                start += rows
+        return (documents, meta["date_last_modified"],
+                "ADS Library: " + meta["name"])
+
+    return await _with_client(token, client, _query)
+
+
+async def aquery_libs(library_ids, token, concurrency=4, client=None, **kwargs):
+    """Query several libraries concurrently.
+
+    Parameters
+    ----------
+    library_ids : list of str
+        The library IDs.
+    concurrency : int, optional
+        Maximum number of libraries queried at a time, by default 4.
+    **kwargs :
+        Passed to `aquery_lib`.
+
+    Returns
+    -------
+    results : dict
+        ``{library_id: (documents, last_modified, name)}``.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def _query(client):
+        async def _one(library_id):
+            async with semaphore:
+                return await aquery_lib(library_id, token, client=client, **kwargs)
+        unique_ids = list(dict.fromkeys(library_ids))
+        results = await asyncio.gather(*[_one(lib) for lib in unique_ids])
+        return dict(zip(unique_ids, results))
+
+    return await _with_client(token, client, _query)
+
+
+async def _offload(func, *args):
+    """Run the blocking `func` (SQLite cache, journal names) in the default executor."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def _aexport(client, bibcodes, options, fmt, url, chunksize, max_workers):
+    semaphore = asyncio.Semaphore(max(max_workers, 1))
+
+    async def _chunk(chunk):
+        _url, data = _export_request(chunk, options, fmt, url)
+        async with semaphore:
+            return _export_result(await client.post_json(_url, data=data))
+
+    chunks = _export_chunks(bibcodes, fmt, chunksize)
+    return _join_chunks(await asyncio.gather(*[_chunk(c) for c in chunks]), fmt)
+
+
+async def aquery_ads(bibcodes, token, options=dict(sort="date asc"), fmt="bibtex",
+                     journalname="ads", url="https://api.adsabs.harvard.edu/v1/export/",
+                     cache=None, chunksize=2000, max_workers=4, client=None,
+                     accents="keep"):
+    """Async version of `~ads2bibtex.query_ads`.
+
+    The chunks are exported concurrently, at most `max_workers` at a time, and
+    the journal names (and accents) are changed in the same way as `query_ads`.
+    The cache lookups and the changes of the journal names run in the default
+    executor (a thread), not to block the event loop.
+    """
+    def _change(raw):
+        return change_journal_name(raw, journalname=journalname, accents=accents)
+
+    async def _query(client):
+        if cache is None or fmt not in SPLITTABLE_FORMATS:
+            raw = await _aexport(client, bibcodes, options, fmt, url,
+                                 chunksize, max_workers)
+            return await _offload(_change, raw)
+
+        records = await _offload(cache.get_many, bibcodes, fmt, options)
+        misses = [b for b in dict.fromkeys(bibcodes) if b not in records]
+        if misses:
+            fetched = split_entries(await _aexport(client, misses, options, fmt, url,
+                                                   chunksize, max_workers))
+            await _offload(cache.put_many, fetched, fmt, options)
+            records.update(fetched)
+        return await _offload(_change, _join_records(bibcodes, records))
+
+    return await _with_client(token, client, _query)
+
+
+class AsyncLibrarySync(LibrarySync):
+    """`~ads2bibtex.LibrarySync` which exports with `aquery_ads`.
+
+    Use ``await sync.aupdate(bibcodes)`` instead of ``sync.update``. The
+    `client` keyword argument (if any) must be an `AsyncADSClient`.
+    """
+
+    async def _aexport(self, bibcodes):
+        self.n_exported += len(bibcodes)
+        return await aquery_ads(bibcodes, token=self.token, options=self.options,
+                                fmt=self.fmt, journalname=self.journalname,
+                                accents=self.accents, cache=self.cache,
+                                **self.kwargs)
+
+    async def aupdate(self, bibcodes, fetched=None):
+        """Async version of `~ads2bibtex.LibrarySync.update`."""
+        steps = self._update_steps(bibcodes, fetched)
+        try:
+            to_export = next(steps)
+            while True:
+                to_export = steps.send(await self._aexport(to_export))
+        except StopIteration as stop:
+            return stop.value
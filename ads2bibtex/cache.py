@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+__all__ = ["ExportCache", "AbbreviationCache", "default_cache_dir"]
+
+
+def default_cache_dir():
+    """The default cache directory (``$XDG_CACHE_HOME/ads2bibtex``)."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "ads2bibtex"
+
+
+class ExportCache:
+    """On-disk cache of the exported text of each bibcode.
+
+    The records are stored in a SQLite database keyed by (bibcode, format,
+    export options). Records older than `ttl` are treated as misses (so they
+    are exported again from ADS), and the least recently used records are
+    evicted when the total size exceeds `max_size`.
+
+    Parameters
+    ----------
+    cache_dir : path-like, optional
+        The directory of the database file (``export.sqlite``). Default is
+        `default_cache_dir`.
+    ttl : float, optional
+        Time-to-live of a record in seconds. Default is 7 days.
+    max_size : int, optional
+        Maximum total size of the records in bytes. Default is 100 MiB.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of bibcodes found/not found in the cache so far.
+    """
+
+    def __init__(self, cache_dir=None, ttl=7*86400, max_size=100*2**20):
+        self.cache_dir = Path(default_cache_dir() if cache_dir is None else cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.cache_dir / "export.sqlite"
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " bibcode TEXT, fmt TEXT, opts TEXT, text TEXT, size INTEGER,"
+            " created REAL, accessed REAL, PRIMARY KEY (bibcode, fmt, opts))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS accessed ON records (accessed)")
+        self._db.commit()
+
+    @staticmethod
+    def _optkey(options):
+        """The options affecting the content of each record (not the order)."""
+        return json.dumps({k: v for k, v in options.items()
+                           if k not in ("bibcode", "sort")}, sort_keys=True)
+
+    def get_many(self, bibcodes, fmt, options={}):
+        """Returns ``{bibcode: text}`` of the fresh records in the cache."""
+        optkey = self._optkey(options)
+        now = time.time()
+        found = {}
+        with self._lock:
+            for bib in set(bibcodes):
+                row = self._db.execute(
+                    "SELECT text, created FROM records"
+                    " WHERE bibcode=? AND fmt=? AND opts=?", (bib, fmt, optkey)
+                ).fetchone()
+                if row is not None and now - row[1] < self.ttl:
+                    found[bib] = row[0]
+            self._db.executemany(
+                "UPDATE records SET accessed=? WHERE bibcode=? AND fmt=? AND opts=?",
+                [(now, bib, fmt, optkey) for bib in found]
+            )
+            self._db.commit()
+        self.hits += len(found)
+        self.misses += len(set(bibcodes)) - len(found)
+        return found
+
+    def put_many(self, records, fmt, options={}):
+        """Store ``{bibcode: text}`` and evict the LRU records if needed."""
+        if not records:
+            return
+        optkey = self._optkey(options)
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(bib, fmt, optkey, text, len(text.encode()), now, now)
+                 for bib, text in records.items()]
+            )
+            self._evict()
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT TOTAL(size) FROM records").fetchone()[0]
+        if total <= self.max_size:
+            return
+        rows = self._db.execute(
+            "SELECT rowid, size FROM records ORDER BY accessed ASC"
+        ).fetchall()
+        drop = []
+        for rowid, size in rows:
+            if total <= self.max_size:
+                break
+            drop.append((rowid,))
+            total -= size
+        self._db.executemany("DELETE FROM records WHERE rowid=?", drop)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM records")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class AbbreviationCache:
+    """On-disk cache of the ISO 4 abbreviations of the journal names.
+
+    The abbreviations are stored in a SQLite database keyed by (title, key),
+    where the key identifies the LTWA version, the lemmatizer and the
+    options (see `~ads2bibtex.iso4.abbreviate_titles`), so that the entries
+    never go stale. Use it with `~ads2bibtex.iso4.set_abbreviation_cache`.
+
+    Parameters
+    ----------
+    cache_dir : path-like, optional
+        The directory of the database file (``iso4.sqlite``). Default is
+        `default_cache_dir`.
+
+    Attributes
+    ----------
+    hits, misses : int
+        Number of titles found/not found in the cache so far.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = Path(default_cache_dir() if cache_dir is None else cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.cache_dir / "iso4.sqlite"
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS abbrevs ("
+            " title TEXT, key TEXT, abbr TEXT, PRIMARY KEY (title, key))"
+        )
+        self._db.commit()
+
+    def get_many(self, titles, key):
+        """Returns ``{title: abbreviation}`` of the titles in the cache."""
+        found = {}
+        with self._lock:
+            for title in set(titles):
+                row = self._db.execute(
+                    "SELECT abbr FROM abbrevs WHERE title=? AND key=?", (title, key)
+                ).fetchone()
+                if row is not None:
+                    found[title] = row[0]
+        self.hits += len(found)
+        self.misses += len(set(titles)) - len(found)
+        return found
+
+    def put_many(self, abbrs, key):
+        """Store ``{title: abbreviation}``."""
+        if not abbrs:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO abbrevs VALUES (?, ?, ?)",
+                [(title, key, abbr) for title, abbr in abbrs.items()]
+            )
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM abbrevs")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
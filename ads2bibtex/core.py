@@ -1,20 +1,45 @@
+import itertools
 import json
+import os
+import random
 import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlsplit
 
 import requests
 
-__all__ = ["_check_token", "change_journal_name",
+from .bibtex import _Compiled, _iter_entries, iter_entries
+
+__all__ = ["_check_token", "ADSClient", "change_journal_name",
+           "iter_change_journal_name",
            "read_sort_bib_ads", "read_bib_add", "query_ads",
-           "query_lib", "make_rawfile", "extract_cite_keys"]
+           "query_lib", "query_lib_meta", "iter_lib", "make_rawfile",
+           "extract_cite_keys", "split_entries", "write_output"]
+
+# Formats whose output can be split into one record per bibcode (the
+# citation key of the entry is the bibcode unless ADS is told otherwise).
+SPLITTABLE_FORMATS = ("bibtex", "bibtexabs")
+# Tagged formats, whose records are separated by a blank line.
+TAGGED_FORMATS = ("ads", "bibtex", "bibtexabs", "endnote", "medlars", "procite",
+                  "refworks", "ris")
+# Formats whose outputs cannot simply be concatenated.
+XML_FORMATS = ("dcxml", "refxml", "refabsxml", "rss", "votable")
+
+_ENTRY_START = re.compile(r"^@\w+\s*\{\s*([^,\s]+)\s*,", flags=re.M)
 
 
 # Journal name abbreviations used in ADS
 # I have no idea why ADS failed to give full list properly... I had to combine
 # their website and style files manually, and expand the abbreviations to full
 # names. See https://ui.adsabs.harvard.edu/help/actions/journal-macros
-# NOTE: apjl/apjs must preceed apj, otherwise apjl will be replaced by, e.g.,
-#   "Astrophysical Journall" (double l at the end). Same for aapr/aaps & aap,
-#   nar/nat & na
+# NOTE: The order does not matter: a macro is replaced only as a whole
+#   command (``\apj`` is not the start of ``\apjl``), see `_MACRO_REGEX`.
 JOURNAL_MACRO = {
     "aas": "American Astronomical Society Meeting Abstracts",
     "aj": "Astronomical Journal",
@@ -95,41 +120,417 @@ def _check_token():
     return token
 
 
-def _iso4fy_journals(raw_bibtex_text):
+def _parse_ratelimit(url, headers):
+    """``{service: ratelimit}`` from the ``X-RateLimit-*`` headers (or empty)."""
     try:
-        from .iso4 import abbreviate
-    except ImportError:
-        raise ImportError(
-            "Please install `nltk` package to use `iso4` journalname formatter."
-        )
-    # Expand all macros first
-    lines = raw_bibtex_text.split("\n")
-    for i, line in enumerate(lines):
-        if line.strip().startswith("journal"):
-            fullname = line.strip().split("{")[1].split("}")[0]
-            abbrname = abbreviate(fullname, periods=True)
-            lines[i] = line.replace(fullname, abbrname)
-            # FIXME: When "Exception: Ambiguous word in title:" happens, we need to
-            #   put, e.g., disambiguation_langs=['eng']. However, after updating to
-            #   2021-07-02 LTWA version, I cannot see this exception happening.
-    return "\n".join(lines)
-
-
-def _expand_macros(raw_bibtex_text):
-    for k, v in JOURNAL_MACRO.items():
-        raw_bibtex_text = re.sub(r"\\{}".format(k), v, raw_bibtex_text)
-    return raw_bibtex_text
-
-
-def change_journal_name(raw_bibtex_text, journalname="ads"):
-    if journalname == "ads":
-        return raw_bibtex_text
-    elif journalname == "full":
-        return _expand_macros(raw_bibtex_text)
-    elif journalname == "iso4":
-        return _iso4fy_journals(_expand_macros(raw_bibtex_text))
+        ratelimit = dict(limit=int(headers["X-RateLimit-Limit"]),
+                         remaining=int(headers["X-RateLimit-Remaining"]),
+                         reset=float(headers["X-RateLimit-Reset"]))
+    except (KeyError, ValueError):
+        return {}
+    # e.g., https://api.adsabs.harvard.edu/v1/biblib/libraries/xxx -> biblib
+    path = urlsplit(url).path.strip("/").split("/")
+    service = path[1] if (len(path) > 1 and path[0] == "v1") else path[0]
+    return {service: ratelimit}
+
+
+def _retry_delay(attempt, headers, backoff, max_backoff):
+    """Seconds to wait before the retry: ``Retry-After`` or backoff with jitter."""
+    if "Retry-After" in headers:
+        retry_after = headers["Retry-After"]
+        try:
+            return max(float(retry_after), 0)
+        except ValueError:  # HTTP-date
+            try:
+                when = parsedate_to_datetime(retry_after)
+                return max((when - datetime.now(timezone.utc)).total_seconds(), 0)
+            except (TypeError, ValueError):
+                pass
+    delay = min(max_backoff, backoff * 2**attempt)
+    return delay * random.uniform(0.5, 1)
+
+
+class ADSClient:
+    """HTTP client for the ADS API with connection pooling and retries.
+
+    One pooled (keep-alive) `requests.Session` is used for all the requests,
+    so that each poll does not pay a new TCP/TLS handshake. Requests failing
+    with connection errors, timeouts, 429 or 5xx are retried with exponential
+    backoff with jitter, honoring the ``Retry-After`` header.
+
+    Parameters
+    ----------
+    token : str
+        ADS API token.
+    timeout : float or tuple of float, optional
+        ``(connect, read)`` timeouts in seconds, by default ``(10, 120)``.
+    max_retries : int, optional
+        Maximum number of retries of a request, by default 5.
+    backoff : float, optional
+        The base delay of the backoff in seconds, by default 1. The n-th retry
+        waits ``backoff * 2**n`` (upto `max_backoff`) times a random factor
+        between 0.5 and 1.
+    max_backoff : float, optional
+        Maximum delay between retries in seconds, by default 60.
+    pool_maxsize : int, optional
+        Maximum number of connections kept alive per host, by default 10.
+
+    Attributes
+    ----------
+    n_requests : int
+        Number of requests sent so far (including retries).
+    ratelimits : dict
+        The last ``X-RateLimit-*`` headers for each ADS service (e.g.,
+        ``"biblib"``, ``"export"``) as ``{"limit": int, "remaining": int,
+        "reset": float (UNIX time)}``.
+    """
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, token, timeout=(10, 120), max_retries=5, backoff=1.,
+                 max_backoff=60., pool_maxsize=10):
+        self.token = token
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": "Bearer " + token,
+                                     "Content-type": "application/json"})
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4,
+                                                pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.n_requests = 0
+        self.ratelimits = {}
+        self._last_responses = {}  # for conditional requests
+        self._lock = threading.Lock()
+
+    def _record(self, url, response=None):
+        """Count the request and keep the rate-limit headers of the response."""
+        with self._lock:
+            self.n_requests += 1
+            if response is not None:
+                self.ratelimits.update(_parse_ratelimit(url, response.headers))
+
+    def _delay(self, attempt, response=None):
+        headers = {} if response is None else response.headers
+        return _retry_delay(attempt, headers, self.backoff, self.max_backoff)
+
+    def request(self, method, url, conditional=False, **kwargs):
+        """Send a request, retrying on transient errors.
+
+        Returns the last response (which may have an error status code when
+        the retries are exhausted). Connection errors and timeouts are raised
+        after the last retry.
+
+        If `conditional`, the ``ETag``/``Last-Modified`` of the last successful
+        response to the same request are sent as ``If-None-Match``/
+        ``If-Modified-Since``, and when the server answers 304 (Not Modified),
+        that last response is returned (with ``from_cache = True``).
+        """
+        if conditional:
+            key = (method, url, json.dumps(kwargs.get("params"), sort_keys=True))
+            last = self._last_responses.get(key)
+            if last is not None:
+                headers = dict(kwargs.pop("headers", None) or {})
+                if "ETag" in last.headers:
+                    headers["If-None-Match"] = last.headers["ETag"]
+                if "Last-Modified" in last.headers:
+                    headers["If-Modified-Since"] = last.headers["Last-Modified"]
+                kwargs["headers"] = headers
+            r = self.request(method, url, **kwargs)
+            if r.status_code == 304 and last is not None:
+                last.from_cache = True
+                return last
+            if r.ok and ("ETag" in r.headers or "Last-Modified" in r.headers):
+                r.from_cache = False
+                self._last_responses[key] = r
+            return r
+
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(url)
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._delay(attempt))
+                continue
+            self._record(url, r)
+            if r.status_code not in self.RETRY_STATUS or attempt == self.max_retries:
+                return r
+            time.sleep(self._delay(attempt, r))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_CLIENTS = {}
+
+
+def _get_client(token, client=None):
+    """Returns `client`, or the client shared by the queries with `token`."""
+    if client is not None:
+        return client
+    if token not in _CLIENTS:
+        _CLIENTS[token] = ADSClient(token)
+    return _CLIENTS[token]
+
+
+def _macro_alternation(names):
+    """Regex of any of `names`, grouped by their first letters (longest first)."""
+    groups = []
+    for first, group in itertools.groupby(sorted(names), key=lambda name: name[0]):
+        rest = sorted((name[1:] for name in group), key=len, reverse=True)
+        groups.append(re.escape(first) + "(?:" + "|".join(map(re.escape, rest)) + ")")
+    return "(?:" + "|".join(groups) + ")"
+
+
+# Any of the macros as a whole command (longest first, not followed by a letter;
+# grouped, as `re` tries the alternatives one by one at each backslash)
+_MACRO_REGEX = re.compile(r"\\(" + _macro_alternation(JOURNAL_MACRO) + r")(?![A-Za-z])")
+
+
+def _tagged_field(tag, separator, names):
+    # A value continues on the next lines until a tag or a blank line.
+    return re.compile(r"^((" + names + ")" + separator + r")(.*(?:\n(?!"
+                      + tag + r"|[ \t]*$).*)*)", flags=re.M)
+
+
+# The formats whose records are rewritten field by field (detected by the
+# start of a record): the regex of all the fields and of those with journal
+# names (groups: the part before the value, the field name, the value; `None`
+# to parse the entries by `~ads2bibtex.iter_entries`), the (lower-case) names
+# of the fields whose journal names are abbreviated by ISO 4, of those whose
+# macros are expanded, and of those never touched by the accent stage.
+RECORD_FORMATS = {
+    "bibtex": dict(  # (also bibtexabs)
+        start=_ENTRY_START,
+        field=None,
+        journal_field=None,
+        journal=("journal",),
+        macros=("journal", "booktitle"),
+        verbatim=("url", "adsurl", "doi", "eprint", "file"),
+    ),
+    "ris": dict(
+        start=re.compile(r"^TY  - ", flags=re.M),
+        field=_tagged_field(r"[A-Z][A-Z0-9]  -", "  - ", r"[A-Z][A-Z0-9]"),
+        journal_field=_tagged_field(r"[A-Z][A-Z0-9]  -", "  - ", "JO|JF|T2"),
+        journal=("jo", "jf"),
+        macros=("jo", "jf", "t2"),
+        verbatim=("ur", "do", "l1", "l2", "l3", "l4"),
+    ),
+    "endnote": dict(
+        start=re.compile(r"^%0 ", flags=re.M),
+        field=_tagged_field(r"%\S ", " ", r"%\S"),
+        journal_field=_tagged_field(r"%\S ", " ", "%J|%B"),
+        journal=("%j",),
+        macros=("%j", "%b"),
+        verbatim=("%u", "%r"),
+    ),
+}
+
+# Unless the TeX accents are decoded, the BibTeX fields which may be rewritten
+# have a macro, or are the journal names (with ISO 4): each entry is parsed
+# only until they are found (see `_iter_fields`).
+_MACROS = _Compiled(_MACRO_REGEX.pattern)
+
+# Options of the accent stage (see `change_journal_name`).
+ACCENTS = ("keep", "utf8", "ascii")
+
+
+def _expand_macro_match(match):
+    return JOURNAL_MACRO[match.group(1)]
+
+
+def _accent_decoder(accents):
+    """The function decoding the TeX accents of a string (`None` to keep them)."""
+    if accents == "keep":
+        return None
+    from .accents import decode_tex_accents
+    utf8_or_ascii = 1 if accents == "utf8" else 0
+    return lambda text: decode_tex_accents(text, utf8_or_ascii)
+
+
+def _split_value(value):
+    """``(opening, journal name, closing)`` of a field value.
+
+    E.g., ``{Astrophysical Journal}`` or ``"{Astrophysical Journal}"`` in
+    BibTeX, or the value up to the trailing spaces in tagged formats.
+    """
+    if value.startswith('"{') and value.endswith('}"'):
+        n = 2
+    elif value.startswith(("{", '"')):
+        n = 1
     else:
+        name = value.rstrip()
+        return "", name, value[len(name):]
+    return value[:n], value[n:-n], value[-n:]
+
+
+def _iter_fields(text, record_format, all_fields=True, iso4=True):
+    """``(lower-case name, value, start, end)`` of the fields of `text`.
+
+    (Of BibTeX, unless `all_fields`, the fields upto the last one which may be
+    rewritten, see `_MACROS`.)
+    """
+    if record_format["field"] is None:
+        if all_fields:
+            entries = iter_entries(text)
+        else:
+            entries = _iter_entries(text, until=_MACROS,
+                                    needed=record_format["journal"] if iso4 else ())
+        for entry in entries:
+            for field in entry.fields:
+                # Bare values (e.g., ``year = 2020`` or @string macros) are
+                # never rewritten.
+                if field.value[:1] in ("{", '"'):
+                    yield field
+        return
+    fields = record_format["field" if all_fields else "journal_field"]
+    for match in fields.finditer(text):
+        yield match.group(2).lower(), match.group(3), match.start(3), match.end(3)
+
+
+def _rewrite_fields(text, record_format, journalname, accents):
+    """The journal name and accent stages of text in one scan of its fields.
+
+    Only the field values are rewritten: the macros (e.g., ``\\apj``) of the
+    journal fields are expanded, the accents are decoded in all but the
+    verbatim fields, and then the (distinct) journal names are abbreviated at
+    once (see `RECORD_FORMATS`).
+    """
+    decode = _accent_decoder(accents)
+    journal, macros = record_format["journal"], record_format["macros"]
+    verbatim = record_format["verbatim"]
+    pieces = []
+    journals = {}  # index of the piece -> (opening, journal name, closing)
+    pos = 0
+    for name, value, start, end in _iter_fields(text, record_format, decode is not None,
+                                                journalname == "iso4"):
+        if decode is None and name not in macros:
+            continue
+        if journalname != "ads" and name in macros:
+            value = _MACRO_REGEX.sub(_expand_macro_match, value)
+        if decode is not None and "\\" in value and name not in verbatim:
+            value = decode(value)
+        pieces.append(text[pos:start])
+        if journalname == "iso4" and name in journal:
+            journals[len(pieces)] = _split_value(value)
+        pieces.append(value)
+        pos = end
+    pieces.append(text[pos:])
+
+    if journals:
+        from .iso4 import abbreviate_titles
+        # FIXME: When "Exception: Ambiguous word in title:" happens, we need to
+        #   put, e.g., disambiguation_langs=['eng']. However, after updating to
+        #   2021-07-02 LTWA version, I cannot see this exception happening.
+        abbrnames = abbreviate_titles([name for _, name, _ in journals.values()],
+                                      periods=True)
+        for i, (opening, fullname, closing) in journals.items():
+            pieces[i] = opening + abbrnames[fullname] + closing
+    return "".join(pieces)
+
+
+def change_journal_name(raw_bibtex_text, journalname="ads", accents="keep"):
+    """Change the journal names (and the TeX accents) of exported text.
+
+    Parameters
+    ----------
+    raw_bibtex_text : str
+        The exported text.
+    journalname : str, optional
+        One of ``"ads"`` (as it is, e.g., ``\\apj``), ``"full"`` (e.g.,
+        ``Astrophysical Journal``), or ``"iso4"`` (e.g., ``Astrophys. J.``).
+    accents : str, optional
+        One of `ACCENTS`: ``"keep"`` (default, as it is, e.g., ``{\\"o}``),
+        ``"utf8"`` (e.g., ``ö``), or ``"ascii"`` (e.g., ``o``).
+
+    Note
+    ----
+    In BibTeX (bibtexabs), RIS and EndNote text, the stages are applied field
+    by field in one scan (see `RECORD_FORMATS`); otherwise (e.g., aastex or
+    mnras formats), the macros and accents of the whole text are changed, and
+    the journal names are not abbreviated. Use `iter_change_journal_name` for
+    texts too large for the memory.
+    """
+    if journalname not in ("ads", "full", "iso4"):
         raise ValueError("Unknown journalname formatter: {}".format(journalname))
+    if accents not in ACCENTS:
+        raise ValueError(f"accents must be one of {list(ACCENTS)}, got {accents}")
+    if journalname == "ads" and accents == "keep":
+        return raw_bibtex_text
+
+    for record_format in RECORD_FORMATS.values():
+        if record_format["start"].search(raw_bibtex_text) is not None:
+            return _rewrite_fields(raw_bibtex_text, record_format, journalname, accents)
+    text = raw_bibtex_text
+    if journalname != "ads":
+        text = _MACRO_REGEX.sub(_expand_macro_match, text)
+    decode = _accent_decoder(accents)
+    if decode is not None:
+        text = decode(text)
+    return text
+
+
+def iter_change_journal_name(lines, journalname="ads", accents="keep",
+                             batchsize=1000):
+    """`change_journal_name` of a stream of lines, batch by batch.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        The lines of the text, with their line breaks (e.g., an open file).
+    journalname, accents : str, optional
+        See `change_journal_name`.
+    batchsize : int, optional
+        Number of records (BibTeX entries, RIS or EndNote records), or of
+        lines if no record has started yet, per batch, by default 1000.
+
+    Yields
+    ------
+    text : str
+        The changed text of each batch (concatenate them for the whole
+        text). A batch always ends right before a record, so that only
+        batches of records are held in memory, whatever the size of the text.
+
+    Examples
+    --------
+    >>> with open("huge.bib") as fin, open("huge_utf8.bib", "w") as fout:
+    ...     fout.writelines(iter_change_journal_name(fin, "full", "utf8"))
+    """
+    batch = []
+    n_records = 0
+    for line in lines:
+        if line.startswith(("@", "TY  - ", "%0 ")):
+            if n_records >= batchsize:
+                yield change_journal_name("".join(batch), journalname, accents)
+                batch, n_records = [], 0
+            n_records += 1
+        elif n_records == 0 and len(batch) >= batchsize:
+            yield change_journal_name("".join(batch), journalname, accents)
+            batch = []
+        batch.append(line)
+    if batch:
+        yield change_journal_name("".join(batch), journalname, accents)
+
+
+def split_entries(text):
+    """Split BibTeX-like export text into ``{key: entry_text}``.
+
+    Each entry text is stripped and ends with a blank line, so that entries
+    can be concatenated in any order.
+    """
+    return {entry.key: entry.text + "\n\n"
+            for entry in iter_entries(text, fields=False) if entry.key is not None}
 
 
 def read_sort_bib_ads(fname, sort=False):
@@ -181,20 +582,90 @@ def read_bib_add(fname):
         with open(fname, 'r') as ff:
             _adds = ff.read()
         _adds = str(_adds)
-        # First, ignore all comment parts
-        _adds2 = re.sub(r"\s?[#%](.)*\s?\n", "\n", _adds)
-        _adds2 = _adds2.split("\n")
-        _adds2 = list(filter(lambda a: a != '', _adds2))
-        _adds2 = re.findall(r"@\w+{(.+),", _adds)
+        _adds2 = [entry.key for entry in iter_entries(_adds, fields=False)
+                  if entry.key is not None]
     except (TypeError, FileNotFoundError):
         _adds = ""
         _adds2 = []
     return _adds, _adds2
 
 
+def _export_request(bibcodes, options, fmt, url):
+    """The URL and the JSON payload to export `bibcodes`."""
+    # Duplicated bibs will automatically be removed by ADS..! Wow!
+    # Copy, so that the caller's (or the default) dict is not polluted.
+    options = dict(options)
+    options.update({"bibcode": list(bibcodes)})
+
+    if fmt not in ["ads", "bibtex", "bibtexabs", "endnote", "medlars",
+                   "procite", "refworks", "ris", "aastex", "icarus", "mnras",
+                   "soph", "dcxml", "refxml", "refabsxml", "rss", "votable"]:
+        options.update({"format": fmt})
+        fmt = "custom"
+    return str(url) + str(fmt), json.dumps(options)
+
+
+def _export_result(res):
+    """The exported text from the JSON response `res` of ADS."""
+    try:
+        return res["export"]
+    except KeyError:
+        raise ValueError("Error in ADS API query. Check your token..? See:", res)
+
+
+def _export_chunks(bibcodes, fmt, chunksize):
+    """Split `bibcodes` into the chunks exported by each request."""
+    bibcodes = list(bibcodes)
+    if (not chunksize or len(bibcodes) <= chunksize or fmt in XML_FORMATS):
+        return [bibcodes]
+    return [bibcodes[i:i + chunksize] for i in range(0, len(bibcodes), chunksize)]
+
+
+def _join_chunks(texts, fmt):
+    """Concatenate the exported texts of the chunks (in order)."""
+    texts = list(texts)
+    # The records of neighboring chunks are separated as within a chunk: by
+    # a blank line for the tagged formats, by a line break otherwise (e.g.,
+    # aastex, custom). It is added only where missing.
+    end = "\n\n" if fmt in TAGGED_FORMATS else "\n"
+    return "".join([text if not text or text.endswith(end) else text.rstrip("\n") + end
+                    for text in texts[:-1]] + texts[-1:])
+
+
+def _join_records(bibcodes, records):
+    """Concatenate ``{bibcode: text}`` in the order of `bibcodes`."""
+    records = dict(records)
+    # Entries ADS returned under another key (if any) go to the end.
+    return "".join([records.pop(b) for b in bibcodes if b in records]
+                   + list(records.values()))
+
+
+def _export_chunk(client, bibcodes, options, fmt, url):
+    url, data = _export_request(bibcodes, options, fmt, url)
+    return _export_result(client.post(url, data=data).json())
+
+
+def _export(client, bibcodes, options, fmt, url, chunksize=2000, max_workers=4):
+    """Export `bibcodes` from ADS without any post-processing.
+
+    The bibcodes are exported in chunks of `chunksize` by at most
+    `max_workers` concurrent requests, and the outputs are concatenated in
+    the order of the chunks. XML formats are never chunked.
+    """
+    chunks = _export_chunks(bibcodes, fmt, chunksize)
+    if len(chunks) == 1:
+        return _export_chunk(client, chunks[0], options, fmt, url)
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+        return _join_chunks(pool.map(
+            lambda chunk: _export_chunk(client, chunk, options, fmt, url), chunks
+        ), fmt)
+
+
 def query_ads(bibcodes, token, options=dict(sort="date asc"), fmt="bibtex",
-              journalname="ads", url="https://api.adsabs.harvard.edu/v1/export/"):
-    """Query ADS API and return the response.
+              journalname="ads", url="https://api.adsabs.harvard.edu/v1/export/",
+              cache=None, chunksize=2000, max_workers=4, client=None, accents="keep"):
+    """Query ADS API and return the exported text.
 
     Parameters
     ----------
@@ -220,38 +691,147 @@ def query_ads(bibcodes, token, options=dict(sort="date asc"), fmt="bibtex",
         of ADS (e.g., r"\aj" for the "Astronomical Journal"). Other options
         implemented are "full", which uses the full journal name (e.g.,
         "Astronomical Journal").
+    accents : str, optional
+        Whether to decode the TeX accents (e.g., ``{\\"o}``) of the fields:
+        ``"keep"`` (default), ``"utf8"`` (e.g., ``ö``) or ``"ascii"`` (e.g.,
+        ``o``). Applied with the journal names in the same scan (see
+        `change_journal_name`).
+    cache : `~ads2bibtex.ExportCache`, optional
+        If given (and `fmt` is one of `SPLITTABLE_FORMATS`), the records are
+        taken from the cache and only the missing bibcodes are exported from
+        ADS. Then the entries are in the order of `bibcodes` (give them
+        already sorted), not sorted by ADS.
+    chunksize : int, optional
+        Maximum number of bibcodes per export request, by default 2000 (the
+        maximum number of records ADS exports at once). Set to `None` to
+        send all the bibcodes in one request. XML formats are never chunked.
+    max_workers : int, optional
+        Maximum number of concurrent export requests, by default 4.
+    client : `ADSClient`, optional
+        The client to send the requests. By default, a client shared by all
+        the queries with the same `token` is used.
+
+    Note
+    ----
+    Each chunk is sorted by ADS, and the chunks are concatenated in the order
+    of `bibcodes`. Thus, the whole output is sorted only if `bibcodes` is
+    already sorted in the same way (e.g., ``query_lib(..., sort=...)``).
 
     Returns
     -------
-    response : dict
-        Response from ADS API.
+    text : str
+        The exported records (the ``"export"`` of the responses of ADS API,
+        concatenated), with the journal names and accents changed as
+        `journalname` and `accents`.
     """
-    # Duplicated bibs will automatically be removed by ADS..! Wow!
-    options.update({"bibcode": bibcodes})
+    client = _get_client(token, client)
+    if cache is None or fmt not in SPLITTABLE_FORMATS:
+        raw = _export(client, bibcodes, options, fmt, url, chunksize, max_workers)
+        return change_journal_name(raw, journalname=journalname, accents=accents)
 
-    if fmt not in ["ads", "bibtex", "bibtexabs", "endnote", "medlars",
-                   "procite", "refworks", "ris", "aastex", "icarus", "mnras",
-                   "soph", "dcxml", "refxml", "refabsxml", "rss", "votable"]:
-        options.update({"format": fmt})
-        fmt = "custom"
+    records = cache.get_many(bibcodes, fmt, options)
+    misses = [b for b in dict.fromkeys(bibcodes) if b not in records]
+    if misses:
+        fetched = split_entries(_export(client, misses, options, fmt, url,
+                                        chunksize, max_workers))
+        cache.put_many(fetched, fmt, options)
+        records.update(fetched)
+    return change_journal_name(_join_records(bibcodes, records),
+                               journalname=journalname, accents=accents)
+
+
+def _lib_page_params(start, rows, sort):
+    params = {"start": start, "rows": rows}
+    if sort is not None:
+        params["sort"] = sort
+    return params
+
+
+def _lib_page_result(res):
+    """``(metadata, documents)`` from the JSON response `res` of ADS."""
+    try:
+        return res["metadata"], res["documents"]
+    except KeyError:
+        raise ValueError("Error in ADS API query. Check your token..? See:", res)
+
+
+def _query_lib_page(client, library_id, start, rows, sort, url):
+    r = client.get(str(url) + library_id, params=_lib_page_params(start, rows, sort),
+                   conditional=True)
+    return _lib_page_result(r.json())
 
-    r = requests.post(
-        str(url) + str(fmt),
-        headers={"Authorization": "Bearer " + token,
-                 "Content-type": "application/json"},
-        data=json.dumps(options)
-    )
 
+def query_lib_meta(library_id, token,
+                   url="https://api.adsabs.harvard.edu/v1/biblib/libraries/",
+                   client=None):
+    """Query only the metadata of an ADS Library (cheap change detection).
+
+    The document list is not requested (``rows=0``), and the request is
+    conditional (``If-None-Match``/``If-Modified-Since``), so that polling a
+    large library costs a few hundred bytes instead of the whole listing.
+
+    Parameters
+    ----------
+    library_id, token, url, client :
+        Same as `query_lib`.
+
+    Returns
+    -------
+    metadata : dict
+        The metadata of the library, e.g., ``metadata["date_last_modified"]``,
+        ``metadata["name"]``, ``metadata["num_documents"]``.
+    """
+    client = _get_client(token, client)
+    r = client.get(str(url) + library_id, params={"rows": 0}, conditional=True)
     try:
-        raw = r.json()["export"]
+        return r.json()["metadata"]
     except KeyError:
         raise ValueError("Error in ADS API query. Check your token..? See:", r.json())
 
-    return change_journal_name(raw, journalname=journalname)
 
+def _iter_lib_pages(library_id, token, sort=None, rows=10000, max_workers=1,
+                    url="https://api.adsabs.harvard.edu/v1/biblib/libraries/",
+                    client=None):
+    """Yield ``(metadata, documents)`` of each page of the library, in order."""
+    client = _get_client(token, client)
+    meta, docs = _query_lib_page(client, library_id, 0, rows, sort, url)
+    yield meta, docs
+    try:
+        starts = range(rows, meta["num_documents"], rows)
+    except KeyError:  # unknown size: page until a short page is returned
+        start = rows
+        while len(docs) == rows:
+            meta, docs = _query_lib_page(client, library_id, start, rows, sort, url)
+            yield meta, docs
+            start += rows
+        return
 
-def query_lib(library_id, token, url="https://api.adsabs.harvard.edu/v1/biblib/libraries/"):
-    """Query ADS Library contents (upto 10000 rows hard-coded)
+    def _get(start):
+        return _query_lib_page(client, library_id, start, rows, sort, url)
+
+    if max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # map keeps the order of the pages.
+            yield from pool.map(_get, starts)
+    else:
+        yield from map(_get, starts)
+
+
+def iter_lib(library_id, token, sort=None, rows=10000, max_workers=1,
+             url="https://api.adsabs.harvard.edu/v1/biblib/libraries/", client=None):
+    """Yield the bibcodes of an ADS Library while paging through it.
+
+    Parameters are the same as `query_lib`. Useful to start processing the
+    bibcodes before the whole listing of a large library is downloaded.
+    """
+    for _, docs in _iter_lib_pages(library_id, token, sort=sort, rows=rows,
+                                   max_workers=max_workers, url=url, client=client):
+        yield from docs
+
+
+def query_lib(library_id, token, sort=None, rows=10000, max_workers=1,
+              url="https://api.adsabs.harvard.edu/v1/biblib/libraries/", client=None):
+    """Query ADS Library contents, paging through the whole library.
 
     Parameters
     ----------
@@ -259,69 +839,198 @@ def query_lib(library_id, token, url="https://api.adsabs.harvard.edu/v1/biblib/l
         The library id to query.
     token : str
         ADS API token.
+    sort : str, optional
+        Sort option for the documents (e.g., ``"date asc"``), same syntax as
+        the ``sort`` option of `query_ads`. If `None` (default), the ADS
+        default order is used.
+    rows : int, optional
+        Number of bibcodes per page (request), by default 10000. Note that
+        each page counts toward the daily ADS API limit.
+    max_workers : int, optional
+        Number of pages fetched concurrently (over one pooled session) after
+        the first page, by default 1.
     url : str, optional
         ADS API URL, by default
         ``"https://api.adsabs.harvard.edu/v1/biblib/libraries/"``.
+    client : `ADSClient`, optional
+        The client to send the requests. By default, a client shared by all
+        the queries with the same `token` is used.
 
     Returns
     -------
     documents : list of bibcode(str)
         Response from ADS API.
+    last_modified : str
+        The ``date_last_modified`` of the library.
+    name : str
+        ``"ADS Library: <name of the library>"``.
+    """
+    documents = []
+    for meta, docs in _iter_lib_pages(library_id, token, sort=sort, rows=rows,
+                                      max_workers=max_workers, url=url,
+                                      client=client):
+        documents.extend(docs)
+    return (documents, meta["date_last_modified"],
+            "ADS Library: " + meta["name"])
+
+
+# The umask is read (set and restored) once, at import: `os.umask` changes it
+# for the whole process, while `write_output` runs in threads (e.g., `aio`).
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def write_output(fname, contents):
+    """Write `contents` to `fname` atomically, only if it changed.
+
+    The contents are written to a temporary file in the same directory,
+    flushed to the disk, and renamed to `fname`, so that a LaTeX build or an
+    editor watching the file never sees partial contents. Nothing is written
+    (and the modification time is kept, e.g., for latexmk) if the file
+    already has the same contents.
+
+    Parameters
+    ----------
+    fname : path-like
+        The output file name.
+    contents : str or list of str
+        The contents to be written.
+
+    Returns
+    -------
+    written : bool
+        Whether the file was (re-)written.
     """
-    r = requests.get(
-        str(url) + library_id + "?rows=10000",
-        headers={"Authorization": "Bearer " + token,
-                 "Content-type": "application/json"},
-    )
+    if not isinstance(contents, str):
+        contents = "".join(contents)
+    data = contents.encode("utf-8")
+    fname = Path(fname)
     try:
-        _res = r.json()
-        meta = _res["metadata"]
-        return (_res["documents"], meta["date_last_modified"],
-                "ADS Library: " + meta["name"])
-    except KeyError:
-        raise ValueError("Error in ADS API query. Check your token..? See:", r.json())
+        if fname.stat().st_size == len(data) and fname.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+
+    fd, tmpname = tempfile.mkstemp(dir=fname.parent, prefix=f".{fname.name}.",
+                                   suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as ff:
+            ff.write(data)
+            ff.flush()
+            os.fsync(ff.fileno())
+        try:  # keep the permission of the existing file
+            os.chmod(tmpname, fname.stat().st_mode)
+        except FileNotFoundError:
+            os.chmod(tmpname, 0o666 & ~_UMASK)
+        os.replace(tmpname, fname)
+    except BaseException:
+        try:
+            os.remove(tmpname)
+        except FileNotFoundError:
+            pass
+        raise
+    return True
+
+
+# The text before a closing brace (from the previous brace), e.g., a last name
+# (the lookbehind keeps the search linear).
+_LAST_NAMES = re.compile(r"(?<![^{}])[^{}]+(?=\})")
 
 
 def make_rawfile(bibtex_ads, rawfile):
-    bibs = []
-    auths = []
-    tits = []
-    for line in bibtex_ads.split("\n"):
-        line = line.strip()
-        if line.startswith("@"):
-            bib = line.split("{")[1].split(",")[0]
-            if len(bib) == 19:
-                bibs.append(bib)
-        elif line.startswith("author ="):
-            line = line.split(" = {")[1][:-2]
-            lasts = re.findall("[^{}]*(?=\})", line)
-            lasts = [_l for _l in lasts if _l]
-            if len(lasts) > 3:
-                auths.append(lasts[0] + f"+{len(lasts) - 1}")
-            elif len(lasts) > 1:  # 2 or 3
-                auths.append("+".join(lasts))
-            else:  # 1
-                auths.append(lasts[0])
-        elif line.startswith("title ="):
-            tits.append(line.split("{")[1][:-3])
-
-    with open(rawfile, "w+") as ff:
-        for bib, auth, tit in zip(bibs, auths, tits):
-            ff.write(f"{bib}  # {auth} || {tit}\n")
-
-
-def extract_cite_keys(texfile):
-    with open(texfile, "r") as ff:
-        contents = "".join(ff.readlines())
-
-    rx = re.compile(r'''(?<!\\)%.+|(\\(?:no)?citep?\{((?!\*)[^{}]+)\})''')
-    keys = []
-    for _m in rx.finditer(contents):
-        if _m.group(2):
-            _keys = _m.group(2).split(",")
-            for _key in _keys:
-                _key = _key.strip()
-                if _key[:4].isdigit() and len(_key) == 19:
-                    keys.append(_key)
-
-    return keys
+    lines = []
+    for entry in iter_entries(bibtex_ads, fields=("author", "title")):
+        if entry.key is None or len(entry.key) != 19:
+            continue
+        # The (braced) last names, e.g., ``{{Bach}, Yoonsoo P. and ...}``
+        lasts = _LAST_NAMES.findall(_split_value(entry.get("author", ""))[1])
+        if len(lasts) > 3:
+            auth = lasts[0] + f"+{len(lasts) - 1}"
+        else:  # 1, 2 or 3
+            auth = "+".join(lasts)
+        # A title may span lines.
+        tit = " ".join(_split_value(entry.get("title", ""))[1].split())
+        lines.append(f"{entry.key}  # {auth} || {tit}\n")
+
+    return write_output(rawfile, lines)
+
+
+# A comment, an \input-like command, or a citation command with its optional
+# arguments ([...] of natbib/biblatex, (...) of the biblatex multicite) and
+# its (first) key list: \cite, \citep, \citet, \citealt, \citeauthor,
+# \nocite, \autocite, \textcite, \parencite, \footcite, ... (and *-forms).
+_TEX_TOKEN = re.compile(
+    r"(?<!\\)%[^\n]*"
+    r"|\\(input|include|subfile)\s*\{([^{}]*)\}"
+    r"|\\([a-zA-Z]*cite[a-zA-Z]*)\*?"
+    r"(?:\s*(?:\[[^\[\]]*\]|\([^()]*\)))*\s*\{([^{}]*)\}"
+)
+# The other key lists of a multicite command (\cites, \autocites, ...).
+_TEX_MULTICITE_ARG = re.compile(r"(?:\s*\[[^\[\]]*\])*\s*\{([^{}]*)\}")
+
+
+def _is_bibcode(key):
+    return key[:4].isdigit() and len(key) == 19
+
+
+def _scan_tex(contents):
+    """The citation keys and the included files of a tex source, in order.
+
+    Returns a list of ``(key, None)`` and ``(None, included_name)``.
+    """
+    items = []
+    for _m in _TEX_TOKEN.finditer(contents):
+        if _m.group(2) is not None:
+            items.append((None, _m.group(2).strip()))
+        elif _m.group(3) is not None:
+            _args = [_m.group(4)]
+            if _m.group(3).endswith("cites"):  # multicite
+                _arg = _TEX_MULTICITE_ARG.match(contents, _m.end())
+                while _arg is not None:
+                    _args.append(_arg.group(1))
+                    _arg = _TEX_MULTICITE_ARG.match(contents, _arg.end())
+            for _arg in _args:
+                items.extend((_key.strip(), None) for _key in _arg.split(",")
+                             if _key.strip())
+    return items
+
+
+def _tex_include_path(name, root):
+    """The file of ``\\input{name}`` (relative to `root`, ``.tex`` added)."""
+    path = Path(root) / name
+    if path.suffix != ".tex" and (path.with_name(path.name + ".tex").exists()
+                                  or not path.exists()):
+        path = path.with_name(path.name + ".tex")
+    return path
+
+
+def extract_cite_keys(texfile, follow_includes=True):
+    """The bibcodes cited in a tex file, in the order of the first citation.
+
+    Parameters
+    ----------
+    texfile : path-like
+        The (main) tex file.
+    follow_includes : bool, optional
+        Whether to also read the files of ``\\input``, ``\\include`` and
+        ``\\subfile`` (relative to the directory of `texfile`), by default
+        `True`. See `~ads2bibtex.TexProject` to watch them.
+    """
+    root = Path(texfile).parent
+    keys = {}
+    seen = set()
+
+    def _extract(path):
+        seen.add(path.resolve())
+        with open(path, "r") as ff:
+            contents = ff.read()
+        for key, name in _scan_tex(contents):
+            if key is None:
+                _path = _tex_include_path(name, root)
+                if follow_includes and _path.exists() and _path.resolve() not in seen:
+                    _extract(_path)
+            elif _is_bibcode(key):
+                keys.setdefault(key)
+
+    _extract(Path(texfile))
+    return list(keys)
@@ -0,0 +1,303 @@
+import itertools
+import json
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+from .cache import AbbreviationCache, ExportCache
+from .core import (ADSClient, change_journal_name, query_ads, query_lib,
+                   query_lib_meta, split_entries, write_output)
+from .index import OutputIndex
+from .report import ChangeReport
+from .schedule import PollScheduler
+from .sync import LibrarySync
+from .watch import AdditionalFile
+
+__all__ = ["read_config", "SyncTarget", "SyncDaemon"]
+
+
+# Settings of each target, which can also be given at the top level of the
+# config file as the defaults of all the targets.
+TARGET_DEFAULTS = dict(journal="ads", accents="keep", format="bibtex",
+                       sort="date asc", additional_file=None, add_as_is=False,
+                       index_file=None)
+
+
+def read_config(fname):
+    """Reads the config file of the daemon (TOML, or JSON if ``*.json``).
+
+    Example (TOML)::
+
+        cache_dir = "~/.cache/ads2bibtex"  # "none" to disable
+        dtime = 5           # shortest poll interval (s)
+        max_dtime = 300     # longest poll interval (s)
+        daily_limit = 5000  # ADS API requests per 24 hours
+        journal = "iso4"    # default of all targets
+        iso4_processes = 4  # abbreviate many new journal names in parallel
+        accents = "utf8"    # decode TeX accents (default "keep")
+        events = "bib-events.jsonl"  # JSON change events (default "none")
+
+        [[target]]
+        library = "<library ID>"
+        output = "thesis/references.bib"
+        additional_file = "thesis/bib_add.txt"
+
+        [[target]]
+        library = "<another library ID>"
+        output = "paper1/references.bib"
+        journal = "ads"
+        format = "bibtex"
+        sort = "date asc"
+        add_as_is = false
+        index_file = "none"  # default ".references.bib.index.json" beside output
+    """
+    path = Path(fname)
+    if path.suffix.lower() == ".json":
+        with open(path, "r") as ff:
+            return json.load(ff)
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ImportError(
+                "Please install `tomli` package to read TOML config files "
+                + "(or use a JSON config file)."
+            )
+    with open(path, "rb") as ff:
+        return tomllib.load(ff)
+
+
+class SyncTarget:
+    """One library → output mapping of `SyncDaemon`.
+
+    Parameters
+    ----------
+    library : str
+        ADS Library ID.
+    output : path-like
+        Output file name.
+    journal, accents, format, sort : str, optional
+        Same as ``-j``, ``--accents``, ``-f``, ``-s`` of ``ads2bibtex``.
+    additional_file : path-like, optional
+        File with additional entries (``-a``).
+    add_as_is : bool, optional
+        Same as ``--add-as-is`` of ``ads2bibtex``.
+    index_file : path-like, optional
+        Same as ``--index-file`` of ``ads2bibtex`` (``"none"`` not to save
+        the `~ads2bibtex.OutputIndex`).
+    report : `~ads2bibtex.ChangeReport`, optional
+        Where the writes of the output are reported (by default, printed).
+    **kwargs :
+        Passed to `~ads2bibtex.LibrarySync` (e.g., `token`, `cache`,
+        `client`).
+    """
+
+    def __init__(self, library, output, journal="ads", accents="keep",
+                 format="bibtex", sort="date asc", additional_file=None,
+                 add_as_is=False, index_file=None, report=None, **kwargs):
+        self.library = library
+        self.output = Path(output).expanduser()
+        self.sort = sort
+        self.additional_file = additional_file
+        self.add_as_is = add_as_is
+        self.sync = LibrarySync(options=dict(sort=sort), fmt=format,
+                                journalname=journal, accents=accents, **kwargs)
+        self.additional = AdditionalFile(additional_file)
+        self.adds = None  # the raw content of the additional file
+        # The output is not written before the library is exported once
+        # (e.g., ADS is down at the start), not to drop the ADS entries.
+        self.synced = False
+        self.save_index = index_file != "none"
+        self.index = OutputIndex(self.output, path=index_file if self.save_index else None)
+        self.report = ChangeReport() if report is None else report
+
+    @property
+    def export_key(self):
+        """Targets with the same key share the exported records."""
+        return (self.sync.fmt, self.sync.journalname, self.sync.accents)
+
+    def read_additional(self):
+        """Re-read the additional file if it changed. Returns whether it did."""
+        keys = self.additional.keys
+        changed = self.additional.update() or self.adds is None
+        if changed and self.adds is not None:
+            self.report.compare(self.additional_file, self.additional.keys, keys,
+                                updated=True)
+        self.adds = self.additional.text
+        return changed
+
+    def write(self):
+        """Write the output (only if it changed). Returns whether written.
+
+        Nothing is written until `sync` is updated once (`synced`).
+        """
+        if not self.synced:
+            return False
+        if self.add_as_is:
+            adds = self.adds
+        else:
+            adds = change_journal_name(self.adds, journalname=self.sync.journalname,
+                                       accents=self.sync.accents)
+        changes = self.index.update([("ads", self.sync.text), ("additional", adds)])
+        warning = self.index.duplicate_warning()
+        if warning is not None:
+            print(warning)
+        written = write_output(self.output, self.sync.text + adds)
+        if written:
+            self.report.written(self.output, *changes)
+        if self.save_index:
+            self.index.save()
+        return written
+
+
+class SyncDaemon:
+    """Keep several library → output mappings in sync from one process.
+
+    All the targets share one `~ads2bibtex.ADSClient` (connection pool), one
+    `~ads2bibtex.ExportCache` and one `~ads2bibtex.PollScheduler` (quota
+    budget). Each library is polled once per iteration even if it is mapped
+    to several outputs, and a bibcode newly added to several libraries is
+    exported only once for all the targets with the same format, journal
+    name style and accents.
+
+    Parameters
+    ----------
+    config : dict
+        The config (see `read_config`).
+    token : str
+        ADS API token.
+    """
+
+    def __init__(self, config, token):
+        config = dict(config)
+        targets = config.pop("target", [])
+        if not targets:
+            raise ValueError("No [[target]] is given in the config.")
+        self.client = ADSClient(token)
+        cache_dir = config.get("cache_dir", None)
+        if cache_dir == "none":
+            self.cache = None
+        else:
+            if cache_dir is not None:
+                cache_dir = Path(cache_dir).expanduser()
+            self.cache = ExportCache(cache_dir, ttl=config.get("cache_ttl", 7)*86400)
+        self.scheduler = PollScheduler(dtime=config.get("dtime", 5),
+                                       max_dtime=config.get("max_dtime", 300),
+                                       daily_limit=config.get("daily_limit", 5000))
+        defaults = {k: config.get(k, v) for k, v in TARGET_DEFAULTS.items()}
+        self.token = token
+        self.export_kw = dict(token=token, cache=self.cache, client=self.client,
+                              chunksize=config.get("chunk_size", 2000),
+                              max_workers=config.get("workers", 4))
+        events = config.get("events", "none")
+        self.report = ChangeReport(max_items=config.get("show_keys", 20),
+                                   events=None if events == "none" else
+                                   Path(events).expanduser())
+        self.targets = [SyncTarget(**{**defaults, **target}, report=self.report,
+                                   **self.export_kw)
+                        for target in targets]
+        self.last_modified = {}  # library ID -> date_last_modified
+        if any(t.sync.journalname == "iso4" for t in self.targets):
+            from .iso4 import set_abbreviation_cache, set_abbreviation_workers
+            if self.cache is not None:
+                set_abbreviation_cache(AbbreviationCache(self.cache.cache_dir))
+            set_abbreviation_workers(config.get("iso4_processes", 1))
+
+    def _changed_libraries(self):
+        """Libraries (IDs) whose date_last_modified changed since the last poll."""
+        changed = []
+        for library in dict.fromkeys(t.library for t in self.targets):
+            try:
+                meta = query_lib_meta(library, token=self.token, client=self.client)
+            except (ValueError, requests.RequestException) as e:
+                print(f"[WARNING] Query of library {library} failed "
+                      + f"({datetime.now()}): {e}")
+                continue
+            if meta["date_last_modified"] != self.last_modified.get(library):
+                self.last_modified[library] = meta["date_last_modified"]
+                changed.append(library)
+        return changed
+
+    def poll(self, local=False):
+        """Poll all the libraries and additional files once, update outputs.
+
+        If `local`, only the additional files are checked (the libraries are
+        not queried). Returns whether any output was updated.
+        """
+        changed_libs = [] if local else self._changed_libraries()
+        listings = {}  # (library, sort) -> bibcodes
+        for target in self.targets:
+            key = (target.library, target.sort)
+            if target.library in changed_libs and key not in listings:
+                try:
+                    listings[key], _, _ = query_lib(target.library, token=self.token,
+                                                    sort=target.sort, client=self.client)
+                except (ValueError, requests.RequestException) as e:
+                    print(f"[WARNING] Query of library {target.library} failed "
+                          + f"({datetime.now()}): {e}")
+                    self.last_modified.pop(target.library, None)  # retry next time
+
+        # Export the bibcodes missing in any target only once per export_key.
+        missing = {}
+        for target in self.targets:
+            bibcodes = listings.get((target.library, target.sort))
+            if bibcodes is not None and target.sync.splittable:
+                missing.setdefault(target.export_key, {}).update(
+                    dict.fromkeys(target.sync.missing(bibcodes))
+                )
+        fetched = {}
+        failed = set()  # the export_keys of which the export failed
+        for (fmt, journalname, accents), bibcodes in missing.items():
+            if bibcodes:
+                try:
+                    text = query_ads(list(bibcodes), options={}, fmt=fmt,
+                                     journalname=journalname, accents=accents,
+                                     **self.export_kw)
+                except (ValueError, requests.RequestException) as e:
+                    print(f"[WARNING] Export failed ({datetime.now()}): {e}")
+                    failed.add((fmt, journalname, accents))
+                    continue
+                fetched[(fmt, journalname, accents)] = split_entries(text)
+
+        updated = False
+        for target in self.targets:
+            changed = target.read_additional()
+            bibcodes = listings.get((target.library, target.sort))
+            if bibcodes is not None and target.export_key in failed:
+                bibcodes = None
+                self.last_modified.pop(target.library, None)  # retry next time
+            if bibcodes is not None:
+                try:
+                    added, deleted = target.sync.update(
+                        bibcodes, fetched=fetched.get(target.export_key)
+                    )
+                except (ValueError, requests.RequestException) as e:
+                    print(f"[WARNING] Export for {target.output} failed "
+                          + f"({datetime.now()}): {e}")
+                    self.last_modified.pop(target.library, None)  # retry next time
+                else:
+                    changed = changed or bool(added or deleted) or not target.synced
+                    target.synced = True
+                    if added or deleted:
+                        self.report.changed(f"{target.library} → {target.output}",
+                                            len(bibcodes), added, deleted)
+            if changed or not target.output.exists():
+                updated = target.write() or updated
+        return updated
+
+    def run(self, num_iter=0, info_interval=20):
+        """Poll until `num_iter` iterations (0 to run indefinitely)."""
+        iterations = itertools.count() if num_iter <= 0 else range(num_iter)
+        watchers = [t.additional.watcher for t in self.targets]
+        local = False  # whether woken up by a change of an additional file
+        for i in iterations:
+            updated = self.poll(local=local)
+            if not local:
+                self.scheduler.update(self.client, changed=updated)
+            if (i > 0) and (i % info_interval == 0):
+                print(f"[INFORMATION] Iteration: {i} reached. {self.scheduler.info()}")
+            # Edits of the additional files are written right away.
+            local = self.scheduler.wait(watchers)
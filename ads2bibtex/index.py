@@ -0,0 +1,206 @@
+import hashlib
+import json
+from collections import namedtuple
+from pathlib import Path
+
+from .bibtex import _reparse
+from .core import write_output
+
+__all__ = ["IndexEntry", "OutputIndex", "index_path", "read_index"]
+
+
+IndexEntry = namedtuple("IndexEntry", ["key", "start", "end", "hash", "origin"])
+IndexEntry.__doc__ = """An entry of the output in `OutputIndex`.
+
+`key` is the citation key (the bibcode for the entries from ADS), and
+``[start, end)`` is the byte range of the entry (from ``@`` to its closing
+delimiter) in the output file. `hash` is the BLAKE2b digest (hex) of these
+bytes, and `origin` is the part of the output the entry comes from (e.g.,
+``"ads"`` or ``"additional"``)."""
+
+_VERSION = 1
+
+
+def index_path(output):
+    """The default index file of `output` (``.<name>.index.json`` beside it)."""
+    output = Path(output)
+    return output.with_name(f".{output.name}.index.json")
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class _Part:
+    """The entries of one part of the output (in bytes), re-parsed where changed."""
+
+    def __init__(self):
+        self.text = ""
+        self.data = b""
+        self.spans = []  # (start, end, citation key) in `data`
+        self.strays = []  # "@" outside the entries
+        self.hashes = []  # of each span
+
+    def update(self, text):
+        if text == self.text:  # (not even encoded)
+            return
+        data = text.encode("utf-8")
+        spans, self.strays, parsed = _reparse(self.data, data, self.spans, self.strays)
+        n_after = len(spans) - parsed.stop  # (kept from the old spans)
+        self.hashes = (self.hashes[:parsed.start]
+                       + [_digest(data[s:e]) for s, e, _ in spans[parsed.start:parsed.stop]]
+                       + self.hashes[len(self.hashes) - n_after:])
+        self.spans = spans
+        self.text = text
+        self.data = data
+
+
+class OutputIndex:
+    """Index of the entries of an output file, kept up to date with it.
+
+    The output is given as its parts (e.g., the ADS export and the additional
+    entries), each of which is re-parsed (and hashed) only around where it
+    changed since the last `update`, so that an update costs as much as the
+    change. The index finds the citation keys which appear more than once
+    (BibTeX uses the first one and warns about the others), and tells the
+    entries added, deleted or changed. It can be saved beside the output
+    (`save`) for other tools (`read_index`).
+
+    Parameters
+    ----------
+    output : path-like
+        The output file.
+    path : path-like, optional
+        The index file, by default ``.<name>.index.json`` beside `output`
+        (see `index_path`).
+
+    Attributes
+    ----------
+    entries : list of `IndexEntry`
+        The entries with a citation key, in the order of the output.
+    size : int
+        The size of the output in bytes.
+    duplicates : dict
+        ``{key: [origin, ...]}`` of the citation keys found more than once.
+    """
+
+    def __init__(self, output, path=None):
+        self.output = Path(output)
+        self.path = index_path(self.output) if path is None else Path(path)
+        self.entries = []
+        self.size = 0
+        self.duplicates = {}
+        self._parts = {}  # origin -> _Part
+        self._keys = {}  # key -> the first IndexEntry
+        self._new_duplicates = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def get(self, key, default=None):
+        """The (first) `IndexEntry` of the citation key `key`."""
+        return self._keys.get(key, default)
+
+    def update(self, parts):
+        """Re-index the output made of `parts`.
+
+        Parameters
+        ----------
+        parts : list of (str, str)
+            The ``(origin, text)`` of the parts, in the order they are written
+            to the output (i.e., the output is ``"".join(texts)``).
+
+        Returns
+        -------
+        added, deleted, changed : list of str
+            The citation keys added, deleted, or whose (first) entry changed
+            since the last update.
+        """
+        entries = []
+        base = 0
+        for origin, text in parts:
+            part = self._parts.setdefault(origin, _Part())
+            part.update(text)
+            entries.extend(IndexEntry(key, base + s, base + e, digest, origin)
+                           for (s, e, key), digest in zip(part.spans, part.hashes)
+                           if key is not None)
+            base += len(part.data)
+        for origin in set(self._parts) - {origin for origin, _ in parts}:
+            del self._parts[origin]
+
+        keys = {}
+        duplicates = {}
+        for entry in entries:
+            first = keys.setdefault(entry.key, entry)
+            if first is not entry:
+                duplicates.setdefault(entry.key, [first.origin]).append(entry.origin)
+        old = self._keys
+        added = [key for key in keys if key not in old]
+        deleted = [key for key in old if key not in keys]
+        changed = [key for key, entry in keys.items() if key in old
+                   and (entry.hash, entry.origin) != (old[key].hash, old[key].origin)]
+        self._new_duplicates = [key for key in duplicates if key not in self.duplicates]
+        self.entries = entries
+        self.size = base
+        self.duplicates = duplicates
+        self._keys = keys
+        return added, deleted, changed
+
+    def duplicate_warning(self):
+        """The warning about the keys duplicated by the last `update` (or `None`)."""
+        if not self._new_duplicates:
+            return None
+        dups = ", ".join(f"{key} ({' & '.join(self.duplicates[key])})"
+                         for key in self._new_duplicates)
+        return (f"[WARNING] Duplicate citation keys in {self.output} "
+                + f"(only the first one is used): {dups}")
+
+    def save(self):
+        """Write the index to `path` (only if it changed). Returns whether written."""
+        index = dict(version=_VERSION, output=self.output.name, size=self.size,
+                     fields=list(IndexEntry._fields),
+                     entries=[list(entry) for entry in self.entries],
+                     duplicates=self.duplicates)
+        return write_output(self.path, json.dumps(index, separators=(",", ":")))
+
+
+def read_index(output, path=None):
+    """Read the index of `output` saved by `OutputIndex`.
+
+    Parameters
+    ----------
+    output : path-like
+        The output file.
+    path : path-like, optional
+        The index file, by default `index_path` of `output`.
+
+    Returns
+    -------
+    entries : dict
+        ``{key: IndexEntry}`` of the first entry of each citation key.
+
+    Raises
+    ------
+    ValueError
+        If the index is not the one of the current `output` (e.g., the output
+        was edited by hand since).
+
+    Examples
+    --------
+    >>> entry = read_index("references.bib")["2019ApJ...882..150M"]
+    >>> with open("references.bib", "rb") as ff:
+    ...     ff.seek(entry.start)
+    ...     text = ff.read(entry.end - entry.start).decode("utf-8")
+    """
+    output = Path(output)
+    with open(index_path(output) if path is None else path, "r") as ff:
+        index = json.load(ff)
+    if index.get("version") != _VERSION or index["size"] != output.stat().st_size:
+        raise ValueError(f"The index of {output} is out of date.")
+    entries = {}
+    for entry in index["entries"]:
+        entries.setdefault(entry[0], IndexEntry(*entry))
+    return entries
@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 # -*- coding: UTF-8 -*-
-from .abbreviate import abbreviate
-import nltk
-
-nltk.download("wordnet")
+from .abbreviate import (abbreviate, abbreviate_many, build_ltwa_index, ltwa_signature,
+                         set_lemmatizer)
+from .memo import (abbreviate_memo, abbreviate_titles, memo_clear, memo_info,
+                   set_abbreviation_cache, set_abbreviation_workers)
@@ -2,18 +2,20 @@
 # -*- coding: utf-8 -*-
 
 import csv
-import json
 import os
 import string
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor
 
 import regex as re
-from nltk.stem.wordnet import WordNetLemmatizer
 
-WNL = WordNetLemmatizer()
+from .index import LTWAIndex, write_index
+from .lemma import derive_lemmas, get_lemmatizer
+from .lookup import InfixAutomaton
 
 
-__all__ = ["abbreviate"]
+__all__ = ["abbreviate", "abbreviate_many", "build_ltwa_index", "set_lemmatizer",
+           "ltwa_signature"]
 
 def abbreviate(title, periods=True, disambiguation_langs=set()):
     """
@@ -37,103 +39,133 @@ def abbreviate(title, periods=True, disambiguation_langs=set()):
         (str) abbreviated title
     """
 
+    if TOKENIZER_REGEX is None:
+        # Loaded at the first call, not at import.
+        __initialize_ltwa()
+
     title = unicodedata.normalize('NFKD', title)
 
     disambiguation_langs = set(disambiguation_langs)
 
     # split title either at space, or any words in mapping with spaces
-    title_words = list(filter(lambda w: w.strip(), TOKENIZER_REGEX.split(title)))
-
-    result = []
+    title_words = __tokenize(title)
 
     # Exception for single-word titles
     if len(title_words) == 1 and len(title_words[0].split(' ')) == 1:
         return title
 
+    return __abbreviate_words(title_words, periods,
+                              lambda word_norm: __resolve_word(word_norm, disambiguation_langs))
+
+
+def abbreviate_many(titles, periods=True, disambiguation_langs=set(),
+                    processes=None, chunksize=2000):
+    """
+    Abbreviate many titles per ISO 4 / CIEPS LTWA.
+
+    Same as `abbreviate` for each title, but the duplicate titles are
+    abbreviated once, all the titles are tokenized first, and each distinct
+    word is looked up in the LTWA only once.
+
+    Inputs:
+        (iterable of str) titles
+            Titles to be abbreviated.
+        (bool) periods, (iterable) disambiguation_langs
+            See `abbreviate`.
+        (int) processes
+            Number of worker processes (None or 1: none). Used only if there
+            are more than `chunksize` distinct titles, which are then split
+            evenly into chunks of at most `chunksize` (at least one chunk per
+            worker). The LTWA index is memory-mapped, so that the workers
+            share its pages (and, if forked, the loaded tables).
+        (int) chunksize
+            Default 2000.
+    Output:
+        (list) abbreviated titles in the input order (None for the failed ones)
+        (dict) {title: Exception} of the failed titles (e.g. ambiguous words),
+            instead of raising at the first one
+    """
+    if TOKENIZER_REGEX is None:
+        __initialize_ltwa()
+
+    titles = list(titles)
+    unique = list(dict.fromkeys(titles))
+    langs = set(disambiguation_langs)
+    if processes not in (None, 1) and len(unique) > chunksize:
+        n_chunks = max(-(-len(unique) // chunksize), processes)
+        size = -(-len(unique) // n_chunks)
+        chunks = [unique[i:i + size] for i in range(0, len(unique), size)]
+        abbrs, errors = {}, {}
+        with ProcessPoolExecutor(max_workers=processes, initializer=set_lemmatizer,
+                                 initargs=(LEMMATIZER_BACKEND,)) as pool:
+            futures = [pool.submit(_abbreviate_unique, chunk, periods, langs)
+                       for chunk in chunks]
+            for future in futures:
+                chunk_abbrs, chunk_errors = future.result()
+                abbrs.update(chunk_abbrs)
+                errors.update(chunk_errors)
+    else:
+        abbrs, errors = _abbreviate_unique(unique, periods, langs)
+    return [abbrs.get(title) for title in titles], errors
+
+
+def _abbreviate_unique(titles, periods, disambiguation_langs):
+    """`abbreviate_many` of distinct titles, as ({title: abbr}, {title: error})."""
+    if TOKENIZER_REGEX is None:  # in a worker process
+        __initialize_ltwa()
+
+    # tokenize all, then look up each distinct word once
+    normalized = {title: unicodedata.normalize('NFKD', title) for title in titles}
+    tokenized = {title: __tokenize(norm) for title, norm in normalized.items()}
+    normalized_words, resolved = {}, {}
+    for title_words in tokenized.values():
+        for orig_word in title_words:
+            if orig_word in normalized_words:
+                continue
+            word_norm = normalized_words[orig_word] = __normalize_word(orig_word)
+            if word_norm not in resolved:
+                try:
+                    resolved[word_norm] = __resolve_word(word_norm, disambiguation_langs)
+                except Exception as e:
+                    resolved[word_norm] = e
+
+    def resolve(word_norm):
+        found = resolved[word_norm]
+        if isinstance(found, Exception):
+            raise found
+        return found
+
+    abbrs, errors = {}, {}
+    for title, title_words in tokenized.items():
+        # Exception for single-word titles
+        if len(title_words) == 1 and len(title_words[0].split(' ')) == 1:
+            abbrs[title] = normalized[title]
+            continue
+        try:
+            abbrs[title] = __abbreviate_words(title_words, periods, resolve,
+                                              normalized_words.__getitem__)
+        except Exception as e:
+            errors[title] = e
+    return abbrs, errors
+
+
+def __abbreviate_words(title_words, periods, resolve, normalize=None):
+    """Abbreviate the tokens, with `resolve(word_norm)` -> (word, abbreviation)."""
+    normalize = __normalize_word if normalize is None else normalize
+    result = []
+
     for iw, orig_word in enumerate(title_words):
-        # normalize and lemmatize
-        word_norm = __normalize_word(orig_word)
+        # normalize
+        word_norm = normalize(orig_word)
 
         # stopword, skip
         if word_norm in STOPWORDS and not (
                 iw == len(title_words)-1 and word_norm in KEEP_AS_LAST):
             continue
 
-        # if normalized word fails, try lemma
-        word_lemma = WNL.lemmatize(word_norm)
-        word_candidates = (word_norm, word_lemma) if word_norm != word_lemma else (word_norm,)
-
-        word_abbr = ""
+        word, word_abbr = resolve(word_norm)
         capitalization = __get_capitalization(orig_word)
 
-        for word in word_candidates:
-            # first check for all possible conflicts
-            # full word conflicts
-            if FULLWORD in CONFLICT_MAP and word in CONFLICT_MAP[FULLWORD]:
-                allowed_langs = CONFLICT_MAP[FULLWORD][word].keys()
-                possible_langs = allowed_langs & disambiguation_langs
-                if len(possible_langs) == 1:
-                    word_abbr = CONFLICT_MAP[FULLWORD][word][possible_langs.pop()]
-                    break
-                else:
-                    raise Exception("Ambiguous word in title: {}; must disambiguate between langs: {}".format(word, ', '.join(sorted(allowed_langs))))
-            if not word_abbr and PREFIX in CONFLICT_MAP:
-                # prefix conflicts
-                for prefix in sorted(CONFLICT_MAP[PREFIX].keys()):
-                    if word.startswith(prefix):
-                        allowed_langs = CONFLICT_MAP[PREFIX][word].keys()
-                        possible_langs = allowed_langs & disambiguation_langs
-                        if len(possible_langs) == 1:
-                            word_abbr = CONFLICT_MAP[PREFIX][word][possible_langs.pop()]
-                        else:
-                            raise Exception("Ambiguous prefix ({}) in title word: {}; must disambiguate between langs: {}".format(prefix, word, ', '.join(sorted(allowed_langs))))
-            if not word_abbr and SUFFIX in CONFLICT_MAP:
-                # suffix conflicts
-                for suffix in sorted(CONFLICT_MAP[SUFFIX].keys()):
-                    if word.endswith(suffix):
-                        allowed_langs = CONFLICT_MAP[SUFFIX][word].keys()
-                        possible_langs = allowed_langs & disambiguation_langs
-                        if len(possible_langs) == 1:
-                            word_abbr = CONFLICT_MAP[SUFFIX][word][possible_langs.pop()]
-                        else:
-                            raise Exception("Ambiguous suffix ({}) in title word: {}; must disambiguate between langs: {}".format(suffix, word, ', '.join(sorted(allowed_langs))))
-            if not word_abbr and INFIX in CONFLICT_MAP:
-                # infix conflicts
-                for infix in sorted(CONFLICT_MAP[INFIX].keys()):
-                    if infix in word:
-                        allowed_langs = CONFLICT_MAP[INFIX][word].keys()
-                        possible_langs = allowed_langs & disambiguation_langs
-                        if len(possible_langs) == 1:
-                            word_abbr = CONFLICT_MAP[INFIX][word][possible_langs.pop()]
-                        else:
-                            raise Exception("Ambiguous infix ({}) in title word: {}; must disambiguate between langs: {}".format(infix, word, ', '.join(sorted(allowed_langs))))
-            if word_abbr: break
-            # done with conflict checks
-
-            # check full word list
-            if not word_abbr and FULLWORD in LTWA and word in LTWA[FULLWORD]:
-                word_abbr = LTWA[FULLWORD][word]
-                break
-            if not word_abbr and PREFIX in LTWA:
-                # check prefixes in descending length order
-                for prefix in sorted(LTWA[PREFIX].keys(), key=lambda p: (-len(p), p)):
-                    if word.startswith(prefix):
-                        word_abbr = LTWA[PREFIX][prefix]
-                        break
-            if not word_abbr and SUFFIX in LTWA:
-                # check suffixes in descending length order
-                for suffix in sorted(LTWA[SUFFIX].keys(), key=lambda p: (-len(p), p)):
-                    if word.endswith(suffix):
-                        word_abbr = LTWA[SUFFIX][suffix]
-                        break
-            if not word_abbr and INFIX in LTWA:
-                # check infixes in descending length order
-                for infix in sorted(LTWA[INFIX].keys(), key=lambda p: (-len(p), p)):
-                    if infix in word:
-                        word_abbr = LTWA[INFIX][infix]
-                        break
-            if word_abbr: break
-
         # done, finalize output with proper parameters
         if word_abbr in ("", NOT_ABBREVIATED):
             word_abbr = __finalize_output(word, capitalization, periods=False)
@@ -145,8 +177,76 @@ def abbreviate(title, periods=True, disambiguation_langs=set()):
     return unicodedata.normalize('NFKC', ' '.join(result))
 
 
-LTWA = {}
-LTWA_VERSION = "20210702"
+def __resolve_word(word_norm, disambiguation_langs):
+    """(word, abbreviation) of a normalized title word; the word is its lemma
+    if the lemma was tried, the abbreviation "" if nothing matched."""
+    # if normalized word fails, try lemma
+    word_lemma = LEMMATIZER.lemmatize(word_norm)
+    word_candidates = (word_norm, word_lemma) if word_norm != word_lemma else (word_norm,)
+
+    word_abbr = ""
+    for word in word_candidates:
+        # first check for all possible conflicts
+        # full word conflicts
+        if FULLWORD in CONFLICT_MAP and word in CONFLICT_MAP[FULLWORD]:
+            allowed_langs = CONFLICT_MAP[FULLWORD][word].keys()
+            possible_langs = allowed_langs & disambiguation_langs
+            if len(possible_langs) == 1:
+                word_abbr = CONFLICT_MAP[FULLWORD][word][possible_langs.pop()]
+                break
+            else:
+                raise Exception("Ambiguous word in title: {}; must disambiguate between langs: {}".format(word, ', '.join(sorted(allowed_langs))))
+        if not word_abbr and PREFIX in CONFLICT_MAP:
+            # prefix conflicts
+            for prefix in sorted(CONFLICT_MAP[PREFIX].keys()):
+                if word.startswith(prefix):
+                    allowed_langs = CONFLICT_MAP[PREFIX][word].keys()
+                    possible_langs = allowed_langs & disambiguation_langs
+                    if len(possible_langs) == 1:
+                        word_abbr = CONFLICT_MAP[PREFIX][word][possible_langs.pop()]
+                    else:
+                        raise Exception("Ambiguous prefix ({}) in title word: {}; must disambiguate between langs: {}".format(prefix, word, ', '.join(sorted(allowed_langs))))
+        if not word_abbr and SUFFIX in CONFLICT_MAP:
+            # suffix conflicts
+            for suffix in sorted(CONFLICT_MAP[SUFFIX].keys()):
+                if word.endswith(suffix):
+                    allowed_langs = CONFLICT_MAP[SUFFIX][word].keys()
+                    possible_langs = allowed_langs & disambiguation_langs
+                    if len(possible_langs) == 1:
+                        word_abbr = CONFLICT_MAP[SUFFIX][word][possible_langs.pop()]
+                    else:
+                        raise Exception("Ambiguous suffix ({}) in title word: {}; must disambiguate between langs: {}".format(suffix, word, ', '.join(sorted(allowed_langs))))
+        if not word_abbr and INFIX in CONFLICT_MAP:
+            # infix conflicts
+            for infix in sorted(CONFLICT_MAP[INFIX].keys()):
+                if infix in word:
+                    allowed_langs = CONFLICT_MAP[INFIX][word].keys()
+                    possible_langs = allowed_langs & disambiguation_langs
+                    if len(possible_langs) == 1:
+                        word_abbr = CONFLICT_MAP[INFIX][word][possible_langs.pop()]
+                    else:
+                        raise Exception("Ambiguous infix ({}) in title word: {}; must disambiguate between langs: {}".format(infix, word, ', '.join(sorted(allowed_langs))))
+        if word_abbr: break
+        # done with conflict checks
+
+        # check full word list
+        if not word_abbr and FULLWORD in LTWA and word in LTWA[FULLWORD]:
+            word_abbr = LTWA[FULLWORD][word]
+            break
+        # check the longest prefix, suffix, infix in this order
+        if not word_abbr:
+            word_abbr = LOOKUP[PREFIX].longest(word, "")
+        if not word_abbr:
+            word_abbr = LOOKUP[SUFFIX].longest(word, "")
+        if not word_abbr:
+            word_abbr = LOOKUP[INFIX].longest(word, "")
+        if word_abbr: break
+
+    return word, word_abbr
+
+
+LTWA = None  # the memory-mapped LTWAIndex, loaded at the first call
+LTWA_VERSION = "20210702"  # updated from the index when loaded
 
 NOT_ABBREVIATED = "n.a."
 
@@ -154,71 +254,128 @@ STOPWORDS = set([''])
 KEEP_AS_LAST = set([''])
 CONFLICT_MAP = {}
 MULTI_WORD_TERMS = []
+LOOKUP = {}  # longest-match lookup of prefixes, suffixes, infixes
 
 TOKENIZER_REGEX = None
+MULTI_WORD_FIRST = set()  # first words of MULTI_WORD_TERMS (lowercase)
 
-PREFIX, SUFFIX, INFIX, FULLWORD = 'psif'
+LEMMATIZER = None  # set at the first call (see `set_lemmatizer`)
+LEMMATIZER_BACKEND = "table"
 
-LABEL_LTWA, LABEL_MULTIWORD, LABEL_CONFLICT = 'lmc'
+PREFIX, SUFFIX, INFIX, FULLWORD = 'psif'
 
 LOWERCASE, UPPERCASE, TITLECASE = 'lut'
 
+PUNCT_REGEX = re.compile(r"(^\-|\p{P}+$)")
+
+INDEX_FILEPATH = os.path.join(os.path.dirname(__file__), "LTWA.idx")
+
+def build_ltwa_index(csv_filepath, version=None, index_path=INDEX_FILEPATH):
+    """
+    Build the LTWA index (see `index.write_index`) from the LTWA CSV.
+
+    Inputs:
+        (str) csv_filepath
+            The LTWA CSV file (``WORDS;ABBREVIATIONS;LANGUAGES``) as
+            released by the ISSN International Centre.
+        (str) version
+            The LTWA version, e.g. "20210702".
+            Default: the digits in the CSV file name (e.g. ``ltwa_20210702.csv``).
+        (str) index_path
+            Output file. Default: the index loaded by `abbreviate`.
+    Output:
+        (str) path of the index written
+    """
+    if version is None:
+        version = ''.join(filter(str.isdigit, os.path.basename(csv_filepath))) or "unknown"
+    ltwa, conflict_map, multi_word_terms = {}, {}, []
+    with open(csv_filepath, 'r', encoding='utf-8') as inf:
+        rows = [line for line in csv.reader(inf, delimiter=';')
+                if line and line[0].strip().upper() != "WORDS"]  # skip the header
+    # Make list of conflict words to gather information about on pass 2
+    conflict_words = set()
+    # Build LTWA dict
+    for word, abbr, langs in rows:
+        type = __get_type(word)
+        word = __normalize_word(word)
+        abbr = __normalize_abbr(abbr)
+        # Add type to dict if needed
+        if type not in ltwa:
+            ltwa[type] = {}
+        # Detect conflict words
+        if word in ltwa[type]:
+            conflict_words.add((type, word))
+        elif ' ' in word:
+            multi_word_terms.append(re.escape(word))
+        ltwa[type][word] = abbr
+    # Build conflict map
+    for type, word in conflict_words:
+        # remove from main list
+        ltwa[type].pop(word)
+    for word, abbr, langs in rows:
+        type = __get_type(word)
+        word = __normalize_word(word)
+        if (type, word) in conflict_words:
+            abbr = __normalize_abbr(abbr)
+            if type not in conflict_map:
+                conflict_map[type] = {}
+            if word not in conflict_map[type]:
+                conflict_map[type][word] = {}
+            for lang in langs.split(','):
+                conflict_map[type][word][lang.strip()] = abbr
+    # Plurals (for the lemmatizer) of the English/multilingual/Latin words
+    english = set(__normalize_word(word) for word, abbr, langs in rows
+                  if {'eng', 'mul', 'lat'} & set(l.strip() for l in langs.split(',')))
+    write_index(index_path, version, ltwa, conflict_map,
+                sorted(list(set(multi_word_terms))),
+                lemmas=derive_lemmas(ltwa, words=english))
+    return index_path
+
+def set_lemmatizer(backend="table"):
+    """
+    Set the lemmatizer used to find the singular of the title words.
+
+    Inputs:
+        (str) backend
+            "table" (default: the table bundled in the LTWA index, so that
+            the results do not depend on the environment), "wordnet" (of
+            `nltk`; its corpus must be installed, it is never downloaded),
+            "auto" (WordNet if available, the table otherwise) or "none".
+            See `lemma.get_lemmatizer`.
+            Alternatively, any object with a `lemmatize(word)` method.
+    """
+    global LEMMATIZER, LEMMATIZER_BACKEND
+    LEMMATIZER_BACKEND = backend  # (also given to the worker processes)
+    if isinstance(backend, str):
+        # resolved now if the LTWA is loaded, at the first call otherwise
+        LEMMATIZER = None if LTWA is None else get_lemmatizer(backend, LTWA.lemmas)
+    else:
+        LEMMATIZER = backend
+
+def ltwa_signature():
+    """
+    Identify what the results of `abbreviate` depend on.
+
+    Output:
+        (str) the LTWA version and the lemmatizer, e.g.
+            "LTWA 20210702, TableLemmatizer"
+    """
+    if TOKENIZER_REGEX is None:
+        __initialize_ltwa()
+    return "LTWA {}, {}".format(LTWA_VERSION, type(LEMMATIZER).__name__)
+
 def __initialize_ltwa():
-    global LTWA, CONFLICT_MAP, MULTI_WORD_TERMS, STOPWORDS, KEEP_AS_LAST, TOKENIZER_REGEX
-    json_filepath = os.path.join(os.path.dirname(__file__), "LTWA_{}.json".format(LTWA_VERSION))
-    try:
-        # Read JSON.
-        with open(json_filepath,'r') as inf:
-            inf_json = json.load(inf)
-            LTWA = inf_json[LABEL_LTWA]
-            MULTI_WORD_TERMS = inf_json[LABEL_MULTIWORD]
-            CONFLICT_MAP = inf_json[LABEL_CONFLICT]
-    except:
-        # Create JSON from CSV.
-        csv_filepath = os.path.join(os.path.dirname(__file__), "LTWA_{}.csv".format(LTWA_VERSION))
-        with open(csv_filepath,'r') as inf:
-            # Make list of conflict words to gather information about on pass 2
-            conflict_words = set()
-            csvfile = csv.reader(inf, delimiter=';')
-            # Build LTWA dict
-            for line in csvfile:
-                word, abbr, langs = line
-                type = __get_type(word)
-                word = __normalize_word(word)
-                abbr = __normalize_abbr(abbr)
-                # Add type to dict if needed
-                if type not in LTWA:
-                    LTWA[type] = {}
-                # Detect conflict words
-                if word in LTWA[type]:
-                    conflict_words.add((type, word))
-                elif ' ' in word:
-                    MULTI_WORD_TERMS.append(re.escape(word))
-                LTWA[type][word] = abbr
-            # Build conflict map
-            for type, word in conflict_words:
-                # remove from main list
-                LTWA[type].pop(word)
-            inf.seek(0)
-            for line in csvfile:
-                word, abbr, langs = line
-                type = __get_type(word)
-                word = __normalize_word(word)
-                if (type, word) in conflict_words:
-                    abbr = __normalize_abbr(abbr)
-                    if type not in CONFLICT_MAP:
-                        CONFLICT_MAP[type] = {}
-                    if word not in CONFLICT_MAP[type]:
-                        CONFLICT_MAP[type][word] = {}
-                    for lang in langs.split(','):
-                        CONFLICT_MAP[type][word][lang.strip()] = abbr
-        MULTI_WORD_TERMS = sorted(list(set(MULTI_WORD_TERMS)))
-        with open(json_filepath,'w') as outf:
-            json.dump({
-                          LABEL_LTWA : LTWA,
-                          LABEL_CONFLICT : CONFLICT_MAP,
-                          LABEL_MULTIWORD : MULTI_WORD_TERMS
-                      }, outf)
+    global LTWA, LTWA_VERSION, CONFLICT_MAP, MULTI_WORD_TERMS, STOPWORDS, KEEP_AS_LAST, TOKENIZER_REGEX, MULTI_WORD_FIRST, LOOKUP, LEMMATIZER
+    if not os.path.exists(INDEX_FILEPATH):
+        # Create the index from CSV.
+        csv_filepath = os.path.join(os.path.dirname(__file__), "ltwa_{}.csv".format(LTWA_VERSION))
+        build_ltwa_index(csv_filepath, LTWA_VERSION)
+    LTWA = LTWAIndex(INDEX_FILEPATH)
+    LTWA_VERSION = LTWA.version
+    MULTI_WORD_TERMS = LTWA.multi_word_terms
+    CONFLICT_MAP = LTWA.conflict_map
+    if LEMMATIZER is None:
+        LEMMATIZER = get_lemmatizer(LEMMATIZER_BACKEND, LTWA.lemmas)
 
     # Set of stopwords from txt
     sw_filepath = os.path.join(os.path.dirname(__file__), "stopwords.txt")
@@ -229,9 +386,28 @@ def __initialize_ltwa():
     with open(swkal_filepath,'r') as inf:
         KEEP_AS_LAST = set([unicodedata.normalize('NFKD', line.strip()) for line in inf.readlines()])
 
-    # Tokenizer regex from multi words
-    TOKENIZER_REGEX = re.compile("({}|\\s+)".format('|'.join(["(?:^|\\s){}(?:\\s|$)".format(w) for w in MULTI_WORD_TERMS])), flags=re.I)
+    # Longest-match lookup: the prefix/suffix tables are binary-searched in
+    # place, the few infixes go to an automaton.
+    LOOKUP = {PREFIX: LTWA[PREFIX],
+              SUFFIX: LTWA[SUFFIX],
+              INFIX: InfixAutomaton(dict(LTWA[INFIX].items()))}
 
+    # Tokenizer regex from multi words
+    MULTI_WORD_FIRST = set(re.sub(r"\\(.)", r"\1", w).split(' ')[0] for w in MULTI_WORD_TERMS)
+    # (one alternation of the terms, not one "(?:^|\\s)term(?:\\s|$)" per term:
+    # it splits the same, much faster)
+    TOKENIZER_REGEX = re.compile("((?:^|\\s)(?:{})(?:\\s|$)|\\s+)".format('|'.join(MULTI_WORD_TERMS)), flags=re.I)
+
+
+def __tokenize(title):
+    """Split the (NFKD-normalized) title at spaces, keeping the multi-word terms."""
+    words = title.split()
+    # The regex, which tries all the multi-word terms at every position, is
+    # needed only if a word may start one of them.
+    if not any(w.lower() in MULTI_WORD_FIRST or w.casefold() in MULTI_WORD_FIRST
+               for w in words):
+        return words
+    return list(filter(lambda w: w.strip(), TOKENIZER_REGEX.split(title)))
 
 def __get_type(word):
     """Determine type of word based on hyphenation."""
@@ -257,7 +433,7 @@ def __normalize_word(word):
     """Strip hyphens, other punctuation, lower, normalize NFKD."""
     parts = []
     for part in word.split(' '):
-        part = re.sub(r"(^\-|\p{P}+$)", '', part).strip()
+        part = PUNCT_REGEX.sub('', part).strip()
         parts.append(unicodedata.normalize('NFKD', part.lower()))
     return ' '.join(parts).strip()
 
@@ -283,4 +459,3 @@ def __finalize_output(word, capitalization, periods):
         parts.append(part)
     return ' '.join(parts)
 
-__initialize_ltwa()
@@ -0,0 +1,264 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""Compact, memory-mapped index of the LTWA.
+
+The index is a single binary file::
+
+    header     : b"LTWAIDX1", uint32 number of sections
+    directory  : per section, 4-byte name, uint64 offset, uint64 length
+    sections   : "meta" (JSON: version, conflict map, multi-word terms),
+                 one sorted string table per word type ("f", "p", "s", "i")
+                 and one of the lemmas ("lem", see `.lemma.derive_lemmas`)
+
+and a sorted string table is::
+
+    uint32 N, uint32 key offsets[N+1], uint32 value offsets[N+1],
+    key blob, value blob
+
+with the keys (UTF-8) sorted bytewise; the keys of the suffix table are
+stored reversed. All the integers are little-endian. Nothing but the header
+and the small "meta" section is read when the index is opened: the tables
+are binary-searched in the memory map, so that the pages which are never
+looked up are never loaded.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+__all__ = ["StringTable", "LTWAIndex", "write_index"]
+
+MAGIC = b"LTWAIDX1"
+_HEADER = struct.Struct("<8sI")
+_ENTRY = struct.Struct("<4sQQ")
+_U32 = struct.Struct("<I")
+
+PREFIX, SUFFIX, INFIX, FULLWORD = 'psif'
+LEMMAS = "lem"
+
+
+def _offsets(buf, start, n):
+    """uint32[n] at `start` of `buf` (zero-copy on little-endian machines)."""
+    view = memoryview(buf)[start:start + 4*n]
+    if sys.byteorder == "little":
+        return view.cast("I")
+    offsets = array("I", view)
+    offsets.byteswap()
+    return offsets
+
+
+class StringTable:
+    """Read-only ``{str: str}`` mapping backed by a sorted string table.
+
+    Parameters
+    ----------
+    buf : buffer
+        The buffer (e.g., `mmap.mmap`) containing the table.
+    start, length : int
+        The position of the table in `buf`.
+    reverse : bool, optional
+        Whether the keys are stored reversed (for suffixes).
+    """
+
+    def __init__(self, buf, start, length, reverse=False):
+        self.buf = buf
+        self.reverse = reverse
+        self.n = _U32.unpack_from(buf, start)[0]
+        self.koffs = _offsets(buf, start + 4, self.n + 1)
+        self.voffs = _offsets(buf, start + 8 + 4*self.n, self.n + 1)
+        self.kbase = start + 4 + 8*(self.n + 1)
+        self.vbase = self.kbase + self.koffs[self.n]
+
+    def __len__(self):
+        return self.n
+
+    def _key(self, i):
+        return self.buf[self.kbase + self.koffs[i]:self.kbase + self.koffs[i + 1]]
+
+    def _value(self, i):
+        return self.buf[self.vbase + self.voffs[i]:
+                        self.vbase + self.voffs[i + 1]].decode("utf-8")
+
+    def _bisect(self, key, lo=0, hi=None):
+        hi = self.n if hi is None else hi
+        buf, koffs, kbase = self.buf, self.koffs, self.kbase  # (hot loop)
+        while lo < hi:
+            mid = (lo + hi)//2
+            if buf[kbase + koffs[mid]:kbase + koffs[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _encode(self, word):
+        return (word[::-1] if self.reverse else word).encode("utf-8")
+
+    def get(self, word, default=None):
+        key = self._encode(word)
+        i = self._bisect(key)
+        if i < self.n and self._key(i) == key:
+            return self._value(i)
+        return default
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def __getitem__(self, word):
+        value = self.get(word)
+        if value is None:
+            raise KeyError(word)
+        return value
+
+    def __iter__(self):
+        for i in range(self.n):
+            key = self._key(i).decode("utf-8")
+            yield key[::-1] if self.reverse else key
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for i, key in enumerate(self):
+            yield key, self._value(i)
+
+    def longest(self, word, default=None):
+        """The value of the longest key which `word` starts with.
+
+        (Ends with, if the table is `reverse`.) The largest key not greater
+        than the word is the answer if it is a prefix of the word; otherwise
+        the answer can only be a prefix of their common part, which is
+        searched next (below that key).
+        """
+        key = self._encode(word)
+        hi = self.n
+        while key:
+            i = self._bisect(key, 0, hi)
+            if i < hi and self._key(i) == key:
+                return self._value(i)
+            if i == 0:
+                break
+            prev = self._key(i - 1)
+            common = 0
+            for a, b in zip(prev, key):
+                if a != b:
+                    break
+                common += 1
+            if common == len(prev):
+                return self._value(i - 1)
+            key, hi = key[:common], i - 1
+        return default
+
+
+class LTWAIndex:
+    """The LTWA index memory-mapped from `path` (see `write_index`).
+
+    Attributes
+    ----------
+    version : str
+        The LTWA version (e.g. ``"20210702"``).
+    conflict_map : dict
+        ``{type: {word: {lang: abbreviation}}}`` of the words whose
+        abbreviation depends on the language.
+    multi_word_terms : list of str
+        The (regex-escaped) terms with spaces.
+    lemmas : `StringTable`
+        ``{inflected form: lemma}`` of the LTWA words (empty if the index
+        has no lemma table).
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as ff:
+            self._mm = mmap.mmap(ff.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_sections = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an LTWA index.")
+        self._sections = {}
+        for i in range(n_sections):
+            name, start, length = _ENTRY.unpack_from(self._mm,
+                                                     _HEADER.size + i*_ENTRY.size)
+            self._sections[name.rstrip(b"\0").decode("ascii")] = (start, length)
+        start, length = self._sections["meta"]
+        meta = json.loads(self._mm[start:start + length].decode("utf-8"))
+        self.version = meta["version"]
+        self.conflict_map = meta["conflict"]
+        self.multi_word_terms = meta["multiword"]
+        self._tables = {}
+
+    def _table(self, name):
+        if name not in self._tables:
+            start, length = self._sections[name]
+            self._tables[name] = StringTable(self._mm, start, length,
+                                             reverse=(name == SUFFIX))
+        return self._tables[name]
+
+    def __contains__(self, wtype):
+        return wtype in (PREFIX, SUFFIX, INFIX, FULLWORD) and wtype in self._sections
+
+    def __getitem__(self, wtype):
+        """The `StringTable` of the word type (``"p"``, ``"s"``, ``"i"``, ``"f"``)."""
+        if wtype not in self:
+            raise KeyError(wtype)
+        return self._table(wtype)
+
+    @property
+    def lemmas(self):
+        return self._table(LEMMAS) if LEMMAS in self._sections else {}
+
+    def get(self, wtype, default=None):
+        return self[wtype] if wtype in self else default
+
+
+def _pack_table(mapping, reverse=False):
+    items = sorted(((k[::-1] if reverse else k).encode("utf-8"), v.encode("utf-8"))
+                   for k, v in mapping.items())
+    koffs, voffs = [0], [0]
+    for k, v in items:
+        koffs.append(koffs[-1] + len(k))
+        voffs.append(voffs[-1] + len(v))
+    n = len(items)
+    return b"".join([_U32.pack(n),
+                     struct.pack(f"<{n + 1}I", *koffs),
+                     struct.pack(f"<{n + 1}I", *voffs),
+                     b"".join(k for k, _ in items),
+                     b"".join(v for _, v in items)])
+
+
+def write_index(path, version, ltwa, conflict_map, multi_word_terms, lemmas=None):
+    """Write the LTWA index file.
+
+    Parameters
+    ----------
+    path : path-like
+        Output file name.
+    version : str
+        The LTWA version.
+    ltwa : dict
+        ``{type: {word: abbreviation}}`` of the (normalized) LTWA.
+    conflict_map : dict
+        ``{type: {word: {lang: abbreviation}}}``.
+    multi_word_terms : list of str
+        The (regex-escaped) terms with spaces.
+    lemmas : dict, optional
+        ``{inflected form: lemma}``.
+    """
+    meta = json.dumps(dict(version=version, conflict=conflict_map,
+                           multiword=multi_word_terms)).encode("utf-8")
+    sections = [("meta", meta)] + [(wtype, _pack_table(ltwa[wtype], wtype == SUFFIX))
+                                   for wtype in sorted(ltwa)]
+    if lemmas is not None:
+        sections.append((LEMMAS, _pack_table(lemmas)))
+    offset = _HEADER.size + len(sections)*_ENTRY.size
+    header = [_HEADER.pack(MAGIC, len(sections))]
+    for name, data in sections:
+        header.append(_ENTRY.pack(name.encode("ascii"), offset, len(data)))
+        offset += len(data)
+    # Replaced atomically: a running process may have the old one mapped.
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as ff:
+        ff.write(b"".join(header))
+        for _, data in sections:
+            ff.write(data)
+    os.replace(tmp, path)
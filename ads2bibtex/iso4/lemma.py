@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""Lemmatizers for `abbreviate` (singular forms of the title words).
+
+`abbreviate` tries the lemma of a word only when the word itself matches
+nothing in the LTWA, so the lemmatizer only has to know the inflected forms
+of the LTWA words. The bundled table (`derive_lemmas`, stored in the LTWA
+index) holds exactly those, and needs neither network nor corpus. The
+WordNet lemmatizer of `nltk` can be used instead if its corpus is installed.
+"""
+
+__all__ = ["derive_lemmas", "TableLemmatizer", "IdentityLemmatizer",
+           "get_lemmatizer"]
+
+# Irregular plurals (of nouns frequent in journal titles) which the suffix
+# rules below cannot produce.
+IRREGULAR_PLURALS = {
+    "alumni": "alumnus", "algae": "alga", "analyses": "analysis",
+    "appendices": "appendix", "bacteria": "bacterium", "bases": "basis",
+    "children": "child", "corpora": "corpus", "crises": "crisis",
+    "criteria": "criterion", "curricula": "curriculum", "diagnoses": "diagnosis",
+    "feet": "foot", "foci": "focus", "formulae": "formula", "fungi": "fungus",
+    "genera": "genus", "hypotheses": "hypothesis", "indices": "index",
+    "larvae": "larva", "matrices": "matrix", "media": "medium",
+    "memoranda": "memorandum", "mice": "mouse", "nuclei": "nucleus",
+    "parentheses": "parenthesis", "people": "person", "phenomena": "phenomenon",
+    "radii": "radius", "spectra": "spectrum", "stimuli": "stimulus",
+    "strata": "stratum", "syntheses": "synthesis", "teeth": "tooth",
+    "theses": "thesis", "vertebrae": "vertebra", "women": "woman",
+}
+
+
+def _plurals(word):
+    """Regular plural forms of `word` (inverse of the WordNet noun rules)."""
+    forms = {word + "s"}
+    if word.endswith(("s", "x", "z", "ch", "sh")):
+        forms.add(word + "es")
+    if word.endswith("y") and len(word) > 1 and word[-2] not in "aeiou":
+        forms.add(word[:-1] + "ies")
+    if word.endswith("fe"):
+        forms.add(word[:-2] + "ves")
+    elif word.endswith("f"):
+        forms.add(word[:-1] + "ves")
+    if word.endswith("man"):
+        forms.add(word[:-3] + "men")
+    return forms
+
+
+def _lookup(word, ltwa):
+    """The abbreviation `abbreviate` finds for `word` in `ltwa` (``{type: {word: abbr}}``)."""
+    fullwords, prefixes, suffixes = ltwa.get("f", {}), ltwa.get("p", {}), ltwa.get("s", {})
+    if word in fullwords:
+        return fullwords[word]
+    for i in range(len(word), 0, -1):
+        if word[:i] in prefixes:
+            return prefixes[word[:i]]
+    for i in range(len(word)):
+        if word[i:] in suffixes:
+            return suffixes[word[i:]]
+    for infix in sorted(ltwa.get("i", {}), key=lambda p: (-len(p), p)):
+        if infix in word:
+            return ltwa["i"][infix]
+    return ""
+
+
+def derive_lemmas(ltwa, words=None, not_abbreviated="n.a."):
+    """The ``{inflected form: lemma}`` table needed for the LTWA `ltwa`.
+
+    Only the plurals which match nothing in the LTWA while their singular
+    (an LTWA full word) has an abbreviation are kept: the others are
+    abbreviated the same with or without lemmatization.
+
+    `words` are the full words to inflect (by default all of them; the
+    rules are those of English).
+    """
+    candidates = {}
+    for word in ltwa.get("f", {}) if words is None else words:
+        if ' ' in word or word not in ltwa.get("f", {}):
+            continue
+        for form in _plurals(word):
+            candidates.setdefault(form, set()).add(word)
+    for form, word in IRREGULAR_PLURALS.items():
+        candidates.setdefault(form, set()).add(word)
+
+    lemmas = {}
+    for form, singulars in candidates.items():
+        singulars = [w for w in singulars
+                     if _lookup(w, ltwa) not in ("", not_abbreviated)]
+        if singulars and not _lookup(form, ltwa):
+            # the shortest, like the WordNet lemmatizer
+            lemmas[form] = min(singulars, key=lambda w: (len(w), w))
+    return lemmas
+
+
+class TableLemmatizer:
+    """Lemmatizer looking up a ``{form: lemma}`` mapping (e.g. the bundled table)."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def lemmatize(self, word):
+        return self.table.get(word, word)
+
+
+class IdentityLemmatizer:
+    """No lemmatization."""
+
+    def lemmatize(self, word):
+        return word
+
+
+def _wordnet_available():
+    """Whether `nltk` and its WordNet corpus are installed (no download)."""
+    try:
+        import nltk
+    except ImportError:
+        return False
+    for resource in ("corpora/wordnet", "corpora/wordnet.zip"):
+        try:
+            nltk.data.find(resource)
+            return True
+        except LookupError:
+            pass
+    return False
+
+
+def get_lemmatizer(backend="table", table=None):
+    """Get the lemmatizer of `backend`.
+
+    Parameters
+    ----------
+    backend : str, optional
+        One of:
+
+        * ``"auto"``: ``"wordnet"`` if the WordNet corpus of
+          `nltk` is installed locally, ``"table"`` otherwise.
+        * ``"table"`` (default): the bundled lemma table (`table`).
+        * ``"wordnet"``: the WordNet lemmatizer of `nltk`. The corpus is
+          never downloaded: install it with
+          ``python -m nltk.downloader wordnet``.
+        * ``"none"``: no lemmatization.
+    table : mapping, optional
+        The ``{form: lemma}`` table for ``"table"``.
+
+    Returns
+    -------
+    lemmatizer : object
+        Any object with a ``lemmatize(word)`` method.
+    """
+    if backend == "auto":
+        backend = "wordnet" if _wordnet_available() else "table"
+
+    if backend == "none":
+        return IdentityLemmatizer()
+    elif backend == "table":
+        return TableLemmatizer({} if table is None else table)
+    elif backend == "wordnet":
+        try:
+            from nltk.stem.wordnet import WordNetLemmatizer
+        except ImportError:
+            raise ImportError(
+                "Please install `nltk` package to use the `wordnet` lemmatizer."
+            )
+        if not _wordnet_available():
+            raise LookupError("The WordNet corpus is not installed. Do "
+                              + "`python -m nltk.downloader wordnet`.")
+        return WordNetLemmatizer()
+    else:
+        raise ValueError(f"backend must be one of [auto, table, wordnet, none], got {backend}")
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""Longest-match lookup of the LTWA infixes.
+
+The automaton is built once from ``{pattern: abbreviation}`` and returns the
+abbreviation of the longest pattern found in a word (ties broken by the
+alphabetical order of the patterns), in time proportional to the length of
+the word instead of the number of patterns. (The prefixes and suffixes are
+looked up in the sorted tables of `.index`.)
+"""
+
+from collections import deque
+
+__all__ = ["InfixAutomaton"]
+
+
+class InfixAutomaton:
+    """Aho–Corasick automaton returning the value of the longest key in the word.
+
+    Among the keys of the same length found in the word, the value of the
+    alphabetically first key is returned.
+    """
+
+    def __init__(self, mapping=None):
+        mapping = dict(mapping or {})
+        self.goto = [{}]  # node -> {char: node}
+        self.fail = [0]
+        self.best = [None]  # node -> best key ending at this node (incl. via fail)
+        self.values = mapping
+        for key in mapping:
+            node = 0
+            for char in key:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.best[node] = self._better(self.best[node], key)
+        self._build_fail()
+
+    @staticmethod
+    def _better(key1, key2):
+        if key1 is None:
+            return key2
+        if key2 is None:
+            return key1
+        return min(key1, key2, key=lambda k: (-len(k), k))
+
+    def _build_fail(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fail = self.fail[node]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[child] = self.goto[fail].get(char, 0)
+                self.best[child] = self._better(self.best[child],
+                                                self.best[self.fail[child]])
+                queue.append(child)
+
+    def longest(self, word, default=None):
+        node = 0
+        found = self.best[0]
+        for char in word:
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            found = self._better(found, self.best[node])
+        return default if found is None else self.values[found]
@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""Memoized `abbreviate` for journal names.
+
+A bibliography has thousands of entries but only a few hundred distinct
+journal names. The abbreviations are kept in an in-memory LRU and, if set
+(`set_abbreviation_cache`), in a persistent cache (e.g.
+`~ads2bibtex.AbbreviationCache`) shared by the runs and the libraries. Both
+are keyed by `ltwa_signature`, so a new LTWA version (or lemmatizer) never
+returns stale abbreviations. The titles in neither are abbreviated at once,
+in worker processes if there are many (`set_abbreviation_workers`).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from .abbreviate import abbreviate_many, ltwa_signature
+
+__all__ = ["abbreviate_titles", "abbreviate_memo", "set_abbreviation_cache",
+           "set_abbreviation_workers", "memo_info", "memo_clear"]
+
+
+class _LRU:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        with self.lock:
+            for key in keys:
+                if key in self.data:
+                    self.data.move_to_end(key)
+                    found[key] = self.data[key]
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        with self.lock:
+            self.data.update(items)
+            for key in items:
+                self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+
+_MEMO = _LRU(4096)
+_DISK = None  # the persistent cache, if any
+_WORKERS = dict(processes=None, chunksize=2000)  # passed to abbreviate_many
+
+
+def set_abbreviation_cache(cache=None, maxsize=None):
+    """Set the persistent cache and/or the size of the in-memory LRU.
+
+    Parameters
+    ----------
+    cache : object, optional
+        The persistent cache with ``get_many(titles, key)`` and
+        ``put_many({title: abbreviation}, key)`` (e.g.
+        `~ads2bibtex.AbbreviationCache`). `None` to use none.
+    maxsize : int, optional
+        Maximum number of abbreviations in memory (default 4096).
+    """
+    global _DISK
+    _DISK = cache
+    if maxsize is not None:
+        _MEMO.maxsize = maxsize
+
+
+def set_abbreviation_workers(processes=None, chunksize=2000):
+    """Abbreviate many new titles in parallel worker processes.
+
+    Parameters
+    ----------
+    processes : int, optional
+        Number of worker processes (``0``: the number of CPUs). `None` or
+        ``1`` (default) to abbreviate in the calling process.
+    chunksize : int, optional
+        The workers are used only if more than `chunksize` distinct titles
+        are in none of the caches (e.g., at the first sync of a large
+        library); smaller batches are abbreviated in the calling process.
+        Default 2000.
+    """
+    if processes == 0:
+        processes = os.cpu_count() or 1
+    _WORKERS.update(processes=processes, chunksize=chunksize)
+
+
+def abbreviate_titles(titles, periods=True, disambiguation_langs=()):
+    """Abbreviate the titles, using the memo (and the persistent cache).
+
+    Parameters
+    ----------
+    titles : iterable of str
+        The titles (duplicates are abbreviated once).
+    periods, disambiguation_langs :
+        See `abbreviate`.
+
+    Returns
+    -------
+    abbrs : dict
+        ``{title: abbreviation}``.
+    """
+    langs = tuple(sorted(disambiguation_langs))
+    key = "{}, periods={}, langs={}".format(ltwa_signature(), bool(periods),
+                                            ','.join(langs))
+    titles = list(dict.fromkeys(titles))
+    found = _MEMO.get_many([(key, t) for t in titles])
+    abbrs = {t: found[(key, t)] for t in titles if (key, t) in found}
+
+    todo = [t for t in titles if t not in abbrs]
+    if todo and _DISK is not None:
+        stored = _DISK.get_many(todo, key)
+        abbrs.update(stored)
+        _MEMO.put_many({(key, t): a for t, a in stored.items()})
+        todo = [t for t in todo if t not in stored]
+
+    if todo:
+        results, errors = abbreviate_many(todo, periods=periods,
+                                          disambiguation_langs=set(langs), **_WORKERS)
+        new = {t: a for t, a in zip(todo, results) if t not in errors}
+        abbrs.update(new)
+        _MEMO.put_many({(key, t): a for t, a in new.items()})
+        if _DISK is not None:
+            _DISK.put_many(new, key)
+        if errors:  # (the others are kept)
+            raise next(iter(errors.values()))
+    return abbrs
+
+
+def abbreviate_memo(title, periods=True, disambiguation_langs=()):
+    """Memoized `abbreviate` (see `abbreviate_titles`)."""
+    return abbreviate_titles([title], periods, disambiguation_langs)[title]
+
+
+def memo_info():
+    """Hit/miss counters of the memo and of the persistent cache.
+
+    Returns
+    -------
+    info : dict
+        ``hits``, ``misses``, ``size``, ``maxsize`` of the in-memory LRU and
+        ``disk_hits``, ``disk_misses`` of the persistent cache (`None` if
+        not set).
+    """
+    return dict(hits=_MEMO.hits, misses=_MEMO.misses, size=len(_MEMO.data),
+                maxsize=_MEMO.maxsize,
+                disk_hits=None if _DISK is None else _DISK.hits,
+                disk_misses=None if _DISK is None else _DISK.misses)
+
+
+def memo_clear():
+    """Empty the in-memory LRU and reset its counters."""
+    with _MEMO.lock:
+        _MEMO.data.clear()
+        _MEMO.hits = _MEMO.misses = 0
@@ -0,0 +1,149 @@
+import json
+from datetime import datetime
+
+__all__ = ["ChangeReport", "diff_keys"]
+
+
+def diff_keys(new, old):
+    """The keys added to and deleted from `old`, in linear time.
+
+    Parameters
+    ----------
+    new, old : list of str
+        The new and old keys (e.g., bibcodes, citation keys).
+
+    Returns
+    -------
+    added, deleted : list of str
+        The keys of `new` not in `old` (in the order of `new`), and those of
+        `old` not in `new` (in the order of `old`).
+    """
+    new_set, old_set = set(new), set(old)
+    return [x for x in new if x not in old_set], [x for x in old if x not in new_set]
+
+
+def _painter():
+    """``paint(text, fore, back)`` with colorama, or plain if not installed."""
+    try:
+        from colorama import Back, Fore, Style
+    except ImportError:
+        return lambda text, fore, back: text
+    return lambda text, fore, back: (getattr(Fore, fore) + getattr(Back, back) + text
+                                     + Style.RESET_ALL)
+
+
+class ChangeReport:
+    """Report of the changes (of the bibcodes, citation keys, outputs).
+
+    The changes are printed for humans, with at most `max_items` keys each
+    (and the number of the others), and optionally written as JSON events
+    for other tools (e.g., a build system which recompiles the document when
+    the output is updated). The file of the events has one JSON object per
+    line (JSON Lines), e.g.::
+
+        {"event": "changed", "time": "2024-05-01T12:00:00", "source": "ADS
+        Library: thesis", "n": 1203, "added": ["2024ApJ...961..100K"],
+        "deleted": []}
+        {"event": "updated", "time": "2024-05-01T12:00:00", "source":
+        "bib_add.txt", "n": 12}
+        {"event": "written", "time": "2024-05-01T12:00:00", "path":
+        "references.bib", "added": ["2024ApJ...961..100K"], "deleted": [],
+        "changed": []}
+
+    Parameters
+    ----------
+    max_items : int, optional
+        The maximum number of keys printed per change, by default 20. 0 to
+        print all of them.
+    events : path-like or file-like, optional
+        The file the events are appended to (`None`: no events).
+    """
+
+    def __init__(self, max_items=20, events=None):
+        self.max_items = max_items
+        self._paint = _painter()
+        self._own = events is not None and not hasattr(events, "write")
+        self.events = open(events, "a") if self._own else events
+
+    def emit(self, event, **info):
+        """Write the event `event` (with `info`) to `events`."""
+        if self.events is None:
+            return
+        record = dict(event=event, time=datetime.now().isoformat(timespec="seconds"))
+        record.update(info)
+        self.events.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.events.flush()
+
+    def _keys(self, keys, back):
+        shown = keys if self.max_items <= 0 else keys[:self.max_items]
+        text = ", ".join(self._paint(x, "BLACK", back) for x in shown)
+        if len(keys) > len(shown):
+            text += f", ... ({len(keys) - len(shown)} more)"
+        return text
+
+    def changed(self, source, n_new, added, deleted):
+        """Report the keys `added` to and `deleted` from `source`.
+
+        Parameters
+        ----------
+        source : str
+            The name of what changed (e.g., the library or the file).
+        n_new : int
+            The number of the keys now.
+        added, deleted : list of str
+            The keys added/deleted (see `diff_keys`).
+        """
+        infostr = f" {source} Changed "
+        print(f"\n{infostr:=^80s}")
+        print(self._paint(f" N_new = {n_new} ", "WHITE", "BLACK"))
+        if added:
+            print(self._paint(f" +{len(added)}: ", "GREEN", "BLACK"),
+                  self._keys(added, "GREEN"))
+        if deleted:
+            print(self._paint(f" -{len(deleted)}: ", "RED", "BLACK"),
+                  self._keys(deleted, "RED"))
+        self.emit("changed", source=str(source), n=n_new, added=list(added),
+                  deleted=list(deleted))
+
+    def updated(self, source, n_new):
+        """Report that `source` changed, but not its keys.
+
+        E.g., an entry of the additional file was edited.
+        """
+        infostr = f" {source} Updated "
+        print(f"\n{infostr:=^80s}")
+        print(self._paint(f" N_new = {n_new} ", "WHITE", "BLACK"))
+        self.emit("updated", source=str(source), n=n_new)
+
+    def compare(self, source, new, old, updated=False):
+        """Report the change of the keys of `source` from `old` to `new`.
+
+        If `updated` (`source` itself changed, e.g., the additional file),
+        it is reported even if no key was added nor deleted (see `updated`).
+        Returns ``(added, deleted)`` (see `diff_keys`).
+        """
+        added, deleted = diff_keys(new, old)
+        if added or deleted:
+            self.changed(source, len(new), added, deleted)
+        elif updated:
+            self.updated(source, len(new))
+        return added, deleted
+
+    def written(self, path, added=(), deleted=(), changed=()):
+        """Report that the file `path` was (re-)written.
+
+        Parameters
+        ----------
+        path : path-like
+            The file written.
+        added, deleted, changed : list of str, optional
+            The citation keys of the entries added, deleted and changed in
+            the file (e.g., by `~ads2bibtex.OutputIndex.update`).
+        """
+        print(f"Updated: {path} \n({datetime.now()})\n")
+        self.emit("written", path=str(path), added=list(added), deleted=list(deleted),
+                  changed=list(changed))
+
+    def close(self):
+        if self._own:
+            self.events.close()
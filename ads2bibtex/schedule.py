@@ -0,0 +1,176 @@
+import json
+import time
+
+from .watch import wait_any
+
+__all__ = ["PollScheduler"]
+
+
+DAY = 86400
+
+
+class PollScheduler:
+    """Adaptive poll interval within the daily ADS API quota.
+
+    The interval is reset to `dtime` when something changed, and grows by
+    `factor` (upto `max_dtime`) at each idle poll. On top of that, the
+    interval is widened as the budget is used up, so that polling can
+    continue indefinitely without hitting the ADS limit ("5000 requests/day
+    on a rolling 24-hour window"). The budget is limited by (1) the requests
+    sent within the last 24 hours, which are recorded in `state_file` (so
+    that restarting the script does not reset it), and (2) the
+    ``X-RateLimit-Remaining``/``X-RateLimit-Reset`` headers of the last
+    response of the ADS `service`.
+
+    Parameters
+    ----------
+    dtime : float, optional
+        The shortest interval in seconds, by default 5.
+    max_dtime : float, optional
+        The longest interval when idle in seconds, by default 300.
+    factor : float, optional
+        The factor to increase the interval at each idle poll, by default 1.5.
+    daily_limit : int, optional
+        The number of requests allowed in 24 hours, by default 5000.
+    reserve : int, optional
+        The number of requests kept for the exports (and for the user), i.e.,
+        not spent for polling, by default 100.
+    state_file : path-like, optional
+        The file to persist the timestamps of the requests, by default
+        ``".ads-quota.json"``. Set to `None` not to persist.
+    service : str, optional
+        The ADS service of which the rate-limit headers are used, by default
+        ``"biblib"`` (the one polled).
+    """
+
+    def __init__(self, dtime=5, max_dtime=300, factor=1.5, daily_limit=5000,
+                 reserve=100, state_file=".ads-quota.json", service="biblib"):
+        self.dtime = dtime
+        self.max_dtime = max(max_dtime, dtime)
+        self.factor = factor
+        self.daily_limit = daily_limit
+        self.reserve = reserve
+        self.state_file = state_file
+        self.service = service
+        self.interval = dtime
+        self.ratelimit = None
+        self._due = None  # the time of the next poll, while waiting for it
+        self._n_seen = 0  # `n_requests` of the client at the last `update`
+        self.timestamps = self._load()
+
+    def _load(self):
+        if self.state_file is None:
+            return []
+        try:
+            with open(self.state_file, "r") as ff:
+                timestamps = json.load(ff)["requests"]
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return []
+        now = time.time()
+        return sorted(t for t in timestamps if now - t < DAY)
+
+    def _save(self):
+        if self.state_file is None:
+            return
+        with open(self.state_file, "w") as ff:
+            json.dump({"requests": self.timestamps}, ff)
+
+    def record(self, n=1, now=None):
+        """Record `n` requests sent just now."""
+        now = time.time() if now is None else now
+        self.timestamps.extend([now]*n)
+        self._prune(now)
+        self._save()
+
+    def _prune(self, now):
+        i = 0
+        while i < len(self.timestamps) and now - self.timestamps[i] >= DAY:
+            i += 1
+        del self.timestamps[:i]
+
+    def update(self, client, changed=False):
+        """Update the budget from `client` and the interval for the next poll.
+
+        Parameters
+        ----------
+        client : `~ads2bibtex.ADSClient`
+            The client used for all the requests since the last update.
+        changed : bool, optional
+            Whether anything changed at this poll.
+        """
+        n_new = client.n_requests - self._n_seen
+        self._n_seen = client.n_requests
+        if n_new > 0:
+            self.record(n_new)
+        self.ratelimit = client.ratelimits.get(self.service, self.ratelimit)
+        self._due = None
+        if changed:
+            self.interval = self.dtime
+        else:
+            self.interval = min(self.interval*self.factor, self.max_dtime)
+        return self.next_interval()
+
+    def remaining(self, now=None):
+        """The number of requests left and the time (s) until more are allowed."""
+        now = time.time() if now is None else now
+        self._prune(now)
+        remaining = self.daily_limit - len(self.timestamps)
+        renew = (self.timestamps[0] + DAY - now) if self.timestamps else 0
+        if self.ratelimit is not None and self.ratelimit["reset"] > now:
+            # The headers of ADS are authoritative when available.
+            remaining = min(remaining, self.ratelimit["remaining"])
+            renew = self.ratelimit["reset"] - now
+        return max(remaining, 0), max(renew, 0)
+
+    def next_interval(self, now=None):
+        """The time to wait (s) before the next poll."""
+        now = time.time() if now is None else now
+        self._prune(now)
+        intervals = [self.interval]
+        # The pace slows down as the budget is used up: at the pace
+        # ``used/usable * DAY/usable``, the number of requests in the window
+        # converges to `usable`.
+        usable = self.daily_limit - self.reserve
+        used = len(self.timestamps)
+        if used >= usable:  # wait until the oldest request leaves the window
+            intervals.append(self.timestamps[0] + DAY - now if used else 0)
+        else:
+            intervals.append(used/usable * DAY/usable)
+        if self.ratelimit is not None and self.ratelimit["reset"] > now:
+            left = self.ratelimit["remaining"] - self.reserve
+            until_reset = self.ratelimit["reset"] - now
+            if left <= 0:
+                intervals.append(until_reset)
+            else:
+                frac_used = 1 - self.ratelimit["remaining"]/max(self.ratelimit["limit"], 1)
+                intervals.append(frac_used * until_reset/left)
+        return max(intervals)
+
+    def wait(self, watchers=()):
+        """Sleep until the next poll, or until a watched file changes.
+
+        Parameters
+        ----------
+        watchers : list of `~ads2bibtex.FileWatcher`, optional
+            Wake up as soon as any of them signals a change (e.g., of the
+            additional file), so that local edits are not delayed.
+
+        Returns
+        -------
+        woken : bool
+            Whether woken up by a watcher. Then the poll is still due at the
+            same time: the next `wait` (without `update`) sleeps until then.
+        """
+        if self._due is None:
+            self._due = time.time() + self.next_interval()
+        if wait_any(watchers, self._due - time.time()):
+            return True
+        self._due = None
+        return False
+
+    def info(self):
+        """Short description of the budget for the information line."""
+        remaining, renew = self.remaining()
+        return (f"Quota: {remaining}/{self.daily_limit} requests left "
+                + f"(renewed in {renew/3600:.1f} h), "
+                + f"next poll in {self.next_interval():.1f} s")
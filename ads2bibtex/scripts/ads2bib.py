@@ -1,12 +1,14 @@
 import argparse
-import json
-import time
+import itertools
 from datetime import datetime
 
-from colorama import Back, Fore, Style
+import requests
 
-from ads2bibtex import (_check_token, change_journal_name, query_ads,
-                        query_lib, read_bib_add)
+from ads2bibtex import (AbbreviationCache, AdditionalFile, ADSClient, ChangeReport,
+                        ExportCache, LibrarySync, OutputIndex, PollScheduler,
+                        _check_token, change_journal_name, make_rawfile, query_lib,
+                        query_lib_meta, write_output)
+from ads2bibtex.core import SPLITTABLE_FORMATS
 
 DESCRIPTION = """
 Accepts the ADS Library (recommended) or a text file with the ADS-style
@@ -20,23 +22,8 @@ To reset token, do
 rm .ads-token
 """.strip()
 
-
-def print_infostr(fname, new, old):
-    infostr = f" {fname} Changed "
-    print(f"\n{infostr:=^80s}")
-    print(Fore.WHITE, Back.BLACK, f"N_new = {len(new)}", Style.RESET_ALL)
-    added = [x for x in new if x not in old]
-    deled = [x for x in old if x not in new]
-    if added:
-        print(Fore.GREEN, Back.BLACK, " +{}: ".format(len(added)), Style.RESET_ALL, end="")
-        for x in added[:-1]:
-            print(Fore.BLACK, Back.GREEN, x, Style.RESET_ALL, end=", ")
-        print(Fore.BLACK, Back.GREEN, added[-1], Style.RESET_ALL, end="\n")
-    if deled:
-        print(Fore.RED, Back.BLACK, " -{}: ".format(len(deled)), Style.RESET_ALL, end="")
-        for x in deled[:-1]:
-            print(Fore.BLACK, Back.RED, x, Style.RESET_ALL, end=", ")
-        print(Fore.BLACK, Back.RED, deled[-1], Style.RESET_ALL)
+# The format of the raw file exported with a non-BibTeX -f (and no -F).
+RAW_FORMAT = "%R  # %3h_%Y_%q_%V_%p %T"
 
 
 def main(args=None):
@@ -54,6 +41,12 @@ def main(args=None):
                         help=("Filename to save bibcode and title info. "
                               + "Set to `none` to skip it. Default: `none`")
                         )
+    parser.add_argument("--index-file", default=None,
+                        help=("File to save the index of the output entries (citation "
+                              + "key, byte range, hash and origin, see "
+                              + "`ads2bibtex.read_index`). Set to `none` to skip it. "
+                              + "Default: `.<output>.index.json` beside the output")
+                        )
     parser.add_argument("-s", "--sort-option", default="date asc",
                         help="Sort option for ADS API. Default: `'date asc'`")
     parser.add_argument("-j", "--journal", default="ads", type=str,
@@ -67,6 +60,14 @@ def main(args=None):
                               + "`'iso4'` uses ISO-4 style names (e.g., `Astrophys. J.`)."
                               )
                         )
+    parser.add_argument("--accents", default="keep", type=str,
+                        help=("TeX accents in the fields of the output (and of the "
+                              + "additional-file, unless --add-as-is). Use one of "
+                              + "[keep, utf8, ascii]. Default: `'keep'` (e.g., "
+                              + "`{\\\"o}`). `'utf8'` decodes them (e.g., `ö`), "
+                              + "`'ascii'` drops them (e.g., `o`)."
+                              )
+                        )
     parser.add_argument("-f", "--format", default="bibtex", type=str,
                         help=("The format of the output from the ADS library. Default `bibtex`. "
                               + "Options are tagged formats (ads, bibtex, bibtexabs, "
@@ -78,16 +79,54 @@ def main(args=None):
                               + "http://adsabs.github.io/help/actions/export"
                               )
                         )
-    parser.add_argument("-F", "--format-raw", type=str,
-                        default='%R  # %3h_%Y_%q_%V_%p %T',
-                        help=("The output format for the raw file. Same as -f/--format")
+    parser.add_argument("-F", "--format-raw", type=str, default=None,
+                        help=("The format of the raw file exported from ADS (e.g., "
+                              + "`'%%R  # %%3h_%%Y_%%q_%%V_%%p %%T'`). Same as -f/--format. "
+                              + "Default: the raw file is made from the output "
+                              + "(`bibcode  # authors || title`) without exporting if "
+                              + "-f is bibtex or bibtexabs, otherwise exported as "
+                              + "`'%%R  # %%3h_%%Y_%%q_%%V_%%p %%T'`")
+                        )
+    parser.add_argument("-c", "--cache-dir", default=None,
+                        help=("Directory of the on-disk cache of the exported records. "
+                              + "Set to `none` to disable it. "
+                              + "Default: `$XDG_CACHE_HOME/ads2bibtex` (`~/.cache/ads2bibtex`)")
+                        )
+    parser.add_argument("--cache-ttl", default=7, type=float,
+                        help="Days after which a cached record is exported again (default=7)")
+    parser.add_argument("--chunk-size", default=2000, type=int,
+                        help=("Maximum number of bibcodes per export request. Larger "
+                              + "exports are split into chunks (default=2000)")
+                        )
+    parser.add_argument("-w", "--workers", default=4, type=int,
+                        help="Maximum number of concurrent export requests (default=4)")
+    parser.add_argument("--iso4-processes", default=1, type=int,
+                        help=("Number of processes abbreviating the journal names with "
+                              + "`-j iso4` when there are many new ones (e.g., the first "
+                              + "sync of a large library). 0 to use all the CPUs (default=1)")
                         )
     parser.add_argument("-n", "--num-iter", default=500, type=int,
-                        help="number of iterations (default=500)")
+                        help="number of iterations, 0 to run indefinitely (default=500)")
     parser.add_argument("-t", "--dtime", default=5, type=float,
-                        help="time between iterations (default=5s)")
+                        help=("shortest time between iterations, used right after a "
+                              + "change (default=5s)"))
+    parser.add_argument("-T", "--max-dtime", default=300, type=float,
+                        help=("longest time between iterations; the interval grows "
+                              + "up to this while nothing changes (default=300s)"))
+    parser.add_argument("--daily-limit", default=5000, type=int,
+                        help=("number of ADS API requests allowed per 24 hours. The "
+                              + "interval is widened so as not to exceed it. The "
+                              + "requests are recorded in `.ads-quota.json` (default=5000)"))
     parser.add_argument("-i", "--info-interval", default=20, type=int,
                         help="number of iterations between info prints (default=20)")
+    parser.add_argument("--show-keys", default=20, type=int,
+                        help=("Maximum number of the added/deleted keys printed per "
+                              + "change, 0 to print all of them (default=20)"))
+    parser.add_argument("--events", default="none",
+                        help=("File to append the changes to, as JSON events (one per "
+                              + "line, see `ads2bibtex.ChangeReport`), e.g., for a build "
+                              + "system. Set to `none` to skip it. Default: `none`")
+                        )
     parser.add_argument("--add-as-is", action="store_true", default=False,
                         help=("Add the additional file as is, without expanding journal "
                               + "name macro, ISO4-styling, etc.")
@@ -99,6 +138,8 @@ def main(args=None):
 
     print("Done.\nToken checking ... ", end="")
     token = _check_token()
+    # One pooled session (with retries) for all the queries below.
+    client = ADSClient(token)
     print("Done.\nInitial query testing ... ", end="")
     arg_ads = args.lib_or_file
     # if Path(arg_ads).exists():  # If you gave a file with ADS bibcodes
@@ -107,73 +148,143 @@ def main(args=None):
     # else:  # If it is library ID
     #   bibs, last_modified = query_lib(arg_ads, token=token)
 
-    bibs_old, last_modified_old, name = query_lib(arg_ads, token=token)
+    bibs_old, last_modified_old, name = query_lib(arg_ads, token=token,
+                                                  sort=args.sort_option,
+                                                  client=client)
     print("Done.\nUpdating the files ...")
     arg_add = args.additional_file
-    adds_old, adds2_old = read_bib_add(arg_add)  # the raw file content & list of citekeys
+    # Re-read (and re-parsed) only when the file changed.
+    additional = AdditionalFile(arg_add)
+    adds2_old = additional.keys
     rawfile = None if args.rawfile == "none" else args.rawfile
+    report = ChangeReport(max_items=args.show_keys,
+                          events=None if args.events == "none" else args.events)
+    # The duplicate keys (between the library and the additional file) are
+    # found by the index even if it is not saved.
+    save_index = args.index_file != "none"
+    index = OutputIndex(args.output, path=args.index_file if save_index else None)
+    cache = None if args.cache_dir == "none" else ExportCache(args.cache_dir,
+                                                              ttl=args.cache_ttl*86400)
+    if args.journal == "iso4":
+        from ads2bibtex.iso4 import (memo_info, set_abbreviation_cache,
+                                     set_abbreviation_workers)
+        set_abbreviation_workers(args.iso4_processes)
+        if cache is not None:
+            # The abbreviations of the journal names are reused between runs.
+            set_abbreviation_cache(AbbreviationCache(args.cache_dir))
     query_kw = dict(
         token=token,
         options=dict(sort=args.sort_option),
         fmt=args.format,
         journalname=args.journal,
+        accents=args.accents,
+        cache=cache,
+        chunksize=args.chunk_size,
+        max_workers=args.workers,
+        client=client,
     )
-    if rawfile is not None:
-        query_kw_raw = dict(
-            token=token,
-            options=dict(sort=args.sort_option),
-            fmt=args.format_raw,
-            journalname=args.journal,
-        )
+    # The raw file is made again only when the library changed; with -F (or
+    # a non-BibTeX -f), it is exported by its own sync (only the added
+    # bibcodes if splittable).
+    format_raw = args.format_raw
+    if format_raw is None and args.format not in SPLITTABLE_FORMATS:
+        format_raw = RAW_FORMAT  # (`make_rawfile` reads only BibTeX)
+    sync_raw = None
+    if rawfile is not None and format_raw is not None:
+        sync_raw = LibrarySync(**dict(query_kw, fmt=format_raw))
+    raw_pending = rawfile is not None
 
-    bibtex_ads = query_ads(bibs_old, **query_kw)
+    # Only the added bibcodes are exported from the next time.
+    sync = LibrarySync(**query_kw)
+    sync.update(bibs_old)
+    if sync_raw is not None:
+        sync_raw.update(bibs_old)
+    bibtex_ads = sync.text
 
+    scheduler = PollScheduler(dtime=args.dtime, max_dtime=args.max_dtime,
+                              daily_limit=args.daily_limit)
     update = True
-    for i in range(args.num_iter):
-        adds, adds2 = read_bib_add(arg_add)
-        if i != 0:
+    local = False  # whether woken up by a change of the additional file
+    iterations = itertools.count() if args.num_iter <= 0 else range(args.num_iter)
+    for i in iterations:
+        if i != 0 and not local:
             try:
-                bibs, last_modified, _ = query_lib(arg_ads, token=token)
-                # only the bibcodes
-            except json.JSONDecodeError:
-                continue  # if the ADS API is down, just wait for the next iteration
+                # Cheap metadata-only query; the bibcodes only when changed.
+                modified = query_lib_meta(arg_ads, token=token,
+                                          client=client)["date_last_modified"]
+                if modified != last_modified_old:
+                    new_bibs, modified, _ = query_lib(arg_ads, token=token,
+                                                      sort=args.sort_option,
+                                                      client=client)
+                    # Exported here, so that a failed export is retried at the
+                    # next iteration: `bibs` and `last_modified` are set only
+                    # once exported (also for the wake-ups by the additional
+                    # file in between).
+                    sync.update(new_bibs)
+                    if sync_raw is not None:
+                        sync_raw.update(new_bibs)
+                    bibs = new_bibs
+                last_modified = modified
+            except (ValueError, requests.RequestException) as e:
+                # if the ADS API is down even after retries, just wait for the
+                # next iteration (json.JSONDecodeError is a ValueError)
+                print(f"[WARNING] ADS query failed ({datetime.now()}): {e}")
+                scheduler.update(client)
+                local = scheduler.wait([additional.watcher])
+                continue
+            update = False
+        elif local:  # the library is polled when due, not now
             update = False
         else:
             last_modified = last_modified_old
 
         if last_modified != last_modified_old:
             update = True
-            bibtex_ads = query_ads(bibs, **query_kw)
-            print_infostr(name, bibs, bibs_old)
+            bibtex_ads = sync.text
+            report.compare(name, bibs, bibs_old)
             bibs_old = bibs
             last_modified_old = last_modified
+            raw_pending = rawfile is not None
 
-        if (adds != adds_old) or (adds2 != adds2_old):
+        if additional.update():
             update = True
-            print_infostr(arg_add, adds2, adds2_old)
-            adds_old = adds
-            adds2_old = adds2
+            report.compare(arg_add, additional.keys, adds2_old, updated=True)
+            adds2_old = additional.keys
 
         if update:
-            with open(args.output, "w+") as ff:
-                ff.writelines(bibtex_ads)
-                try:
-                    if args.add_as_is:
-                        ff.writelines(adds)
-                    else:
-                        ff.writelines(change_journal_name(adds, journalname=args.journal))
-                except FileNotFoundError:
-                    pass
-            print(f"Updated: {args.output} \n({datetime.now()})\n")
-
-            if rawfile is not None:
-                contents_raw = query_ads(bibs_old, **query_kw_raw)
-                with open(rawfile, "w") as ff:
-                    ff.writelines(contents_raw)
-                print(f"Updated: {rawfile} \n({datetime.now()})\n")
+            adds = additional.text
+            if not args.add_as_is:
+                adds = change_journal_name(adds, journalname=args.journal,
+                                           accents=args.accents)
+            changes = index.update([("ads", bibtex_ads), ("additional", adds)])
+            warning = index.duplicate_warning()
+            if warning is not None:
+                print(warning)
+            if write_output(args.output, bibtex_ads + adds):
+                report.written(args.output, *changes)
+            if save_index:
+                index.save()
+
+            if raw_pending:
+                if sync_raw is None:
+                    written = make_rawfile(bibtex_ads, rawfile)
+                else:
+                    written = write_output(rawfile, sync_raw.text)
+                if written:
+                    report.written(rawfile)
+                raw_pending = False
 
+        if not local:
+            scheduler.update(client, changed=update)
         if (i > 0) and (i % args.info_interval == 0):
-            pct = 100 * i / args.num_iter
-            print(f"[INFORMATION] Iteration: {i} / {args.num_iter} ({pct:.1f} %) reached.")
+            if args.num_iter > 0:
+                pct = 100 * i / args.num_iter
+                print(f"[INFORMATION] Iteration: {i} / {args.num_iter} ({pct:.1f} %) "
+                      + f"reached. {scheduler.info()}")
+            else:
+                print(f"[INFORMATION] Iteration: {i} reached. {scheduler.info()}")
+            if args.journal == "iso4":
+                print(f"[INFORMATION] ISO 4 abbreviations: {memo_info()}")
 
-        time.sleep(args.dtime)
+        # Edits of the additional file are written right away.
+        local = scheduler.wait([additional.watcher])
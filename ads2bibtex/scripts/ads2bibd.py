@@ -0,0 +1,49 @@
+import argparse
+
+from ads2bibtex import SyncDaemon, _check_token, read_config
+
+DESCRIPTION = """
+Keep many ADS Libraries synchronized to their output files from a single
+process. The library → output mappings (and their journal name style, format,
+sort option and additional file) are given in a config file (TOML, or JSON
+if the file name ends with `.json`):
+
+    journal = "iso4"    # default of all the targets
+
+    [[target]]
+    library = "<library ID>"
+    output = "thesis/references.bib"
+    additional_file = "thesis/bib_add.txt"
+
+    [[target]]
+    library = "<another library ID>"
+    output = "paper1/references.bib"
+    journal = "ads"
+
+Other top-level keys: cache_dir, cache_ttl, dtime, max_dtime, daily_limit,
+chunk_size, workers, iso4_processes, show_keys, events (same as the options
+of `ads2bibtex`).
+
+To reset token, do
+rm .ads-token
+""".strip()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=DESCRIPTION,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("config", help="The config file (TOML or JSON).")
+    parser.add_argument("-n", "--num-iter", default=0, type=int,
+                        help="number of iterations, 0 to run indefinitely (default=0)")
+    parser.add_argument("-i", "--info-interval", default=20, type=int,
+                        help="number of iterations between info prints (default=20)")
+    args = parser.parse_args(args)
+
+    config = read_config(args.config)
+    token = _check_token()
+    daemon = SyncDaemon(config, token=token)
+    print(f"Syncing {len(daemon.targets)} targets of "
+          + f"{len(set(t.library for t in daemon.targets))} libraries.")
+    daemon.run(num_iter=args.num_iter, info_interval=args.info_interval)
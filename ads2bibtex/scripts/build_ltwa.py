@@ -0,0 +1,29 @@
+import argparse
+
+from ads2bibtex.iso4.abbreviate import INDEX_FILEPATH, build_ltwa_index
+
+DESCRIPTION = """
+Build the LTWA index used by `-j iso4` from an LTWA CSV release of the ISSN
+International Centre (https://www.issn.org/services/online-services/access-to-the-ltwa/),
+e.g., `ltwa_20210702.csv` (semicolon-separated WORDS;ABBREVIATIONS;LANGUAGES).
+
+By default, the index shipped with the package is replaced.
+""".strip()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description=DESCRIPTION,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("csvfile", help="The LTWA CSV file.")
+    parser.add_argument("-o", "--output", default=INDEX_FILEPATH,
+                        help=f"Output index file. Default: `{INDEX_FILEPATH}`")
+    parser.add_argument("-V", "--ltwa-version", default=None,
+                        help=("The LTWA version (e.g., `20210702`). "
+                              + "Default: the digits in the CSV file name."))
+    args = parser.parse_args(args)
+
+    path = build_ltwa_index(args.csvfile, version=args.ltwa_version,
+                            index_path=args.output)
+    print(f"Written: {path}")
@@ -1,12 +1,13 @@
 import argparse
+import itertools
 import time
 from datetime import datetime
-from pathlib import Path
 
-from colorama import Back, Fore, Style
+import requests
 
-from ads2bibtex import (_check_token, make_rawfile, query_ads, query_lib,
-                        read_bib_add, extract_cite_keys)
+from ads2bibtex import (AbbreviationCache, AdditionalFile, ADSClient, ChangeReport,
+                        ExportCache, LibrarySync, OutputIndex, PollScheduler, TexProject,
+                        _check_token, make_rawfile, wait_any, write_output)
 
 DESCRIPTION = """
 Extract all citation keys from a .tex file, query to ADS. Any citation key
@@ -15,30 +16,15 @@ https://ui.adsabs.harvard.edu/help/actions/bibcode)
 
 Citation keys are extracted by regex, see:
 https://stackoverflow.com/a/57064896/7199629
+The files of \\input, \\include and \\subfile are also read, and all the files are
+watched: the output is updated as soon as a citation is added or removed, and
+only the newly cited bibcodes are exported from ADS.
 
 To reset token, do
 rm .ads-token
 """.strip()
 
 
-def print_infostr(fname, new, old):
-    infostr = f" {fname} Changed "
-    print(f"\n{infostr:=^80s}")
-    print(Fore.WHITE, Back.BLACK, f"N_new = {len(new)}", Style.RESET_ALL)
-    added = [x for x in new if x not in old]
-    deled = [x for x in old if x not in new]
-    if added:
-        print(Fore.GREEN, Back.BLACK, " +{}: ".format(len(added)), Style.RESET_ALL, end="")
-        for x in added[:-1]:
-            print(Fore.BLACK, Back.GREEN, x, Style.RESET_ALL, end=", ")
-        print(Fore.BLACK, Back.GREEN, added[-1], Style.RESET_ALL, end="\n")
-    if deled:
-        print(Fore.RED, Back.BLACK, " -{}: ".format(len(deled)), Style.RESET_ALL, end="")
-        for x in deled[:-1]:
-            print(Fore.BLACK, Back.RED, x, Style.RESET_ALL, end=", ")
-        print(Fore.BLACK, Back.RED, deled[-1], Style.RESET_ALL)
-
-
 def main(args=None):
     parser = argparse.ArgumentParser(
         description=DESCRIPTION,
@@ -52,8 +38,20 @@ def main(args=None):
                         help="File with additional entries.")
     parser.add_argument("-o", "--output", default="references.bib",
                         help="Output file name. Default: `references.bib`")
+    parser.add_argument("-r", "--rawfile", default="none",
+                        help=("Filename to save bibcode and title info. "
+                              + "Set to `none` to skip it. Default: `none`")
+                        )
+    parser.add_argument("--index-file", default=None,
+                        help=("File to save the index of the output entries (citation "
+                              + "key, byte range, hash and origin, see "
+                              + "`ads2bibtex.read_index`). Set to `none` to skip it. "
+                              + "Default: `.<output>.index.json` beside the output")
+                        )
     parser.add_argument("-s", "--sort-option", default="date asc",
-                        help="Sort option for ADS API. Default: `'date asc'`")
+                        help=("Sort option for ADS API, for the formats which cannot be "
+                              + "split per entry. Otherwise, the entries are sorted by "
+                              + "bibcode (i.e., by year). Default: `'date asc'`"))
     parser.add_argument("-j", "--journal", default="ads", type=str,
                         help=("Journal name for the ADS API. One of [ads, full, iso4]. "
                               + "Default: `'ads'` (uses ADS macros, e.g., `\\apj`). "
@@ -62,6 +60,13 @@ def main(args=None):
                               + "names (e.g., `Astrophys. J.`)."
                               )
                         )
+    parser.add_argument("--accents", default="keep", type=str,
+                        help=("TeX accents in the fields of the output. One of [keep, "
+                              + "utf8, ascii]. Default: `'keep'` (e.g., `{\\\"o}`). "
+                              + "`'utf8'` decodes them (e.g., `ö`), `'ascii'` drops "
+                              + "them (e.g., `o`)."
+                              )
+                        )
     parser.add_argument("-f", "--format", default="bibtex", type=str,
                         help=("The output format of the bibliography item. "
                               + "Options are tagged formats (ads, bibtex, bibtexabs, "
@@ -72,67 +77,153 @@ def main(args=None):
                               + "http://adsabs.github.io/help/actions/export"
                               )
                         )
+    parser.add_argument("-c", "--cache-dir", default=None,
+                        help=("Directory of the on-disk cache of the exported records. "
+                              + "Set to `none` to disable it. "
+                              + "Default: `$XDG_CACHE_HOME/ads2bibtex` (`~/.cache/ads2bibtex`)")
+                        )
+    parser.add_argument("--cache-ttl", default=7, type=float,
+                        help="Days after which a cached record is exported again (default=7)")
+    parser.add_argument("--chunk-size", default=2000, type=int,
+                        help=("Maximum number of bibcodes per export request. Larger "
+                              + "exports are split into chunks (default=2000)")
+                        )
+    parser.add_argument("-w", "--workers", default=4, type=int,
+                        help="Maximum number of concurrent export requests (default=4)")
+    parser.add_argument("--iso4-processes", default=1, type=int,
+                        help=("Number of processes abbreviating the journal names with "
+                              + "`-j iso4` when there are many new ones (e.g., the first "
+                              + "sync of a large library). 0 to use all the CPUs (default=1)")
+                        )
     parser.add_argument("-n", "--num-iter", default=100000, type=int,
-                        help="number of iterations (default=100000 > 50000s=14hr)")
+                        help=("number of iterations, 0 to run indefinitely "
+                              + "(default=100000 > 50000s=14hr)"))
     parser.add_argument("-t", "--dtime", default=0.5, type=float,
-                        help="time between iterations (default=0.5s)")
+                        help=("time between iterations, i.e., between the checks of the "
+                              + "files if they cannot be watched by inotify (default=0.5s)"))
+    parser.add_argument("-T", "--max-dtime", default=300, type=float,
+                        help=("longest time between the retries of a failed export; "
+                              + "the interval grows from --dtime up to this (default=300s)"))
+    parser.add_argument("--daily-limit", default=5000, type=int,
+                        help=("number of ADS API requests allowed per 24 hours. The "
+                              + "retries are spaced so as not to exceed it. The requests "
+                              + "are recorded in `.ads-quota.json` (default=5000)"))
     parser.add_argument("-i", "--info-interval", default=5000, type=int,
                         help="number of iterations between info prints (default=5000)")
+    parser.add_argument("--show-keys", default=20, type=int,
+                        help=("Maximum number of the added/deleted keys printed per "
+                              + "change, 0 to print all of them (default=20)"))
+    parser.add_argument("--events", default="none",
+                        help=("File to append the changes to, as JSON events (one per "
+                              + "line, see `ads2bibtex.ChangeReport`), e.g., for a build "
+                              + "system. Set to `none` to skip it. Default: `none`")
+                        )
 
     args = parser.parse_args(args)
 
     token = _check_token()
+    client = ADSClient(token)
 
-    arg_ads = args.lib_or_file
-
-    bibs_old = extract_cite_keys(arg_ads)
+    # Only the changed files are scanned again.
+    project = TexProject(args.texfile)
+    print(f"{args.texfile}: {len(project.files)} files, "
+          + f"{len(project.bibcodes)} bibcodes cited.")
 
     arg_add = args.additional_file
-    adds_old, adds2_old = read_bib_add(arg_add)  # the raw file content & list of citekeys
+    additional = AdditionalFile(arg_add)
+    adds2_old = additional.keys
     rawfile = None if args.rawfile == "none" else args.rawfile
+    report = ChangeReport(max_items=args.show_keys,
+                          events=None if args.events == "none" else args.events)
+    save_index = args.index_file != "none"
+    index = OutputIndex(args.output, path=args.index_file if save_index else None)
+    cache = None if args.cache_dir == "none" else ExportCache(args.cache_dir,
+                                                              ttl=args.cache_ttl*86400)
+    if args.journal == "iso4":
+        from ads2bibtex.iso4 import (memo_info, set_abbreviation_cache,
+                                     set_abbreviation_workers)
+        set_abbreviation_workers(args.iso4_processes)
+        if cache is not None:
+            set_abbreviation_cache(AbbreviationCache(args.cache_dir))
     query_kw = dict(
         token=token,
         options=dict(sort=args.sort_option),
         fmt=args.format,
         journalname=args.journal,
+        accents=args.accents,
+        cache=cache,
+        chunksize=args.chunk_size,
+        max_workers=args.workers,
+        client=client,
     )
 
-    bibtex_ads = query_ads(bibs_old, **query_kw)
-
-    if rawfile is not None:
-        query_ads(bibs_old, **query_kw)
-
-    for i in range(args.num_iter):
-        time.sleep(args.dtime)
-        bibs, last_modified, _ = query_lib(arg_ads, token=token)  # only the bibcodes
-        adds, adds2 = read_bib_add(arg_add)
-        update = True if i == 0 else False
-
-        if last_modified != last_modified_old:
-            update = True
-            bibtex_ads = query_ads(bibs, **query_kw)
-            print_infostr(name, bibs, bibs_old)
-            bibs_old = bibs
-            last_modified_old = last_modified
-
-        if (adds != adds_old) or (adds2 != adds2_old):
+    # Only the newly cited bibcodes are exported from the next time. The
+    # order does not depend on where they are cited.
+    sync = LibrarySync(**query_kw)
+    # A failed export is retried with a growing interval, within the quota.
+    scheduler = PollScheduler(dtime=args.dtime, max_dtime=args.max_dtime,
+                              daily_limit=args.daily_limit, service="export")
+    retry_at = None  # the time of the next retry of a failed export
+    not_found = set()
+    bibs_old = None
+    pending = True  # whether the citations changed since the last export
+    iterations = itertools.count() if args.num_iter <= 0 else range(args.num_iter)
+    for i in iterations:
+        update = False
+        if project.update():
+            pending = True
+        if pending and (retry_at is None or time.time() >= retry_at):
+            bibs = sorted(project.bibcodes)
+            try:
+                sync.update(bibs)
+            except (ValueError, requests.RequestException) as e:
+                interval = scheduler.update(client)
+                retry_at = time.time() + interval
+                print(f"[WARNING] Export failed ({datetime.now()}), retried in "
+                      + f"{interval:.1f} s: {e}")
+            else:
+                scheduler.update(client, changed=True)
+                retry_at = None
+                pending = False
+                if sync.not_found - not_found:
+                    print("[WARNING] Not found in ADS (check the citation keys): "
+                          + ", ".join(sorted(sync.not_found - not_found)))
+                not_found = set(sync.not_found)
+                if bibs != bibs_old:
+                    update = True
+                    if bibs_old is not None:
+                        report.compare(args.texfile, bibs, bibs_old)
+                    bibs_old = bibs
+
+        if additional.update():
             update = True
-            print_infostr(arg_add, adds2, adds2_old)
-            adds_old = adds
-            adds2_old = adds2
+            report.compare(arg_add, additional.keys, adds2_old, updated=True)
+            adds2_old = additional.keys
 
         if update:
-            with open(args.output, "w+") as ff:
-                ff.writelines(bibtex_ads)
-                try:
-                    ff.writelines(adds)
-                except FileNotFoundError:
-                    pass
-            print(f"Updated: {args.output} \n({datetime.now()})\n")
-
-            if rawfile is not None:
-                make_rawfile(bibtex_ads, rawfile)
+            changes = index.update([("ads", sync.text), ("additional", additional.text)])
+            warning = index.duplicate_warning()
+            if warning is not None:
+                print(warning)
+            if write_output(args.output, sync.text + additional.text):
+                report.written(args.output, *changes)
+            if save_index:
+                index.save()
+
+            if rawfile is not None and make_rawfile(sync.text, rawfile):
+                report.written(rawfile)
 
         if (i > 0) and (i % args.info_interval == 0):
-            pct = 100 * i / args.num_iter
-            print(f"[INFORMATION] Iteration: {i} / {args.num_iter} ({pct:.1f} %) reached.")
+            if args.num_iter > 0:
+                pct = 100 * i / args.num_iter
+                print(f"[INFORMATION] Iteration: {i} / {args.num_iter} ({pct:.1f} %) "
+                      + f"reached. {sync.n_exported} bibcodes exported so far.")
+            else:
+                print(f"[INFORMATION] Iteration: {i} reached. "
+                      + f"{sync.n_exported} bibcodes exported so far.")
+            if args.journal == "iso4":
+                print(f"[INFORMATION] ISO 4 abbreviations: {memo_info()}")
+
+        # Wake up as soon as any file of the document (or the additional
+        # file) changes; the files are also re-included/dropped as edited.
+        wait_any(project.watchers + [additional.watcher], args.dtime, interval=args.dtime)
@@ -0,0 +1,141 @@
+from .core import SPLITTABLE_FORMATS, query_ads, split_entries
+
+__all__ = ["LibrarySync"]
+
+
+class LibrarySync:
+    """Keep the export of an ADS library in sync with its bibcode list.
+
+    Only the bibcodes which are new since the last `update` are exported from
+    ADS; the deleted ones are dropped locally, and the result is spliced in
+    the order of the given bibcodes. Thus, give the bibcodes already sorted
+    in the desired order (e.g., ``query_lib(..., sort="date asc")``).
+
+    If the format cannot be split per bibcode (see `SPLITTABLE_FORMATS`), or
+    ADS returns a key different from the requested bibcode (e.g., an alternate
+    bibcode was given), the whole list is exported as before. The bibcodes
+    which ADS does not return at all (e.g., typos) are left out, and not
+    exported again while they stay in the list (see `not_found`).
+
+    Parameters
+    ----------
+    token : str
+        ADS API token.
+    options, fmt, journalname, accents, cache : optional
+        Passed to `query_ads`.
+    **kwargs :
+        Other keyword arguments passed to `query_ads` (e.g., `chunksize`).
+
+    Attributes
+    ----------
+    bibcodes : list of str
+        The bibcodes of the last `update`.
+    text : str
+        The exported text for `bibcodes`.
+    records : dict
+        The exported entry text for each bibcode.
+    not_found : set of str
+        The bibcodes of `bibcodes` which ADS did not return.
+    """
+
+    def __init__(self, token, options=dict(sort="date asc"), fmt="bibtex",
+                 journalname="ads", accents="keep", cache=None, **kwargs):
+        self.token = token
+        self.options = dict(options)
+        self.fmt = fmt
+        self.journalname = journalname
+        self.accents = accents
+        self.cache = cache
+        self.kwargs = kwargs
+        self.bibcodes = []
+        self.records = {}
+        self.text = ""
+        self._aliased = set()  # bibcodes that ADS returns under another key
+        self.not_found = set()
+        self.n_exported = 0  # number of bibcodes requested to ADS so far
+
+    def _export(self, bibcodes):
+        self.n_exported += len(bibcodes)
+        return query_ads(bibcodes, token=self.token, options=self.options,
+                         fmt=self.fmt, journalname=self.journalname,
+                         accents=self.accents, cache=self.cache, **self.kwargs)
+
+    @property
+    def splittable(self):
+        return self.fmt in SPLITTABLE_FORMATS
+
+    def missing(self, bibcodes):
+        """The bibcodes in `bibcodes` which must be exported at `update`."""
+        if not self.splittable:
+            return list(bibcodes)
+        return [b for b in bibcodes if b not in self.records and b not in self.not_found]
+
+    def update(self, bibcodes, fetched=None):
+        """Update the export to the new list of bibcodes.
+
+        Parameters
+        ----------
+        bibcodes : list of str
+            The new (sorted) bibcodes.
+        fetched : dict, optional
+            ``{bibcode: entry_text}`` already exported with the same settings
+            (e.g., for another library), which are used instead of exporting
+            them again.
+
+        Returns
+        -------
+        added, deleted : list of str
+            The bibcodes added/deleted since the last update.
+        """
+        steps = self._update_steps(bibcodes, fetched)
+        try:
+            to_export = next(steps)
+            while True:
+                to_export = steps.send(self._export(to_export))
+        except StopIteration as stop:
+            return stop.value
+
+    def _update_steps(self, bibcodes, fetched=None):
+        """Generator of `update`, independent of how the export is done.
+
+        Yields the bibcodes to be exported, and receives the exported text.
+        Returns ``(added, deleted)``. `bibcodes` is set only at the end, so
+        that the same change is found again if an export fails.
+        """
+        bibcodes = list(bibcodes)
+        new, old = set(bibcodes), set(self.bibcodes)
+        added = [b for b in bibcodes if b not in old]
+        deleted = [b for b in self.bibcodes if b not in new]
+
+        for bib in deleted:
+            self.records.pop(bib, None)
+
+        if not self.splittable:
+            self.text = (yield bibcodes) if bibcodes else ""
+            self.bibcodes = bibcodes
+            return added, deleted
+
+        self._aliased &= new
+        self.not_found &= new
+        if fetched:
+            self.records.update((b, fetched[b]) for b in new if b in fetched)
+        missing = self.missing(bibcodes)
+        if missing and not self._aliased:
+            exported = split_entries((yield missing))
+            self.records.update(exported)
+            absent = [b for b in missing if b not in exported]
+            # Other keys returned (for some of `absent`, but which ones is
+            # not known), or nothing at all for them.
+            if any(key not in new for key in exported):
+                self._aliased.update(absent)
+            else:
+                self.not_found.update(absent)
+
+        if self._aliased:  # ADS did not return some bibcodes as they are.
+            if added or deleted:
+                self.text = yield bibcodes
+            self.records = split_entries(self.text)
+        else:
+            self.text = "".join(self.records[b] for b in bibcodes if b in self.records)
+        self.bibcodes = bibcodes
+        return added, deleted
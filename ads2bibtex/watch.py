@@ -0,0 +1,351 @@
+import hashlib
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+from .bibtex import _reparse
+from .core import _is_bibcode, _scan_tex, _tex_include_path
+
+__all__ = ["FileWatcher", "AdditionalFile", "TexProject", "wait_any"]
+
+# inotify(7) constants
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+# Editors often save by writing another file and renaming it, so that the
+# directory is watched, not the file.
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len (+ name)
+
+
+class _Inotify:
+    """The events of the entries of a directory (Linux inotify, via ctypes).
+
+    Raises `OSError` if inotify is not available.
+    """
+
+    def __init__(self, directory):
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                               use_errno=True)
+            init1, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise OSError("inotify is not available.")
+        self.fd = init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed.")
+        if add_watch(self.fd, os.fsencode(directory), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Cannot watch {directory}.")
+
+    def read(self):
+        """The names of the entries with events since the last read.
+
+        `None` is in the names if the events may have been lost (queue
+        overflow, or the directory itself was moved or deleted).
+        """
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return names
+            pos = 0
+            while pos < len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size
+                if mask & (_IN_Q_OVERFLOW | _IN_DELETE_SELF | _IN_MOVE_SELF):
+                    names.add(None)
+                if length:
+                    names.add(os.fsdecode(data[pos:pos + length].rstrip(b"\0")))
+                pos += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """Tell whether a file changed, without reading it when it did not.
+
+    On Linux, the directory of the file is watched by inotify, so that the
+    file is not even stat'ed until an event names it. Otherwise (or if
+    inotify cannot be used, e.g., the limit of watches is reached), its
+    modification time and size are compared at each check. In both cases,
+    the file is read only if these changed, and its contents are hashed, so
+    that touching it or saving it as it was is not a change.
+
+    Parameters
+    ----------
+    path : path-like
+        The file to watch (it may not exist yet).
+    inotify : bool, optional
+        Whether to use inotify if available, by default `True`.
+
+    Attributes
+    ----------
+    data : bytes or None
+        The contents at the last change (`None` if the file does not exist).
+    fd : int or None
+        The inotify file descriptor (to `select`), `None` if polling.
+    """
+
+    def __init__(self, path, inotify=True):
+        self.path = Path(path)
+        self.data = None
+        self.fd = None
+        self._inotify = None
+        if inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify(self.path.parent)
+                self.fd = self._inotify.fd
+            except OSError:
+                pass
+        self._stat = None
+        self._digest = None
+        self._pending = False
+        self._check()
+
+    def _check(self):
+        """Stat (and read, if needed) the file. Returns whether it changed."""
+        try:
+            st = os.stat(self.path)
+            stat = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            stat = None
+        if stat == self._stat:
+            return False
+        self._stat = stat
+        try:
+            data = None if stat is None else self.path.read_bytes()
+        except FileNotFoundError:
+            data = None
+        digest = None if data is None else hashlib.blake2b(data).digest()
+        if digest == self._digest:
+            return False
+        self._digest = digest
+        self.data = data
+        return True
+
+    def poll(self):
+        """Check for a change, which is kept until `changed` is called."""
+        if not self._pending:
+            if self._inotify is not None:
+                names = self._inotify.read()
+                if self.path.name in names or None in names:
+                    self._pending = self._check()
+            else:
+                self._pending = self._check()
+        return self._pending
+
+    def changed(self):
+        """Whether the file changed since the last call (never blocks)."""
+        changed = self.poll()
+        self._pending = False
+        return changed
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = self.fd = None
+
+
+def wait_any(watchers, timeout, interval=1.):
+    """Wait until any of `watchers` changed, for `timeout` seconds at most.
+
+    The inotify descriptors are `select`-ed; if any watcher is polling, all
+    of them are checked every `interval` seconds instead.
+
+    Parameters
+    ----------
+    watchers : list of `FileWatcher`
+        The watchers (`None` items are ignored).
+    timeout : float
+        The maximum time to wait in seconds.
+    interval : float, optional
+        The polling interval in seconds, by default 1.
+
+    Returns
+    -------
+    changed : bool
+        Whether any watcher changed (call their `~FileWatcher.changed`).
+    """
+    watchers = [w for w in watchers if w is not None]
+    deadline = time.monotonic() + max(timeout, 0)
+    while True:
+        if any([w.poll() for w in watchers]):
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        if not watchers:
+            time.sleep(remaining)
+        elif all(w.fd is not None for w in watchers):
+            select.select([w.fd for w in watchers], [], [], remaining)
+        else:
+            time.sleep(min(remaining, interval))
+
+
+class AdditionalFile:
+    """The additional file of entries, re-parsed only where it changed.
+
+    Same as `~ads2bibtex.read_bib_add`, but the file is read only when its
+    `FileWatcher` signals a change, and only the entries around the changed
+    part are parsed again.
+
+    Parameters
+    ----------
+    fname : path-like or None
+        The additional file (`None`: no file, always empty).
+    inotify : bool, optional
+        Passed to `FileWatcher`.
+
+    Attributes
+    ----------
+    text : str
+        The contents of the file (``""`` if it does not exist).
+    keys : list of str
+        The citation keys of the entries.
+    watcher : `FileWatcher` or None
+        The watcher of the file.
+    """
+
+    def __init__(self, fname, inotify=True):
+        self.fname = fname
+        self.text = ""
+        self.keys = []
+        self._entries = []  # (start, end, citation key) in `text`
+        self._strays = []  # "@" outside the entries (e.g., never closed ones)
+        self.watcher = None if fname is None else FileWatcher(fname, inotify=inotify)
+        if self.watcher is not None:
+            self._parse(self.watcher.data)
+
+    def _parse(self, data):
+        new = "" if data is None else data.decode("utf-8")
+        new = new.replace("\r\n", "\n").replace("\r", "\n")  # as `open(fname, "r")`
+        self._entries, self._strays, _ = _reparse(self.text, new, self._entries,
+                                                  self._strays)
+        self.text = new
+        self.keys = [key for _, _, key in self._entries if key is not None]
+
+    def update(self):
+        """Re-parse the file if it changed. Returns whether it changed."""
+        if self.watcher is None or not self.watcher.changed():
+            return False
+        self._parse(self.watcher.data)
+        return True
+
+    def close(self):
+        if self.watcher is not None:
+            self.watcher.close()
+
+
+class _TexFile:
+    """The citation keys and included files of one tex file (`_scan_tex`)."""
+
+    def __init__(self, path, inotify=True):
+        self.watcher = FileWatcher(path, inotify=inotify)
+        self._parse()
+
+    def _parse(self):
+        data = self.watcher.data
+        self.items = [] if data is None else _scan_tex(
+            data.decode("utf-8", errors="replace").replace("\r\n", "\n")
+        )
+
+    def update(self):
+        if not self.watcher.changed():
+            return False
+        self._parse()
+        return True
+
+    def close(self):
+        self.watcher.close()
+
+
+class TexProject:
+    """The citation keys of a (multi-file) LaTeX document, kept up to date.
+
+    The files of ``\\input``, ``\\include`` and ``\\subfile`` are followed
+    (relative to the directory of the main file, as LaTeX does when compiling
+    it). Each file is watched by a `FileWatcher` and only the changed files
+    are scanned again.
+
+    Parameters
+    ----------
+    main : path-like
+        The main tex file.
+    inotify : bool, optional
+        Passed to `FileWatcher`.
+
+    Attributes
+    ----------
+    keys : list of str
+        All the citation keys, in the order of the first citation.
+    """
+
+    def __init__(self, main, inotify=True):
+        self.main = Path(main)
+        self.root = self.main.parent
+        self.inotify = inotify
+        self.keys = []
+        self._files = {}  # resolved path -> _TexFile, of the included files
+        self.update()
+
+    @property
+    def bibcodes(self):
+        """The citation keys which are ADS bibcodes."""
+        return [key for key in self.keys if _is_bibcode(key)]
+
+    @property
+    def files(self):
+        """The files of the document (existing or not)."""
+        return [texfile.watcher.path for texfile in self._files.values()]
+
+    @property
+    def watchers(self):
+        return [texfile.watcher for texfile in self._files.values()]
+
+    def update(self):
+        """Scan the changed files again. Returns whether the keys changed."""
+        if self._files and not any([f.update() for f in self._files.values()]):
+            return False
+        old_files, files, keys = self._files, {}, {}
+
+        def _walk(path):
+            rpath = path.resolve()
+            if rpath in files:  # (also, an \input of itself)
+                return
+            texfile = old_files.pop(rpath, None) or _TexFile(path, self.inotify)
+            files[rpath] = texfile
+            for key, name in texfile.items:
+                if key is None:
+                    _walk(_tex_include_path(name, self.root))
+                else:
+                    keys.setdefault(key)
+
+        _walk(self.main)
+        for texfile in old_files.values():  # not included anymore
+            texfile.close()
+        self._files = files
+        changed = list(keys) != self.keys
+        self.keys = list(keys)
+        return changed
+
+    def close(self):
+        for texfile in self._files.values():
+            texfile.close()
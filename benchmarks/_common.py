@@ -0,0 +1,135 @@
+"""Synthetic bibliographies and timing shared by the benchmarks."""
+import importlib.util
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+__all__ = ["best_of", "extract", "journal_titles", "load_package", "make_bib", "report"]
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Words of journal titles, combined into distinct titles.
+TITLE_WORDS = [
+    "Advances", "Annals", "Applied", "Astronomical", "Astronomy", "Astroparticle",
+    "Astrophysical", "Astrophysics", "Biological", "Chemical", "Communications",
+    "Computational", "Condensed", "Cosmology", "Dynamics", "Earth", "Electronic",
+    "Engineering", "Environmental", "Experimental", "Fluid", "Galactic",
+    "Geophysical", "Gravitation", "Instrumentation", "International", "Journal",
+    "Letters", "Mathematical", "Mechanics", "Methods", "Molecular", "Monthly",
+    "Notices", "Nuclear", "Optical", "Particle", "Physical", "Physics",
+    "Planetary", "Plasma", "Proceedings", "Quantitative", "Radiation", "Research",
+    "Reviews", "Royal", "Scientific", "Society", "Solar", "Space", "Spectroscopy",
+    "Statistical", "Stellar", "Studies", "Surveys", "Technology", "Theoretical",
+    "Transactions", "Universe",
+]
+
+
+def journal_titles(n, seed=0):
+    """`n` distinct journal titles (e.g., ``"Journal of Plasma Research"``)."""
+    rng = random.Random(seed)
+    titles = {}
+    while len(titles) < n:
+        words = rng.sample(TITLE_WORDS, rng.randint(2, 4))
+        if rng.random() < 0.5:
+            words.insert(1, "of")
+        titles[" ".join(words)] = None
+    return list(titles)
+
+
+ABSTRACT = ("We present observations of {} with a $\\sim$10\\% precision, "
+            "and model them with the ``standard'' approach. ")
+
+
+def _record(i, journal, rng, abstract):
+    year = 1990 + i % 35
+    bibcode = f"{year}ApJ...{i // 10000 % 1000:03d}.{i % 10000:04d}D"[:19]
+    head = (f"@ARTICLE{{{bibcode},\n"
+            f"       author = {{{{Doe}}, Jane and {{M{{\\\"u}}ller}}, Hans and "
+            f"{{Roe}}, Richard and et al.}},\n"
+            f"        title = \"{{A {{quoted}} study of {rng.choice(TITLE_WORDS)} "
+            f"number {i}}}\",\n"
+            f"      journal = {{{journal}}},\n")
+    if abstract:
+        text = ABSTRACT.format(rng.choice(TITLE_WORDS)) * 20
+        head += f"     abstract = \"{{{text}}}\",\n"
+    return head + (f"     keywords = {{Astrophysics - Astrophysics of Galaxies}},\n"
+                   f"         year = {year},\n"
+                   f"        month = jan,\n"
+                   f"       volume = {{{i % 1000}}},\n"
+                   f"        pages = {{{i % 997}}},\n"
+                   f"          doi = {{10.0000/{bibcode}}},\n"
+                   f"       adsurl = {{https://ui.adsabs.harvard.edu/abs/{bibcode}}},\n"
+                   f"      adsnote = {{Provided by the SAO/NASA Astrophysics Data System}}\n"
+                   f"}}\n\n")
+
+
+def make_bib(n=None, size=None, journals=None, abstracts=False, seed=0):
+    """Synthetic BibTeX text as exported by ADS.
+
+    Parameters
+    ----------
+    n : int, optional
+        The number of entries.
+    size : int, optional
+        Or the size of the text in bytes (at least).
+    journals : list of str, optional
+        The journal fields, used in turn. By default, the ADS macros (e.g.,
+        ``\\apj``) of `~ads2bibtex.core.JOURNAL_MACRO`.
+    abstracts : bool, optional
+        Whether the entries have (~2 kB) abstracts, as exported in the
+        ``bibtexabs`` format.
+    """
+    rng = random.Random(seed)
+    if journals is None:
+        from ads2bibtex.core import JOURNAL_MACRO
+        journals = ["\\" + macro for macro in JOURNAL_MACRO]
+    records = []
+    total = 0
+    i = 0
+    while (n is None or i < n) and (size is None or total < size):
+        records.append(_record(i, journals[i % len(journals)], rng, abstracts))
+        total += len(records[-1])
+        i += 1
+    return "".join(records)
+
+
+def best_of(func, repeat=3, number=1):
+    """The shortest time (s) of `repeat` runs of `number` calls of `func`."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - t0) / number)
+    return min(times)
+
+
+def report(name, seconds, size=None):
+    """Print a result line (with the throughput in MB/s if `size` bytes)."""
+    line = f"{name:<44s} {seconds*1e3:10.2f} ms"
+    if size is not None:
+        line += f"  {size / seconds / 1e6:8.1f} MB/s"
+    print(line)
+
+
+def extract(rev, tmpdir):
+    """Extract the tree of the git revision `rev` into `tmpdir` (a `Path`)."""
+    archive = subprocess.run(["git", "-C", str(ROOT), "archive", rev],
+                             stdout=subprocess.PIPE, check=True).stdout
+    tmpdir.mkdir(parents=True)
+    subprocess.run(["tar", "-x", "-C", str(tmpdir)], input=archive, check=True)
+    return tmpdir
+
+
+def load_package(tree, name):
+    """Import the `ads2bibtex` package of `tree` (e.g., `extract`) as `name`."""
+    path = Path(tree) / "ads2bibtex"
+    spec = importlib.util.spec_from_file_location(
+        name, path / "__init__.py", submodule_search_locations=[str(path)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
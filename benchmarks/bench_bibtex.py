@@ -0,0 +1,99 @@
+"""Benchmark of the BibTeX parser and of the functions built on it.
+
+`~ads2bibtex.iter_entries` (keys only, all the fields, a few fields, from a
+binary file) and the functions of `ads2bibtex.core` which read the entries
+are timed on a synthetic ADS-like BibTeX file (by default 50 MB, with
+abstracts as in the ``bibtexabs`` format). With ``--rev``, the same
+functions of another git revision are timed too, e.g., the line-splitting
+code paths before the parser::
+
+    python benchmarks/bench_bibtex.py --rev c251dd0~1
+"""
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import ads2bibtex
+
+from _common import best_of, extract, load_package, make_bib, report
+
+CHANGES = [("full", "keep"), ("iso4", "keep"), ("full", "utf8")]
+
+
+def time_core(label, package, bib, path, repeat):
+    """Time the functions of `package.core` reading the entries of `bib`."""
+    size = len(bib.encode("utf-8"))
+    pcore = package.core
+    print(f"--- {label}")
+    report("split_entries", best_of(lambda: pcore.split_entries(bib), repeat), size)
+    report("read_bib_add", best_of(lambda: pcore.read_bib_add(path), repeat), size)
+    rawfile = path.with_name(f"raw_{label.replace(' ', '_')}.txt")
+    report("make_rawfile", best_of(lambda: pcore.make_rawfile(bib, rawfile), repeat), size)
+    for journalname, accents in CHANGES:
+        if accents == "keep":
+            def change():
+                return pcore.change_journal_name(bib, journalname=journalname)
+        elif "accents" in pcore.change_journal_name.__code__.co_varnames:
+            def change():
+                return pcore.change_journal_name(bib, journalname=journalname,
+                                                 accents=accents)
+        else:  # (no accent stage in this revision)
+            continue
+        report(f"change_journal_name {journalname}/{accents}", best_of(change, repeat),
+               size)
+
+
+def time_parser(bib, path, repeat):
+    size = len(bib.encode("utf-8"))
+    iter_entries = ads2bibtex.iter_entries
+
+    def count(source, fields=True):
+        return sum(1 for _ in iter_entries(source, fields=fields))
+
+    print("--- iter_entries")
+    n = count(bib, fields=False)
+    report(f"keys only ({n} entries)", best_of(lambda: count(bib, False), repeat), size)
+    report("all the fields", best_of(lambda: count(bib), repeat), size)
+    report("author, title", best_of(lambda: count(bib, ("author", "title")), repeat),
+           size)
+
+    def binary():
+        with open(path, "rb") as ff:
+            return count(ff)
+
+    report("all the fields, binary file", best_of(binary, repeat), size)
+    tracemalloc.start()
+    binary()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"(peak memory of the binary file parse: {peak / 1024:.0f} KiB)")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default=50, type=float,
+                        help="Size of the BibTeX file in MB (default=50)")
+    parser.add_argument("--no-abstracts", action="store_true", default=False,
+                        help="Entries without abstracts (more, shorter entries)")
+    parser.add_argument("--rev", action="append", default=[],
+                        help="Git revision to time as well (may be repeated)")
+    parser.add_argument("-r", "--repeat", default=3, type=int,
+                        help="Number of runs, the best one is shown (default=3)")
+    args = parser.parse_args(args)
+
+    bib = make_bib(size=int(args.size * 1e6), abstracts=not args.no_abstracts)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "references.bib"
+        path.write_text(bib)
+        print(f"{bib.count('@ARTICLE')} entries, {path.stat().st_size / 1e6:.1f} MB")
+        time_parser(bib, path, args.repeat)
+        time_core("working tree", ads2bibtex, bib, path, args.repeat)
+        for i, rev in enumerate(args.rev):
+            tree = extract(rev, Path(tmp) / f"rev{i}")
+            time_core(rev, load_package(tree, f"ads2bibtex_rev{i}"), bib, path,
+                      args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark of the startup time of `ads2bibtex` (fresh interpreters).
+
+Each statement is timed in new Python processes (best of ``-r``), for the
+working tree and optionally for other git revisions (extracted to temporary
+directories with ``git archive``), e.g., to compare with the revision
+before the lazy import of `ads2bibtex.iso4`::
+
+    python benchmarks/bench_import.py --rev HEAD~10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from _common import ROOT, extract
+
+STATEMENTS = [
+    "import ads2bibtex",
+    "import ads2bibtex.scripts.ads2bib",
+    "import ads2bibtex.iso4",
+    "from ads2bibtex.iso4 import abbreviate; abbreviate('Astrophysical Journal')",
+]
+
+
+def time_statement(statement, path, repeat):
+    """The shortest wall time (s) of ``python -c statement`` with `path` first."""
+    env = dict(os.environ, PYTHONPATH=str(path))
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", statement], env=env, cwd=str(path),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        times.append(time.perf_counter() - t0)
+        if proc.returncode != 0:
+            lines = [line.strip() for line in proc.stderr.decode().splitlines()
+                     if any(c.isalpha() for c in line)]
+            errors = [line for line in lines if line.split(":")[0].endswith("Error")]
+            return None, (errors or lines or [f"exit code {proc.returncode}"])[-1]
+    return min(times), None
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rev", action="append", default=[],
+                        help="Git revision to time as well (may be repeated)")
+    parser.add_argument("-r", "--repeat", default=5, type=int,
+                        help="Number of processes per statement (default=5)")
+    args = parser.parse_args(args)
+
+    print(f"{'python -c':<80s} {'s':>6s}")
+    baseline = time_statement("pass", ROOT, args.repeat)[0]
+    print(f"{'(interpreter only)':<80s} {baseline:6.3f}")
+    with tempfile.TemporaryDirectory() as tmp:
+        trees = [("working tree", ROOT)]
+        for rev in args.rev:
+            trees.append((rev, extract(rev, Path(tmp) / rev.replace("/", "_"))))
+        for label, path in trees:
+            print(f"--- {label}")
+            for statement in STATEMENTS:
+                seconds, error = time_statement(statement, path, args.repeat)
+                shown = f"{seconds:6.3f}" if error is None else f"failed: {error}"
+                print(f"{statement:<80s} {shown}")
+
+
+if __name__ == "__main__":
+    main()
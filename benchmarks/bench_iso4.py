@@ -0,0 +1,79 @@
+"""Benchmark of the LTWA lookups of `ads2bibtex.iso4` and of ``-j iso4``.
+
+The prefix/suffix/infix lookups of the index (`~ads2bibtex.iso4.index`,
+`~ads2bibtex.iso4.lookup`) are compared with the linear scan they replaced
+(the patterns re-sorted by length and tried one by one for each word), and
+the journal names of a bibliography with distinct journal titles are
+abbreviated end to end::
+
+    python benchmarks/bench_iso4.py -n 2000
+"""
+import argparse
+import importlib
+import re
+
+from ads2bibtex import change_journal_name
+from ads2bibtex.iso4 import ltwa_signature, memo_clear
+
+from _common import best_of, journal_titles, make_bib, report
+
+# (the module, not the function re-exported by `ads2bibtex.iso4`)
+_abbr = importlib.import_module("ads2bibtex.iso4.abbreviate")
+PREFIX, SUFFIX, INFIX = _abbr.PREFIX, _abbr.SUFFIX, _abbr.INFIX
+TESTS = {PREFIX: str.startswith, SUFFIX: str.endswith,
+         INFIX: lambda word, infix: infix in word}
+
+
+def linear_longest(wtype, word):
+    """The lookup before the index: sort by length for each word, then scan."""
+    table = _abbr.LTWA[wtype]
+    for key in sorted(table.keys(), key=lambda p: (-len(p), p)):
+        if TESTS[wtype](word, key):
+            return table[key]
+    return ""
+
+
+def index_longest(wtype, word):
+    return _abbr.LOOKUP[wtype].longest(word, "")
+
+
+def lookup_all(longest, words):
+    return [longest(wtype, word) for word in words for wtype in (PREFIX, SUFFIX, INFIX)]
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--entries", default=2000, type=int,
+                        help="Number of entries (distinct journal titles) (default=2000)")
+    parser.add_argument("--linear-words", default=100, type=int,
+                        help=("Number of words looked up by the (slow) linear scan "
+                              + "(default=100)"))
+    args = parser.parse_args(args)
+
+    print(ltwa_signature())
+    titles = journal_titles(args.entries)
+    words = list(dict.fromkeys(w.lower() for t in titles for w in re.findall(r"\w+", t)))
+    few = words[:args.linear_words]
+    assert lookup_all(linear_longest, few) == lookup_all(index_longest, few)
+
+    t_linear = best_of(lambda: lookup_all(linear_longest, few), repeat=1)
+    t_index = best_of(lambda: lookup_all(index_longest, words))
+    report(f"linear scan ({len(few)} words)", t_linear)
+    report(f"index ({len(words)} words)", t_index)
+    print(f"per word: linear {t_linear / len(few) * 1e6:.0f} us, "
+          + f"index {t_index / len(words) * 1e6:.1f} us "
+          + f"(x{t_linear / len(few) / (t_index / len(words)):.0f})")
+
+    bib = make_bib(n=args.entries, journals=titles)
+
+    def cold():
+        memo_clear()
+        change_journal_name(bib, journalname="iso4")
+
+    report(f"-j iso4, {args.entries} entries (cold)", best_of(cold), len(bib))
+    report(f"-j iso4, {args.entries} entries (memoized)",
+           best_of(lambda: change_journal_name(bib, journalname="iso4")), len(bib))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark of the expansion of the journal macros (``-j full``).
+
+The loop of one `re.sub` per macro over the whole text (before the single
+alternation `~ads2bibtex.core._MACRO_REGEX`) is compared with the single
+pass over the text, and with `~ads2bibtex.change_journal_name`, which
+expands the macros of the journal/booktitle fields only, on a multi-MB
+synthetic BibTeX file::
+
+    python benchmarks/bench_macros.py --size 20
+"""
+import argparse
+import io
+import re
+
+from ads2bibtex import change_journal_name, iter_change_journal_name
+from ads2bibtex.core import _MACRO_REGEX, JOURNAL_MACRO, _expand_macro_match
+
+from _common import best_of, make_bib, report
+
+
+def loop_sub(text):
+    """The expansion before the single alternation: one pass per macro."""
+    for k, v in JOURNAL_MACRO.items():
+        text = re.sub(r"\\{}".format(k), v, text)
+    return text
+
+
+def single_pass(text):
+    return _MACRO_REGEX.sub(_expand_macro_match, text)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default=5, type=float,
+                        help="Size of the BibTeX text in MB (default=5)")
+    parser.add_argument("-r", "--repeat", default=3, type=int,
+                        help="Number of runs, the best one is shown (default=3)")
+    args = parser.parse_args(args)
+
+    bib = make_bib(size=int(args.size * 1e6))
+    size = len(bib.encode("utf-8"))
+    print(f"{bib.count('@ARTICLE')} entries, {size / 1e6:.1f} MB, "
+          + f"{len(JOURNAL_MACRO)} macros")
+    expanded = change_journal_name(bib, journalname="full")
+    assert single_pass(bib) == expanded
+
+    report("re.sub per macro (whole text)", best_of(lambda: loop_sub(bib), args.repeat),
+           size)
+    report("single alternation (whole text)",
+           best_of(lambda: single_pass(bib), args.repeat), size)
+    report("change_journal_name (fields)",
+           best_of(lambda: change_journal_name(bib, journalname="full"), args.repeat),
+           size)
+
+    def stream():
+        for _ in iter_change_journal_name(io.StringIO(bib), journalname="full"):
+            pass
+
+    report("iter_change_journal_name (streamed)", best_of(stream, args.repeat), size)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,10 +23,14 @@ setup(
     packages=find_packages(),
     entry_points={
         'console_scripts': [
-            'ads2bibtex = ads2bibtex.scripts.ads2bib:main'
+            'ads2bibtex = ads2bibtex.scripts.ads2bib:main',
+            'ads2bibtex-daemon = ads2bibtex.scripts.ads2bibd:main',
+            'ads2bibtex-tex = ads2bibtex.scripts.tex2bib:main',
+            'ads2bibtex-build-ltwa = ads2bibtex.scripts.build_ltwa:main'
         ]
     },
     include_package_data=True,
-    python_requires='>=3.6',
+    package_data={"ads2bibtex.iso4": ["LTWA.idx", "*.csv", "*.txt"]},
+    python_requires='>=3.7',
     install_requires=install_requires
 )
@@ -0,0 +1,203 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+from ads2bibtex import ADSClient
+
+ADS_URL = "https://api.adsabs.harvard.edu/v1/"
+
+
+def make_record(bibcode):
+    """A BibTeX record as exported by ADS (with a quoted, nested title)."""
+    return ("@ARTICLE{%s,\n"
+            "       author = {{Doe}, Jane and {Roe}, Richard},\n"
+            "        title = \"{A {quoted} title of %s}\",\n"
+            "      journal = {\\apj},\n"
+            "         year = %s,\n"
+            "}\n\n" % (bibcode, bibcode, bibcode[:4]))
+
+
+def make_bibcodes(n, year=2020):
+    return [f"{year}ApJ...{i // 1000:03d}.{i % 1000:04d}D"[:19] for i in range(n)]
+
+
+class FakeADS:
+    """Stand-in of the ADS API (biblib and export), served on localhost.
+
+    Attributes
+    ----------
+    url : str
+        The base URL (like ``https://api.adsabs.harvard.edu/v1/``).
+    down : set of str
+        The services (``"biblib"``, ``"export"``) answering 503.
+    pages : list of (int, int)
+        The ``(start, rows)`` of each listing request (not ``rows=0``).
+    exported : list of list of str
+        The bibcodes of each export request.
+    unknown : set of str
+        The bibcodes which are not exported (e.g., typos).
+    etags : bool
+        Whether the library queries have an ``ETag`` (answered 304 Not
+        Modified to ``If-None-Match``).
+    ratelimit : dict or None
+        The ``X-RateLimit-*`` headers (``limit``, ``remaining``, ``reset``)
+        of all the responses.
+    n_not_modified : int
+        The number of 304 responses.
+    script : list
+        The ``(library, bibcodes)`` set (or a function called with this
+        object, or `None`: nothing changed) before answering each metadata
+        query (``rows=0``, i.e., each poll).
+    """
+
+    def __init__(self):
+        self.libraries = {}
+        self.down = set()
+        self.pages = []
+        self.exported = []
+        self.unknown = set()
+        self.etags = False
+        self.ratelimit = None
+        self.n_not_modified = 0
+        self.script = []
+        self.n_requests = 0
+        self._lock = threading.RLock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/v1/"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def set_library(self, library, bibcodes, name="test"):
+        """Create or modify (bumps ``date_last_modified``) a library."""
+        with self._lock:
+            old = self.libraries.get(library, {"version": 0})
+            self.libraries[library] = dict(name=name, bibcodes=list(bibcodes),
+                                           version=old["version"] + 1)
+
+    def handle(self, method, path, query, body, headers={}):
+        """``(status, JSON result or None, headers)`` of a request."""
+        with self._lock:
+            self.n_requests += 1
+            out = {}
+            if self.ratelimit is not None:
+                out.update({f"X-RateLimit-{k.capitalize()}": str(v)
+                            for k, v in self.ratelimit.items()})
+            status, result = self._handle(method, path, query, body, headers, out)
+            return status, result, out
+
+    def _handle(self, method, path, query, body, headers, out):
+        parts = path.strip("/").split("/")  # v1, service, ...
+        if parts[1] in self.down:
+            return 503, {"error": "Service Unavailable"}
+        if method == "GET" and parts[1:3] == ["biblib", "libraries"]:
+            if query.get("rows") == ["0"] and self.script:
+                change = self.script.pop(0)
+                if callable(change):
+                    change(self)
+                elif change is not None:
+                    self.set_library(*change)
+            lib = self.libraries.get(parts[3])
+            if lib is None:
+                return 404, {"error": "No such library"}
+            start = int(query.get("start", ["0"])[0])
+            rows = int(query.get("rows", ["20"])[0])
+            if self.etags:
+                out["ETag"] = f'"{parts[3]}-{lib["version"]}-{start}-{rows}"'
+                if headers.get("If-None-Match") == out["ETag"]:
+                    self.n_not_modified += 1
+                    return 304, None
+            if rows:
+                self.pages.append((start, rows))
+            meta = dict(name=lib["name"], num_documents=len(lib["bibcodes"]),
+                        date_last_modified=f"2024-01-01T00:00:{lib['version']:02d}")
+            return 200, dict(metadata=meta,
+                             documents=lib["bibcodes"][start:start + rows])
+        if method == "POST" and parts[1] == "export":
+            options = json.loads(body)
+            bibcodes = options["bibcode"]
+            self.exported.append(list(bibcodes))
+            if parts[2] == "custom":
+                text = "".join(f"{b}  # {options['format']}\n" for b in bibcodes)
+            else:
+                text = "".join(make_record(b) for b in bibcodes
+                               if b not in self.unknown)
+            return 200, dict(export=text)
+        return 404, {"error": "Not found"}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self, method):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8") if length else ""
+                status, result, headers = fake.handle(method, url.path,
+                                                      parse_qs(url.query), body,
+                                                      self.headers)
+                data = b"" if result is None else json.dumps(result).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if result is not None:
+                    self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._respond("GET")
+
+            def do_POST(self):
+                self._respond("POST")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def mount(self, client):
+        """Send the requests of `client` to ADS (`ADS_URL`) to this server."""
+        client.session.mount(ADS_URL, _Redirect(ADS_URL, self.url))
+        client.max_retries = 0  # an outage fails at once
+        return client
+
+    def client(self, token="token"):
+        return self.mount(ADSClient(token))
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Redirect(requests.adapters.HTTPAdapter):
+    def __init__(self, old, new):
+        super().__init__()
+        self.old, self.new = old, new
+
+    def send(self, request, **kwargs):
+        request.url = self.new + request.url[len(self.old):]
+        return super().send(request, **kwargs)
+
+
+@pytest.fixture
+def fake_ads():
+    fake = FakeADS()
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def fake_client_class(fake_ads):
+    """`ADSClient` whose requests go to `fake_ads` (to patch the scripts)."""
+
+    class FakeADSClient(ADSClient):
+        def __init__(self, token, **kwargs):
+            super().__init__(token, **kwargs)
+            fake_ads.mount(self)
+
+    return FakeADSClient
@@ -0,0 +1,35 @@
+import re
+
+from ads2bibtex.accents import AccentConverter, decode_tex_accents
+
+TEXT = ('{M{\\"u}ller}, Hans and Schr\\"odinger, E. and {\\\'E}tienne, \\c{c}a '
+        "and Erd\\H{o}s, P. and 100\\% {\\bf bold}")
+
+
+def decode_per_detector(converter, s, utf8_or_ascii=1):
+    """The decoder before the single pass: each detector in turn."""
+    for detector in converter.accent_detector:
+        for s1 in set(re.findall(detector, s)):
+            x = s1.replace(" ", "")
+            if x in converter.translation_rule:
+                s = s.replace(s1, converter.translation_rule[x][0 if utf8_or_ascii else 1])
+    return s
+
+
+def test_same_as_per_detector():
+    converter = AccentConverter()
+    for key in converter.translation_rule:
+        for utf8_or_ascii in (1, 0):
+            assert decode_tex_accents(key, utf8_or_ascii) \
+                == decode_per_detector(converter, key, utf8_or_ascii), key
+    assert decode_tex_accents(TEXT) == decode_per_detector(converter, TEXT)
+
+
+def test_decode():
+    assert decode_tex_accents(TEXT) == ("{Müller}, Hans and Schrödinger, E. and Étienne, "
+                                        "ça and Erdős, P. and 100\\% {\\bf bold}")
+    assert decode_tex_accents(TEXT, 0) == ("{Muller}, Hans and Schrodinger, E. and "
+                                           "Etienne, ca and Erdos, P. and 100\\% {\\bf bold}")
+    # (all the converters share the compiled decoder)
+    assert AccentConverter().decoder is AccentConverter().decoder
+    assert AccentConverter().decode_Tex_Accents(TEXT) == decode_tex_accents(TEXT)
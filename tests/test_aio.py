@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+import pytest
+
+from ads2bibtex import ExportCache
+
+from conftest import make_bibcodes
+
+pytest.importorskip("aiohttp")
+from ads2bibtex.aio import aquery_ads  # noqa: E402
+
+
+class ThreadRecordingCache(ExportCache):
+    """`ExportCache` which records the threads it is called from."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def get_many(self, *args, **kwargs):
+        self.threads.append(threading.current_thread())
+        return super().get_many(*args, **kwargs)
+
+    def put_many(self, *args, **kwargs):
+        self.threads.append(threading.current_thread())
+        return super().put_many(*args, **kwargs)
+
+
+def test_aquery_ads_cache_off_event_loop(fake_ads, tmp_path):
+    bibs = make_bibcodes(3)
+    cache = ThreadRecordingCache(tmp_path)
+
+    async def query():
+        return await aquery_ads(bibs, token="token", journalname="full", cache=cache,
+                                url=fake_ads.url + "export/")
+
+    text = asyncio.run(query())
+    assert all(f"@ARTICLE{{{b}," in text for b in bibs)
+    assert "journal = {Astrophysical Journal}," in text
+    assert len(cache.threads) == 2  # get_many, put_many
+    assert threading.current_thread() not in cache.threads
+    # Served by the cache the next time.
+    assert asyncio.run(query()) == text
+    assert fake_ads.exported == [bibs]
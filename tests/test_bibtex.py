@@ -0,0 +1,76 @@
+import io
+
+import pytest
+
+from ads2bibtex import iter_entries
+
+# (nested deeper than the values matched by a regex)
+NESTED = '"{a {b {c {d {e {f {g} f} e} d} c} b} a}"'
+BIB = ("% a comment\n"
+       "@ARTICLE{2020ApJ...900....1D,\n"
+       "  author = {{Doe}, Jane and {M{\\\"u}ller}, Hans},\n"
+       f"   title = {NESTED},\n"
+       "   month = jan # \"~1\",\n"
+       "    year = 2020\n"
+       "}\n\n"
+       "@string{apj = {Astrophysical Journal}}\n"
+       "@MISC(2021zndo...1234567R, title={Data}, year=2021)\n")
+
+
+def values(entry):
+    return [(f.name, f.value) for f in entry.fields]
+
+
+def test_fields():
+    entries = list(iter_entries(BIB))
+    assert [(e.type, e.key) for e in entries] == [
+        ("article", "2020ApJ...900....1D"), ("string", None),
+        ("misc", "2021zndo...1234567R"),
+    ]
+    assert values(entries[0]) == [
+        ("author", "{{Doe}, Jane and {M{\\\"u}ller}, Hans}"), ("title", NESTED),
+        ("month", "jan # \"~1\""), ("year", "2020"),
+    ]
+    assert values(entries[1]) == [("apj", "{Astrophysical Journal}")]
+    assert values(entries[2]) == [("title", "{Data}"), ("year", "2021")]
+    for entry in entries:
+        assert BIB[entry.start:entry.end] == entry.text
+        for field in entry.fields:
+            assert BIB[field.start:field.end] == field.value
+
+
+@pytest.mark.parametrize("text", [
+    f"@ARTICLE{{key, title = {NESTED}, journal = {{\\apj}}, year = 2020}}",
+    f"@ARTICLE{{key, title = {NESTED} # {NESTED}, journal = {{\\apj}}, year = 2020}}",
+])
+def test_deeply_nested_quoted_value(text):
+    entry, = iter_entries(text)
+    assert [f.name for f in entry.fields] == ["title", "journal", "year"]
+    assert entry.get("title") == text[text.index('"'):text.rindex('"') + 1]
+    assert entry.get("journal") == "{\\apj}"
+
+
+def test_unbalanced_quoted_value():
+    # (as for BibTeX, the brace closes the entry)
+    bib = '@ARTICLE{key, title = "a } b", year = 2020}\n@ARTICLE{next, year = 2021}\n'
+    entries = list(iter_entries(bib))
+    assert [(e.key, values(e)) for e in entries] == [("key", []),
+                                                     ("next", [("year", "2021")])]
+
+
+@pytest.mark.parametrize("chunksize", [1, 7, 64, 1 << 16])
+def test_chunks(chunksize):
+    data = BIB.encode("utf-8")
+    expected = list(iter_entries(data))
+    assert list(iter_entries(io.BytesIO(data), chunksize=chunksize)) == expected
+    assert list(iter_entries(io.StringIO(BIB), chunksize=chunksize)) \
+        == list(iter_entries(BIB))
+
+
+def test_selected_fields():
+    entries = list(iter_entries(BIB, fields=("Author", "TITLE")))
+    assert [e.key for e in entries] == [e.key for e in iter_entries(BIB, fields=False)]
+    assert values(entries[0]) == [("author", "{{Doe}, Jane and {M{\\\"u}ller}, Hans}"),
+                                  ("title", NESTED)]
+    assert values(entries[1]) == []
+    assert values(entries[2]) == [("title", "{Data}")]
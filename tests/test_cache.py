@@ -0,0 +1,46 @@
+import time
+
+from ads2bibtex import ExportCache, query_ads
+
+from conftest import make_bibcodes, make_record
+
+
+def test_query_ads_exports_only_misses(fake_ads, tmp_path):
+    bibs = make_bibcodes(4)
+    cache = ExportCache(tmp_path)
+    client = fake_ads.client()
+    first = query_ads(bibs[:3], token="token", cache=cache, client=client)
+    text = query_ads(bibs, token="token", cache=cache, client=client)
+    assert fake_ads.exported == [bibs[:3], bibs[3:]]
+    assert text == "".join(make_record(b) for b in bibs)
+    assert first == "".join(make_record(b) for b in bibs[:3])
+    assert (cache.hits, cache.misses) == (3, 4)
+    # The records of another format (or other options) are not shared.
+    query_ads(bibs[:1], token="token", fmt="bibtexabs", cache=cache, client=client)
+    assert fake_ads.exported[-1] == bibs[:1]
+
+
+def test_ttl(tmp_path, monkeypatch):
+    cache = ExportCache(tmp_path, ttl=10)
+    cache.put_many({"a": "A", "b": "B"}, "bibtex", dict(sort="date asc"))
+    # (the sort order does not change the records)
+    assert cache.get_many(["a", "b", "c"], "bibtex", dict(sort="date desc")) \
+        == {"a": "A", "b": "B"}
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 11)
+    assert cache.get_many(["a", "b"], "bibtex") == {}
+
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    now = [1000.]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = ExportCache(tmp_path, ttl=1e6, max_size=25)
+    cache.put_many({"a": "A"*10, "b": "B"*10}, "bibtex")
+    now[0] += 1
+    assert cache.get_many(["a"], "bibtex") == {"a": "A"*10}  # b is now the LRU
+    now[0] += 1
+    cache.put_many({"c": "C"*10}, "bibtex")
+    assert cache.get_many(["a", "b", "c"], "bibtex") == {"a": "A"*10, "c": "C"*10}
+    cache.close()
+    # Persisted on disk.
+    assert set(ExportCache(tmp_path, ttl=1e6).get_many(["a", "c"], "bibtex")) == {"a", "c"}
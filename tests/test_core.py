@@ -0,0 +1,147 @@
+import io
+import os
+import stat
+
+import pytest
+
+from ads2bibtex import change_journal_name, iter_change_journal_name, write_output
+from ads2bibtex.core import JOURNAL_MACRO
+
+
+def test_write_output_unchanged(tmp_path):
+    fname = tmp_path / "references.bib"
+    assert write_output(fname, ["@MISC{a}\n", "@MISC{b}\n"])
+    os.utime(fname, ns=(0, 0))
+    assert not write_output(fname, "@MISC{a}\n@MISC{b}\n")
+    assert fname.stat().st_mtime_ns == 0  # (e.g., for latexmk)
+    assert write_output(fname, "@MISC{a}\n")
+    assert fname.read_text() == "@MISC{a}\n"
+    assert os.listdir(tmp_path) == ["references.bib"]
+
+
+def test_write_output_mode(tmp_path):
+    fname = tmp_path / "references.bib"
+    mask = os.umask(0o027)
+    try:
+        write_output(fname, "a")
+    finally:
+        os.umask(mask)
+    # (the umask of the process at import)
+    assert stat.S_IMODE(fname.stat().st_mode) == 0o666 & ~mask
+    fname.chmod(0o600)
+    write_output(fname, "b")
+    assert stat.S_IMODE(fname.stat().st_mode) == 0o600
+
+
+def test_write_output_failure_keeps_file(tmp_path, monkeypatch):
+    fname = tmp_path / "references.bib"
+    fname.write_text("old")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        write_output(fname, "new")
+    assert fname.read_text() == "old"
+    assert os.listdir(tmp_path) == ["references.bib"]
+
+
+def entry(key, **fields):
+    return ("@ARTICLE{%s,\n" % key
+            + "".join(f"  {name} = {{{value}}},\n" for name, value in fields.items())
+            + "}\n\n")
+
+
+def test_every_journal_macro_expanded():
+    bib = "".join(entry(f"key{i}", journal="\\" + macro)
+                  for i, macro in enumerate(JOURNAL_MACRO))
+    assert change_journal_name(bib, journalname="full") == "".join(
+        entry(f"key{i}", journal=name) for i, name in enumerate(JOURNAL_MACRO.values())
+    )
+
+
+@pytest.mark.parametrize("text, expected", [
+    # (longest first: \apjl is not \apj + "l")
+    ("\\apjl", "Astrophysical Journal, Letters"),
+    ("\\apjs, \\apj", "Astrophysical Journal, Supplement, Astrophysical Journal"),
+    ("\\aap{}", "Astronomy and Astrophysics{}"),
+    # (not a macro: followed by a letter, or unknown)
+    ("\\apjx \\nomacro", "\\apjx \\nomacro"),
+])
+def test_journal_macro(text, expected):
+    assert change_journal_name(entry("key", journal=text), journalname="full") \
+        == entry("key", journal=expected)
+    # Other formats (e.g., aastex): in the whole text.
+    assert change_journal_name(f"\\bibitem[]{{key}} {text}, 1, 2\n", journalname="full") \
+        == f"\\bibitem[]{{key}} {expected}, 1, 2\n"
+
+
+ACCENTED = entry("2020ApJ...900....1M", author='{M{\\"u}ller}, Hans and {\\\'E}tienne, A.',
+                 title="Schr\\\"odinger", journal="\\apj",
+                 url="https://example.org/M\\\"uller")
+
+
+@pytest.mark.parametrize("accents, author, title", [
+    ("utf8", "{Müller}, Hans and Étienne, A.", "Schrödinger"),
+    ("ascii", "{Muller}, Hans and Etienne, A.", "Schrodinger"),
+])
+def test_accent_stage(accents, author, title):
+    expected = entry("2020ApJ...900....1M", author=author, title=title,
+                     journal="Astrophysical Journal",
+                     url="https://example.org/M\\\"uller")  # (verbatim)
+    assert change_journal_name(ACCENTED, journalname="full", accents=accents) == expected
+    assert change_journal_name(ACCENTED, accents="keep") == ACCENTED
+    with pytest.raises(ValueError):
+        change_journal_name(ACCENTED, accents="latin1")
+
+
+def test_iter_change_journal_name():
+    text = "% header\n" + ACCENTED * 5 + "".join(entry(f"key{i}", journal="\\mnras")
+                                                 for i in range(5))
+    expected = change_journal_name(text, journalname="full", accents="utf8")
+    batches = list(iter_change_journal_name(io.StringIO(text), "full", "utf8",
+                                            batchsize=3))
+    assert len(batches) == 4
+    assert "".join(batches) == expected
+
+
+RIS = """TY  - JOUR
+AU  - M\\"uller, H.
+TI  - On \\apj and the Astrophysical Journal
+JO  - \\apj
+JF  - The Astrophysical Journal
+T2  - \\mnras
+UR  - https://example.org/M\\"uller
+ER  - 
+
+"""
+ENDNOTE = """%0 Journal Article
+%A M\\"uller, H.
+%T On \\apj
+%J \\apj
+%B Monthly Notices of the Royal Astronomical Society
+%U https://example.org/M\\"uller
+
+"""
+
+
+@pytest.mark.parametrize("text, changes", [
+    (RIS, [("AU  - M\\\"uller", "AU  - Müller"), ("JO  - \\apj", "JO  - Astrophys. J."),
+           ("JF  - The Astrophysical Journal", "JF  - Astrophys. J."),
+           ("T2  - \\mnras", "T2  - Monthly Notices of the Royal Astronomical Society")]),
+    (ENDNOTE, [("%A M\\\"uller", "%A Müller"), ("%J \\apj", "%J Astrophys. J.")]),
+    (entry("key", title="On \\apj", journal="The Astrophysical Journal",
+           booktitle="\\mnras"),
+     [("journal = {The Astrophysical Journal}", "journal = {Astrophys. J.}"),
+      ("booktitle = {\\mnras}",
+       "booktitle = {Monthly Notices of the Royal Astronomical Society}")]),
+])
+def test_field_aware_rewriting(text, changes):
+    # Only the journal fields (and the accents but in the verbatim fields,
+    # e.g., the URL) are rewritten; not the title.
+    expected = text
+    for old, new in changes:
+        assert old in expected
+        expected = expected.replace(old, new)
+    assert change_journal_name(text, journalname="iso4", accents="utf8") == expected
@@ -0,0 +1,66 @@
+import io
+import json
+
+import pytest
+
+from ads2bibtex import SyncDaemon
+
+from conftest import make_bibcodes
+
+
+@pytest.fixture
+def make_daemon(fake_ads, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "add.bib").write_text("@MISC{mine,\n  title = {Mine},\n}\n")
+
+    def make(**target):
+        config = dict(cache_dir="none", dtime=0, max_dtime=0,
+                      target=[dict(dict(library="LIB", output="references.bib",
+                                        additional_file="add.bib"), **target)])
+        daemon = SyncDaemon(config, token="token")
+        fake_ads.mount(daemon.client)
+        return daemon
+    return make
+
+
+@pytest.mark.parametrize("service", ["biblib", "export"])
+def test_outage_at_start_keeps_output(fake_ads, make_daemon, tmp_path, service):
+    bibs = make_bibcodes(3)
+    fake_ads.set_library("LIB", bibs)
+    output = tmp_path / "references.bib"
+    output.write_text("old")
+    daemon = make_daemon()
+    fake_ads.down.add(service)
+    assert not daemon.poll()
+    assert output.read_text() == "old"
+    # Retried at the next poll, although the library did not change since.
+    fake_ads.down.clear()
+    assert daemon.poll()
+    text = output.read_text()
+    assert all(f"@ARTICLE{{{b}," in text for b in bibs) and "@MISC{mine," in text
+
+
+def test_failed_export_is_retried(fake_ads, make_daemon, tmp_path):
+    bibs = make_bibcodes(4)
+    fake_ads.set_library("LIB", bibs[:3])
+    daemon = make_daemon()
+    assert daemon.poll()
+    fake_ads.set_library("LIB", bibs)
+    fake_ads.down.add("export")
+    assert not daemon.poll()
+    fake_ads.down.clear()
+    assert daemon.poll()
+    assert fake_ads.exported == [bibs[:3], bibs[3:]]
+    assert f"@ARTICLE{{{bibs[3]}," in (tmp_path / "references.bib").read_text()
+
+
+def test_additional_file_edit_reported(fake_ads, make_daemon, tmp_path):
+    fake_ads.set_library("LIB", make_bibcodes(2))
+    daemon = make_daemon()
+    daemon.report.events = io.StringIO()
+    assert daemon.poll()
+    (tmp_path / "add.bib").write_text("@MISC{mine,\n  title = {Mine, edited},\n}\n")
+    assert daemon.poll(local=True)
+    records = [json.loads(line) for line in daemon.report.events.getvalue().splitlines()]
+    assert [r["event"] for r in records] == ["changed", "written", "updated", "written"]
+    assert records[2]["source"] == "add.bib" and records[3]["changed"] == ["mine"]
@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from ads2bibtex import OutputIndex, index_path, read_index
+
+
+def entry(key, title):
+    return f"@ARTICLE{{{key},\n  title = {{{title}}},\n}}\n\n"
+
+
+def test_update(tmp_path):
+    index = OutputIndex(tmp_path / "references.bib")
+    ads = entry("2019ApJ...882..150M", "A") + entry("2020MNRAS.491.1234A", "B")
+    assert index.update([("ads", ads), ("additional", entry("mine", "C"))]) == (
+        ["2019ApJ...882..150M", "2020MNRAS.491.1234A", "mine"], [], [])
+    assert index.update([("ads", ads), ("additional", entry("mine", "C"))]) == ([], [], [])
+
+    ads = entry("2019ApJ...882..150M", "A'") + entry("2021A&A...645A..12B", "D")
+    assert index.update([("ads", ads), ("additional", entry("mine", "C"))]) == (
+        ["2021A&A...645A..12B"], ["2020MNRAS.491.1234A"], ["2019ApJ...882..150M"])
+    text = ads + entry("mine", "C")
+    data = text.encode("utf-8")
+    assert index.size == len(data) and len(index) == 3
+    for item in index.entries:
+        assert data[item.start:item.end].decode().startswith(f"@ARTICLE{{{item.key},")
+        assert data[item.end - 1:item.end] == b"}"
+    assert index.get("mine").origin == "additional" and "mine" in index
+
+
+def test_duplicate_warning(tmp_path):
+    index = OutputIndex(tmp_path / "references.bib")
+    ads = entry("2019ApJ...882..150M", "A")
+    index.update([("ads", ads), ("additional", entry("2019ApJ...882..150M", "B"))])
+    warning = index.duplicate_warning()
+    assert "2019ApJ...882..150M (ads & additional)" in warning
+    assert index.get("2019ApJ...882..150M").origin == "ads"
+    index.update([("ads", ads), ("additional", entry("2019ApJ...882..150M", "C"))])
+    assert index.duplicate_warning() is None  # (warned already)
+    index.update([("ads", ads), ("additional", "")])
+    assert index.duplicates == {} and index.duplicate_warning() is None
+
+
+def test_save_read_index(tmp_path):
+    output = tmp_path / "references.bib"
+    index = OutputIndex(output)
+    text = entry("2019ApJ...882..150M", "Müller") + entry("mine", "C")
+    index.update([("ads", text)])
+    output.write_text(text, encoding="utf-8")
+    assert index.save() and not index.save()
+    assert json.loads(index_path(output).read_text())["output"] == "references.bib"
+    entries = read_index(output)
+    assert list(entries) == ["2019ApJ...882..150M", "mine"]
+    with open(output, "rb") as ff:
+        ff.seek(entries["mine"].start)
+        assert ff.read(entries["mine"].end - entries["mine"].start).decode() == (
+            entry("mine", "C").strip())
+
+    output.write_text(text + entry("edited", "E"), encoding="utf-8")
+    with pytest.raises(ValueError):
+        read_index(output)
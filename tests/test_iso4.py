@@ -0,0 +1,73 @@
+import pytest
+
+from ads2bibtex import AbbreviationCache, change_journal_name
+from ads2bibtex.iso4 import (abbreviate, abbreviate_many, abbreviate_titles, memo_clear,
+                             memo_info, set_abbreviation_cache, set_abbreviation_workers)
+
+TITLES = ["The Astrophysical Journal", "Monthly Notices of the Royal Astronomical Society",
+          "Journal of Fluid Mechanics", "Physical Review Letters",
+          "Annual Review of Astronomy and Astrophysics", "The Astrophysical Journal"]
+
+
+def test_abbreviate_many():
+    abbrs, errors = abbreviate_many(TITLES)
+    assert abbrs == [abbreviate(title) for title in TITLES]
+    assert abbrs[:2] == ["Astrophys. J.", "Mon. Not. R. Astron. Soc."]
+    assert errors == {}
+
+
+def test_abbreviate_many_errors():
+    # ("izbor" is abbreviated differently in Bulgarian and Croatian)
+    abbrs, errors = abbreviate_many(["Journal of Izbor", "Physical Review Letters"])
+    assert abbrs == [None, "Phys. Rev. Lett."]
+    assert list(errors) == ["Journal of Izbor"]
+    with pytest.raises(Exception, match="Ambiguous word"):
+        abbreviate("Journal of Izbor")
+    assert abbreviate_many(["Journal of Izbor"], disambiguation_langs={"hrv"}) \
+        == (["J. Izbor."], {})
+
+
+@pytest.fixture
+def memo():
+    memo_clear()
+    yield
+    set_abbreviation_cache(None)
+    memo_clear()
+
+
+def test_abbreviate_titles_memo(memo, tmp_path):
+    set_abbreviation_cache(AbbreviationCache(tmp_path))
+    expected = {title: abbreviate(title) for title in TITLES}
+    assert abbreviate_titles(TITLES) == expected
+    assert abbreviate_titles(TITLES[:2]) == {t: expected[t] for t in TITLES[:2]}
+    info = memo_info()
+    assert (info["hits"], info["misses"], info["size"]) == (2, 5, 5)
+    assert (info["disk_hits"], info["disk_misses"]) == (0, 5)
+    # The next run (or another process) finds them on the disk.
+    memo_clear()
+    set_abbreviation_cache(AbbreviationCache(tmp_path))
+    assert abbreviate_titles(TITLES) == expected
+    assert memo_info()["disk_hits"] == 5
+    # (keyed by the options too)
+    assert abbreviate_titles(TITLES[:1], periods=False) == {TITLES[0]: "Astrophys J"}
+
+
+def test_abbreviate_many_processes():
+    titles = TITLES + ["Journal of Izbor"]
+    abbrs, errors = abbreviate_many(titles, processes=2, chunksize=2)
+    assert abbrs == abbreviate_many(titles)[0]
+    assert {t: str(e) for t, e in errors.items()} \
+        == {"Journal of Izbor": str(abbreviate_many(titles[-1:])[1]["Journal of Izbor"])}
+
+
+def test_iso4_stage_in_workers(memo):
+    bib = "".join("@ARTICLE{key%d,\n  journal = {%s},\n}\n\n" % (i, title)
+                  for i, title in enumerate(TITLES))
+    expected = change_journal_name(bib, journalname="iso4")
+    assert "journal = {Mon. Not. R. Astron. Soc.}," in expected
+    memo_clear()
+    set_abbreviation_workers(2, chunksize=2)
+    try:
+        assert change_journal_name(bib, journalname="iso4") == expected
+    finally:
+        set_abbreviation_workers(None)
@@ -0,0 +1,71 @@
+import pytest
+
+from ads2bibtex import iter_lib, query_ads, query_lib, query_lib_meta
+
+from conftest import make_bibcodes
+
+
+@pytest.fixture
+def big_library(fake_ads):
+    bibcodes = make_bibcodes(50000)
+    fake_ads.set_library("BIG", bibcodes, name="big")
+    return bibcodes
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_query_lib_pages(fake_ads, big_library, max_workers):
+    """More than the 10,000 rows of one request, in order."""
+    docs, last_modified, name = query_lib(
+        "BIG", token="token", rows=10000, max_workers=max_workers,
+        url=fake_ads.url + "biblib/libraries/", client=fake_ads.client()
+    )
+    assert docs == big_library
+    assert name == "ADS Library: big"
+    assert last_modified == "2024-01-01T00:00:01"
+    assert sorted(fake_ads.pages) == [(start, 10000) for start in range(0, 50000, 10000)]
+
+
+def test_iter_lib_streams(fake_ads, big_library):
+    pages = iter_lib("BIG", token="token", rows=20000,
+                     url=fake_ads.url + "biblib/libraries/", client=fake_ads.client())
+    first = [next(pages) for _ in range(3)]
+    assert first == big_library[:3]
+    assert fake_ads.pages == [(0, 20000)]  # the other pages are not fetched yet
+    assert first + list(pages) == big_library
+
+
+def test_query_lib_meta(fake_ads, big_library):
+    meta = query_lib_meta("BIG", token="token", url=fake_ads.url + "biblib/libraries/",
+                          client=fake_ads.client())
+    assert meta["num_documents"] == 50000
+    assert fake_ads.pages == []  # no document is listed
+
+
+@pytest.mark.parametrize("fmt", ["bibtex", "%R %T"])
+def test_query_ads_chunks_joined_as_one_export(fake_ads, fmt):
+    bibs = make_bibcodes(5)
+    client = fake_ads.client()
+    one = query_ads(bibs, token="token", fmt=fmt, chunksize=None, client=client)
+    chunked = query_ads(bibs, token="token", fmt=fmt, chunksize=2, client=client)
+    assert sorted(fake_ads.exported[1:]) == [bibs[:2], bibs[2:4], bibs[4:]]
+    assert chunked == one
+
+
+def test_conditional_polling(fake_ads):
+    bibs = make_bibcodes(3)
+    fake_ads.set_library("LIB", bibs[:2])
+    fake_ads.etags = True
+    client = fake_ads.client()
+
+    def poll():
+        meta = query_lib_meta("LIB", token="token", client=client)
+        return meta["date_last_modified"], meta["num_documents"]
+
+    assert poll() == ("2024-01-01T00:00:01", 2)
+    assert poll() == ("2024-01-01T00:00:01", 2)
+    assert fake_ads.n_not_modified == 1
+    fake_ads.set_library("LIB", bibs)
+    assert poll() == ("2024-01-01T00:00:02", 3)
+    assert query_lib("LIB", token="token", client=client)[0] == bibs
+    assert query_lib("LIB", token="token", client=client)[0] == bibs
+    assert fake_ads.n_not_modified == 2
@@ -0,0 +1,46 @@
+import io
+import json
+
+from ads2bibtex import ChangeReport, diff_keys
+
+
+def events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_diff_keys():
+    assert diff_keys(["c", "a", "d", "b"], ["b", "e", "a", "f"]) == (["c", "d"],
+                                                                      ["e", "f"])
+
+
+def test_events(capsys):
+    stream = io.StringIO()
+    report = ChangeReport(max_items=2, events=stream)
+    report._paint = lambda text, fore, back: text  # (without colorama)
+    assert report.compare("LIB", ["a", "b", "c", "d"], ["a", "x"]) == (["b", "c", "d"],
+                                                                       ["x"])
+    assert report.compare("LIB", ["a"], ["a"]) == ([], [])
+    report.compare("add.bib", ["a"], ["a"], updated=True)
+    report.written("references.bib", added=["b"], changed=["a"])
+    out = capsys.readouterr().out
+    assert " +3: " in out and "b, c, ... (1 more)" in out and " -1: " in out
+    assert " add.bib Updated " in out
+    records = events(stream)
+    for record in records:
+        assert record.pop("time")
+    assert records == [
+        dict(event="changed", source="LIB", n=4, added=["b", "c", "d"], deleted=["x"]),
+        dict(event="updated", source="add.bib", n=1),
+        dict(event="written", path="references.bib", added=["b"], deleted=[],
+             changed=["a"]),
+    ]
+
+
+def test_events_file(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.write_text('{"event": "old"}\n')
+    report = ChangeReport(events=path)
+    report.changed("LIB", 1, ["a"], [])
+    report.close()
+    assert [r["event"] for r in map(json.loads, path.read_text().splitlines())] \
+        == ["old", "changed"]
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+from ads2bibtex import PollScheduler, query_lib_meta
+
+DAY = 86400
+
+
+def test_interval_grows_when_idle(fake_ads):
+    fake_ads.set_library("LIB", [])
+    client = fake_ads.client()
+    scheduler = PollScheduler(dtime=5, max_dtime=20, factor=2, state_file=None)
+    intervals = [scheduler.update(client) for _ in range(4)]
+    assert intervals == [10, 20, 20, 20]
+    assert scheduler.update(client, changed=True) == 5
+
+
+def test_budget_persisted(fake_ads, tmp_path):
+    fake_ads.set_library("LIB", [])
+    client = fake_ads.client()
+    state = tmp_path / "quota.json"
+    scheduler = PollScheduler(dtime=0, daily_limit=1100, reserve=100, state_file=state)
+    for _ in range(10):
+        query_lib_meta("LIB", token="token", client=client)
+    scheduler.update(client, changed=True)
+    assert scheduler.remaining()[0] == 1090
+    # At the pace of used/usable * DAY/usable, the usage converges to usable.
+    assert scheduler.next_interval() == pytest.approx(10/1000 * DAY/1000, rel=1e-3)
+    # (a restarted script counts the same requests)
+    assert PollScheduler(daily_limit=1100, state_file=state).remaining()[0] == 1090
+
+
+def test_budget_used_up(tmp_path):
+    now = time.time()
+    scheduler = PollScheduler(dtime=1, daily_limit=200, reserve=100, state_file=None)
+    scheduler.record(100, now=now - DAY + 60)
+    # Wait until the oldest requests leave the 24-hour window.
+    assert scheduler.next_interval(now=now) == pytest.approx(60)
+    assert scheduler.next_interval(now=now + 61) == 1
+
+
+def test_ratelimit_headers(fake_ads):
+    fake_ads.set_library("LIB", [])
+    reset = time.time() + 3600
+    fake_ads.ratelimit = dict(limit=5000, remaining=50, reset=reset)
+    client = fake_ads.client()
+    query_lib_meta("LIB", token="token", client=client)
+    assert client.ratelimits["biblib"] == dict(limit=5000, remaining=50, reset=reset)
+    scheduler = PollScheduler(dtime=5, reserve=100, state_file=None)
+    # Fewer requests left than the reserve: wait until the reset.
+    assert scheduler.update(client, changed=True) == pytest.approx(3600, abs=5)
+    assert scheduler.remaining()[0] == 50
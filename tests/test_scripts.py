@@ -0,0 +1,142 @@
+import json
+
+import pytest
+
+from ads2bibtex.scripts import ads2bib, tex2bib
+
+from conftest import make_bibcodes
+
+
+@pytest.fixture
+def run_ads2bib(tmp_path, monkeypatch, fake_client_class):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".ads-token").write_text("token")
+    monkeypatch.setattr(ads2bib, "ADSClient", fake_client_class)
+
+    def run(*args):
+        ads2bib.main(["LIB", "-c", "none", "-t", "0", "-T", "0", *args])
+    return run
+
+
+def test_rawfile_without_export(fake_ads, run_ads2bib, tmp_path):
+    bibs = make_bibcodes(6)
+    fake_ads.set_library("LIB", bibs[:5])
+    fake_ads.script = [("LIB", bibs)]
+    run_ads2bib("-r", "raw.txt", "-n", "3")
+    # The raw file is made from the export: only the new bibcode is exported.
+    assert fake_ads.exported == [bibs[:5], bibs[5:]]
+    lines = (tmp_path / "raw.txt").read_text().splitlines()
+    assert [line.split()[0] for line in lines] == bibs
+    assert lines[0].endswith("# Doe+Roe || A {quoted} title of " + bibs[0])
+
+
+def test_rawfile_format_only_when_library_changed(fake_ads, run_ads2bib, tmp_path):
+    bibs = make_bibcodes(6)
+    fake_ads.set_library("LIB", bibs[:5])
+    fake_ads.script = [("LIB", bibs), None, None]
+    run_ads2bib("-r", "raw.txt", "-F", "%R", "-n", "4")
+    # The output, the raw file; the added bibcode, the raw file (not split).
+    assert fake_ads.exported == [bibs[:5], bibs[:5], bibs[5:], bibs]
+    assert (tmp_path / "raw.txt").read_text() == "".join(f"{b}  # %R\n" for b in bibs)
+
+
+def test_export_outage_is_retried(fake_ads, run_ads2bib, tmp_path, capsys):
+    bibs = make_bibcodes(6)
+    fake_ads.set_library("LIB", bibs[:5])
+
+    def add_during_outage(fake):
+        fake.set_library("LIB", bibs)
+        fake.down.add("export")
+
+    fake_ads.script = [add_during_outage, lambda fake: fake.down.discard("export")]
+    run_ads2bib("-n", "3")
+    assert "[WARNING] ADS query failed" in capsys.readouterr().out
+    # The change is exported once the export is back.
+    assert fake_ads.exported == [bibs[:5], bibs[5:]]
+    output = (tmp_path / "references.bib").read_text()
+    assert all(f"@ARTICLE{{{b}," in output for b in bibs)
+
+
+def test_export_outage_then_local_edit(fake_ads, run_ads2bib, tmp_path, capsys):
+    bibs = make_bibcodes(6)
+    fake_ads.set_library("LIB", bibs[:5])
+    add = tmp_path / "add.bib"
+    add.write_text("@MISC{local1, title={One}}\n")
+
+    def add_during_outage(fake):
+        fake.set_library("LIB", bibs)
+        fake.down.add("export")
+        add.write_text("@MISC{local1, title={One}}\n@MISC{local2, title={Two}}\n")
+
+    # The edit of the additional file wakes the loop up before the next poll.
+    fake_ads.script = [add_during_outage, lambda fake: fake.down.discard("export")]
+    run_ads2bib("-a", "add.bib", "-n", "4")
+    out = capsys.readouterr().out
+    assert "[WARNING] ADS query failed" in out
+    # The added bibcode is exported (and reported) once the export is back.
+    assert fake_ads.exported == [bibs[:5], bibs[5:]]
+    assert out.count("+1") == 2  # the library, the additional file
+    output = (tmp_path / "references.bib").read_text()
+    assert all(f"@ARTICLE{{{b}," in output for b in bibs)
+    assert "@MISC{local2," in output
+
+
+def test_rawfile_exported_for_other_formats(fake_ads, run_ads2bib, tmp_path):
+    bibs = make_bibcodes(3)
+    fake_ads.set_library("LIB", bibs)
+    run_ads2bib("-r", "raw.txt", "-f", "ris", "-n", "1")
+    # The output is not BibTeX: the raw file is exported in its own format.
+    assert fake_ads.exported == [bibs, bibs]
+    assert (tmp_path / "raw.txt").read_text() == "".join(
+        f"{b}  # {ads2bib.RAW_FORMAT}\n" for b in bibs
+    )
+
+
+@pytest.fixture
+def run_tex2bib(tmp_path, monkeypatch, fake_client_class):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".ads-token").write_text("token")
+    monkeypatch.setattr(tex2bib, "ADSClient", fake_client_class)
+
+    def run(*args):
+        tex2bib.main(["main.tex", "-c", "none", *args])
+    return run
+
+
+def test_tex2bib_failed_export_backs_off(fake_ads, run_tex2bib, tmp_path, capsys):
+    bibs = make_bibcodes(2)
+    (tmp_path / "main.tex").write_text(f"\\cite{{{bibs[0]}}} \\citep{{{bibs[1]}}}\n")
+    fake_ads.down.add("export")
+    run_tex2bib("-t", "0.01", "-T", "10", "-n", "40")
+    out = capsys.readouterr().out
+    # Retried with a growing interval (~7 times in ~0.4 s), not at each iteration.
+    assert 2 <= out.count("[WARNING] Export failed") == fake_ads.n_requests <= 12
+    assert not (tmp_path / "references.bib").exists()
+
+
+def test_tex2bib_typo_reported(fake_ads, run_tex2bib, tmp_path, capsys):
+    bibs = make_bibcodes(2)
+    typo = "2020ApJ...000.0000X"
+    fake_ads.unknown.add(typo)
+    (tmp_path / "main.tex").write_text(f"\\cite{{{bibs[0]},{typo},{bibs[1]}}}\n")
+    run_tex2bib("-t", "0", "-n", "3")
+    assert f"Not found in ADS (check the citation keys): {typo}" in capsys.readouterr().out
+    assert fake_ads.exported == [sorted(bibs + [typo])]
+    output = (tmp_path / "references.bib").read_text()
+    assert all(f"@ARTICLE{{{b}," in output for b in bibs)
+
+
+def test_additional_file_edit_reported(fake_ads, run_ads2bib, tmp_path):
+    fake_ads.set_library("LIB", make_bibcodes(2))
+    add = tmp_path / "add.bib"
+    add.write_text("@MISC{local1, title={One}}\n")
+    # An entry edited: no key added nor deleted.
+    fake_ads.script = [lambda fake: add.write_text("@MISC{local1, title={Two}}\n")]
+    run_ads2bib("-a", "add.bib", "--events", "events.jsonl", "-n", "3")
+    records = [json.loads(line)
+               for line in (tmp_path / "events.jsonl").read_text().splitlines()]
+    assert [(r["event"], r.get("source"), r.get("changed")) for r in records] == [
+        ("written", None, []), ("updated", "add.bib", None),
+        ("written", None, ["local1"]),
+    ]
+    assert "title={Two}" in (tmp_path / "references.bib").read_text()
@@ -0,0 +1,19 @@
+from ads2bibtex import LibrarySync
+
+from conftest import make_bibcodes
+
+
+def test_not_found_bibcodes_are_not_exported_again(fake_ads):
+    bibs = make_bibcodes(4)
+    typo = "2020ApJ...000.0000X"
+    fake_ads.unknown.add(typo)
+    sync = LibrarySync("token", client=fake_ads.client())
+    sync.update(sorted(bibs[:2] + [typo]))
+    assert sync.not_found == {typo}
+    assert sync.text == "".join(sync.records[b] for b in bibs[:2])
+    # Only the newly added bibcodes are exported (not the whole list).
+    sync.update(sorted(bibs + [typo]))
+    sync.update(bibs[1:])
+    assert fake_ads.exported == [sorted(bibs[:2] + [typo]), bibs[2:]]
+    assert sync.not_found == set()
+    assert list(sync.records) == bibs[1:]
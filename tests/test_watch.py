@@ -0,0 +1,92 @@
+import os
+import threading
+
+import pytest
+
+from ads2bibtex import AdditionalFile, FileWatcher, TexProject, extract_cite_keys, wait_any
+
+
+def write(path, text):
+    path.write_text(text)
+    st = os.stat(path)  # (a new mtime, even within the resolution of the clock)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+@pytest.mark.parametrize("inotify", [True, False])
+def test_file_watcher(tmp_path, inotify):
+    path = tmp_path / "bib_add.txt"
+    watcher = FileWatcher(path, inotify=inotify)
+    assert watcher.data is None and not watcher.changed()
+    write(path, "a")
+    assert watcher.poll() and watcher.poll()  # kept until `changed`
+    assert watcher.changed() and watcher.data == b"a"
+    assert not watcher.changed()
+    write(path, "a")  # saved as it was
+    assert not watcher.changed()
+    path.unlink()
+    assert watcher.changed() and watcher.data is None
+    watcher.close()
+
+
+@pytest.mark.parametrize("inotify", [True, False])
+def test_wait_any(tmp_path, inotify):
+    watchers = [FileWatcher(tmp_path / name, inotify=inotify) for name in "ab"]
+    assert not wait_any(watchers + [None], 0.05, interval=0.01)
+    timer = threading.Timer(0.1, write, (tmp_path / "b", "b"))
+    timer.start()
+    assert wait_any(watchers, 10, interval=0.01)
+    timer.join()
+    assert [w.changed() for w in watchers] == [False, True]
+    for w in watchers:
+        w.close()
+
+
+def test_additional_file(tmp_path):
+    path = tmp_path / "bib_add.txt"
+    write(path, "@ARTICLE{a,\n  title = {A},\n}\n\n@BOOK{b,\n  title = {B},\n}\n")
+    additional = AdditionalFile(path, inotify=False)
+    assert additional.keys == ["a", "b"] and not additional.update()
+    write(path, "@ARTICLE{a,\n  title = {A},\n}\n\n@BOOK{c,\n  title = {C},\n}\n"
+          + "@MISC{d,\n  note = {}\n}\r\n")
+    assert additional.update()
+    assert additional.keys == ["a", "c", "d"]
+    assert additional.text == path.read_text().replace("\r\n", "\n")
+    path.unlink()
+    assert additional.update() and additional.keys == [] and additional.text == ""
+    additional.close()
+    assert AdditionalFile(None).keys == [] and not AdditionalFile(None).update()
+
+
+BIB1, BIB2, BIB3 = "2019ApJ...882..150M", "2020MNRAS.491.1234A", "2021A&A...645A..12B"
+
+
+def test_tex_project(tmp_path):
+    main = tmp_path / "main.tex"
+    (tmp_path / "chapters").mkdir()
+    write(main, "\\citep{%s, notabibcode}\n\\input{chapters/intro}\n"
+          "\\include{chapters/method.tex}\n\\subfile{appendix}\n"
+          "\\input{main}\n" % BIB1)
+    write(tmp_path / "chapters" / "intro.tex", "\\cite{%s}" % BIB2)
+    write(tmp_path / "chapters" / "method.tex", "\\citet{%s}\\cite{%s}" % (BIB1, BIB3))
+    project = TexProject(main, inotify=False)
+    assert project.bibcodes == [BIB1, BIB2, BIB3] == extract_cite_keys(main)
+    assert project.keys == [BIB1, "notabibcode", BIB2, BIB3]
+    assert sorted(p.name for p in project.files) == [
+        "appendix.tex", "intro.tex", "main.tex", "method.tex"]
+    assert not project.update()
+
+    # A file not existing yet is watched, as well as the included ones.
+    write(tmp_path / "appendix.tex", "\\cite{%s}\\input{chapters/new}" % BIB3)
+    assert not project.update()  # (cited already)
+    assert len(project.files) == 5
+    write(tmp_path / "chapters" / "new.tex", "\\cite{2022Natur.601..123C}")
+    assert project.update() and project.bibcodes[-1] == "2022Natur.601..123C"
+
+    # Dropping an include drops its citations and stops watching its files.
+    write(main, "\\citep{%s}\n\\include{chapters/method}\n" % BIB1)
+    assert project.update()
+    assert project.bibcodes == [BIB1, BIB3] == extract_cite_keys(main)
+    assert sorted(p.name for p in project.files) == ["main.tex", "method.tex"]
+    write(tmp_path / "chapters" / "intro.tex", "\\cite{2023ApJ...900....1D}")
+    assert not project.update()
+    project.close()